@@ -0,0 +1,84 @@
+"""
+Microbenchmark for the answer cache: lookups in a full cache of rephrased questions.
+
+Before timing, the matching is checked on the `CHECKS` pairs: rephrasings must match, while
+reversed relations ("orders per customer" / "customers per order"), other values and long
+questions with one more word must not. The script exits with status 1 when a pair fails.
+
+    python benchmarks/bench_answer_cache.py --size 256 --repeat 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from answer_cache import AnswerCache  # noqa: E402
+
+LONG_QUESTION = "average order amount per customer segment for each product category and month in the west region over time"
+
+# 🔹 (cached question, asked question, expected match)
+CHECKS = [
+    ("avg NYC temp", "What is the mean temperature in NYC?", True),
+    ("total sales by region", "Show me the total sales by region", True),
+    ("Top 10 cities by temp", "top 10 cities by temperature", True),
+    ("number of orders per customer", "number of customers per order", False),
+    ("flights from Boston to Denver", "flights from Denver to Boston", False),
+    ("flights from Boston to Denver", "flights to Boston from Denver", False),
+    ("avg NYC temp", "avg Boston temp", False),
+    ("Top 10 cities by temp", "Top 5 cities by temp", False),
+    (LONG_QUESTION, LONG_QUESTION + " excluding returns", False),
+    (LONG_QUESTION, LONG_QUESTION.replace("west", "east"), False),
+]
+
+TOPICS = ["sales", "orders", "temperature", "flights", "customers", "returns", "revenue", "stock"]
+GROUPS = ["region", "month", "product", "city", "segment", "carrier", "store", "year"]
+
+
+def check_matches() -> bool:
+    """Runs the `CHECKS` pairs through an empty cache each and prints every wrong result."""
+    ok = True
+    for cached, asked, expected in CHECKS:
+        cache = AnswerCache()
+        cache.put(cached, "SELECT 1", 0)
+        hit = cache.get(asked, 0)
+        if (hit is not None) != expected:
+            ok = False
+            found = f"similarity {hit['similarity']:.2f}" if hit else "no match"
+            print(f"  expected {'a match' if expected else 'no match'}, got {found}:\n    {cached!r}\n    {asked!r}")
+    print(f"answer cache checks: {'passed' if ok else 'FAILED'} ({len(CHECKS)} pairs)\n")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=256, help="questions in the cache")
+    parser.add_argument("--repeat", type=int, default=2000, help="lookups per question")
+    args = parser.parse_args()
+
+    if not check_matches():
+        sys.exit(1)
+
+    cache = AnswerCache(maxsize=args.size)
+    pairs = [(TOPICS[i % len(TOPICS)], GROUPS[i // len(TOPICS) % len(GROUPS)]) for i in range(args.size)]
+    for i, (topic, group) in enumerate(pairs):
+        cache.put(f"{topic} per {group} in {2000 + i}", "SELECT 1", 0)
+
+    topic, group = pairs[-1]
+    asked = {
+        "rephrased hit": f"Show me the {topic} per {group} in {2000 + args.size - 1}",
+        "reversed miss": f"{group} per {topic} in {2000 + args.size - 1}",
+        "unknown miss": "average temperature in NYC",
+    }
+    print(f"{args.size} cached questions, {args.repeat} lookups per question")
+    for label, question in asked.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            hit = cache.get(question, 0)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"  {label:<14} {elapsed * 1e6:8.1f} µs  {'hit' if hit else 'miss'}")
+
+
+if __name__ == "__main__":
+    main()
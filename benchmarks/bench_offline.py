@@ -0,0 +1,448 @@
+"""
+Offline benchmark suite: every template measured end to end, without Dremio and without an LLM.
+
+A local Arrow Flight server backed by DuckDB (flight_server.py) stands in for Dremio, with
+synthetic catalogs and tables. A deterministic LLM replays the recorded agent traces in
+agent_traces.json: for each question, the same SQL steps and the same final answer. Every target
+runs in its own process, since v1, v2 and v3 have modules with the same names:
+
+- v1:  `DremioQueryTool`, and a ReAct agent using it
+- v2, v3: `DremioSQLDatabase`, and the SQL agent built by `AgentFactory`
+- app: the v3 Flask app, questions sent to `POST /` over HTTP
+
+Metrics (times are medians in milliseconds, `_per_s` metrics are throughputs):
+
+- `startup_ms`: building the connection, schema, LLM and agent
+- `schema_load_ms` / `schema_snapshot_ms`: schema loaded from INFORMATION_SCHEMA / from a snapshot file
+- `rewrite_per_s` / `prepare_per_s`: agent queries rewritten / validated and rewritten per second
+- `query_arrow_ms`, `query_rows_ms`, `query_pandas_ms`, `query_render_ms`: a `--result-rows` x
+  12 columns result read as Arrow, as Python rows, as a DataFrame, and rendered for the LLM
+- `question_cold_ms` / `question_warm_ms`: a question asked for the first time / asked again
+- `answers_per_s`: answers per second with `--clients` concurrent clients (app only)
+
+The v2 and v3 runs also check that the analytics tool's compiled SQL reaches the stand-in
+unchanged (`ANALYTICS_REQUESTS`), and the script exits with status 1 when it does not.
+
+The results are written as JSON with `--output`. With `--baseline`, the run is compared with
+an earlier result file, and the script exits with status 1 when a metric got worse by more
+than `--tolerance`.
+
+    python benchmarks/bench_offline.py --output results.json
+    python benchmarks/bench_offline.py --targets v2 v3 --baseline results.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import warnings
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TARGETS = ["v1", "v2", "v3", "app"]
+FOLDERS = {"v1": "v1", "v2": "v2", "v3": "v3", "app": "v3"}
+TRACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_traces.json")
+
+# 🔹 Wide result used for the conversion metrics (12 columns of the filler tables)
+WIDE_QUERY = "SELECT * FROM space_0.table_0 LIMIT {rows}"
+
+# 🔹 Analytics tool requests (v2, v3) whose compiled SQL must reach Dremio unchanged, apart from
+# the qualified table name. Casts keep their type unquoted (`CAST(x AS TIMESTAMP)`), since
+# Dremio reads a quoted type as an unknown user-defined type and DuckDB accepts both.
+ANALYTICS_REQUESTS = [
+    {"operation": "aggregate", "table": "demo.orders", "metrics": ["sum(amount)", "count(*)"], "filters": [["order_date", ">=", "2024-03-01"]]},
+    {"operation": "group_by", "table": "demo.orders", "group_by": ["region"], "metrics": ["avg(amount)"], "limit": 10},
+    {"operation": "group_by", "table": "demo.orders", "group_by": ["region"], "metrics": [{"fn": "max", "column": "order_date", "type": "date", "as": "last_day"}, {"fn": "min", "column": "order_date", "type": "timestamp", "as": "first_time"}]},
+    {"operation": "top_k", "table": "demo.orders", "group_by": ["product"], "by": "sum(amount)", "k": 3},
+    {"operation": "histogram", "table": "demo.orders", "column": "amount", "bins": 5},
+    {"operation": "time_bucket", "table": "demo.orders", "column": "order_date", "unit": "month", "metrics": ["count(*)"]},
+    {"operation": "time_bucket", "table": "demo.orders", "column": "order_date", "unit": "day", "metrics": ["sum(amount)"], "filters": [["order_date", "<", "2024-02-01"]]},
+]
+
+# Settings read by the templates at import time: connect to the stand-in, never to a .env's server
+ENVIRONMENT = {
+    "DREMIO_ENVIRONMENT": "cloud",
+    "DREMIO_TOKEN": "offline-benchmark",
+    "DREMIO_SCHEMA_SNAPSHOT": "",
+    "DREMIO_LAZY_SCHEMA": "false",
+    "DREMIO_TABLE_DESCRIPTIONS": "",
+    "DREMIO_RESULT_CACHE_DIR": "",
+    "DREMIO_MAX_SCAN_ROWS": "0",
+    "OPENAI_API_KEY": "offline-benchmark",
+}
+
+
+class ReplayLLM(LLM):
+    """
+    Replays recorded agent traces. The question is found in the prompt, and the number of
+    observations after it tells which step comes next: the step's SQL as a tool call, or the
+    final answer once every step ran. A prompt without tool instructions (the answer-cache
+    prompt) gets the final answer right away. Every call takes `latency` seconds.
+    """
+
+    traces: List[Dict[str, Any]]
+    tool: str = "sql_db_query"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        for trace in self.traces:
+            position = prompt.rfind(trace["question"])
+            if position >= 0:
+                break
+        else:
+            raise ValueError("No recorded trace matches the prompt.")
+
+        step = prompt.count("Observation:", position)
+        if "Action Input" in prompt and step < len(trace["steps"]):
+            text = f"Thought: {trace['steps'][step]['thought']}\nAction: {self.tool}\nAction Input: {trace['steps'][step]['sql']}"
+        else:
+            text = f"Thought: I now know the final answer\nFinal Answer: {trace['answer']}"
+        if self.latency:
+            time.sleep(self.latency)
+        return text
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    """Seconds taken by each of `repeat` calls of `fn`."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def median_ms(durations: List[float]) -> float:
+    return round(statistics.median(durations) * 1000, 3)
+
+
+def per_second(fn: Callable[[str], Any], items: List[str], repeat: int) -> float:
+    """Calls of `fn` per second over `repeat` passes through `items`."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return round(repeat * len(items) / (time.perf_counter() - start), 1)
+
+
+def ask(run: Callable[[str], str], traces: List[Dict[str, Any]], repeat: int) -> Dict[str, float]:
+    """Asks every recorded question `repeat` times and checks the answers."""
+    cold, warm = [], []
+    for attempt in range(repeat):
+        for trace in traces:
+            start = time.perf_counter()
+            answer = run(trace["question"])
+            (cold if attempt == 0 else warm).append(time.perf_counter() - start)
+            if trace["answer"] not in str(answer):
+                raise RuntimeError(f"Unexpected answer to {trace['question']!r}: {answer!r}")
+    results = {"question_cold_ms": median_ms(cold)}
+    if warm:
+        results["question_warm_ms"] = median_ms(warm)
+    return results
+
+
+def span_medians() -> Dict[str, float]:
+    """Median duration in milliseconds of every span recorded by `telemetry.metrics`."""
+    from telemetry import metrics
+
+    histograms = metrics.snapshot()["histograms"]
+    return {name[:-len("_seconds")]: round(values["p50"] * 1000, 3) for name, values in sorted(histograms.items()) if name.endswith("_seconds")}
+
+
+# 🔹 Targets (each runs in its own worker process)
+
+
+def bench_v1(args, traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from langchain.agents import AgentType, Tool, initialize_agent
+    from dremio_langchain_tool import DremioQueryTool
+    from result_cache import ResultCache
+
+    results: Dict[str, Any] = {}
+    start = time.perf_counter()
+    tool = DremioQueryTool(mode="cloud")
+    llm = ReplayLLM(traces=traces, tool=tool.name, latency=args.llm_latency)
+    agent = initialize_agent([Tool(name=tool.name, func=tool.run, description=tool.description)], llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, handle_parsing_errors=True)
+    results["startup_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    # ✅ No result cache and a row budget above the result size, so every call reads and converts everything
+    uncached = DremioQueryTool(mode="cloud", result_cache=ResultCache(ttl=0))
+    uncached.row_budget = args.result_rows
+    wide = WIDE_QUERY.format(rows=args.result_rows)
+    results["query_arrow_ms"] = median_ms(timed(lambda: uncached.connection.toArrow(wide).read_all(), args.repeat))
+    results["query_render_ms"] = median_ms(timed(lambda: uncached.run(wide), args.repeat))
+
+    results.update(ask(agent.run, traces, args.repeat))
+    return {"metrics": results}
+
+
+def bench_database(args, traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from connection import create_dremio_connection
+    from DremioSQLDatabase import DremioSQLDatabase
+    from result_cache import ResultCache
+    from telemetry import metrics
+
+    connection = create_dremio_connection()
+    results: Dict[str, Any] = {}
+
+    results["schema_load_ms"] = median_ms(timed(lambda: DremioSQLDatabase(connection), args.repeat))
+    with tempfile.TemporaryDirectory() as folder:
+        snapshot = os.path.join(folder, "schema.arrow")
+        DremioSQLDatabase(connection, schema_snapshot_path=snapshot)
+        results["schema_snapshot_ms"] = median_ms(timed(lambda: DremioSQLDatabase(connection, schema_snapshot_path=snapshot, refresh_snapshot=False), args.repeat))
+
+    # ✅ No result or rewrite cache and no automatic LIMIT, so every call does the full work
+    db = DremioSQLDatabase(connection, result_cache=ResultCache(ttl=0), rewrite_cache_size=0, query_limit=None, row_budget=args.result_rows)
+    queries = [step["sql"] for trace in traces for step in trace["steps"]]
+    results["rewrite_per_s"] = per_second(lambda query: db._rewriter.rewrite(query, None), queries, 200)
+    results["prepare_per_s"] = per_second(lambda query: db._prepare_query(query, None), queries, 200)
+    failed = check_analytics_sql(db)
+
+    wide = WIDE_QUERY.format(rows=args.result_rows)
+    results["query_arrow_ms"] = median_ms(timed(lambda: db.run_arrow(wide), args.repeat))
+    results["query_rows_ms"] = median_ms(timed(lambda: db.run(wide), args.repeat))
+    results["query_pandas_ms"] = median_ms(timed(lambda: db.run(wide, fetch="cursor").to_pandas(), args.repeat))
+    rendered = DremioSQLDatabase(connection, result_cache=ResultCache(ttl=0), query_limit=None, row_budget=args.result_rows, token_budget=4000)
+    results["query_render_ms"] = median_ms(timed(lambda: rendered.run(wide), args.repeat))
+
+    metrics.reset()
+    factory = replay_factory(args, traces)
+    start = time.perf_counter()
+    factory.agent
+    results["startup_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    results.update(ask(factory.run, traces, args.repeat))
+    return {"metrics": results, "spans": span_medians(), "failed_checks": failed}
+
+
+def check_analytics_sql(db) -> List[str]:
+    """
+    Compiles `ANALYTICS_REQUESTS`, prepares each query as `DremioSQLDatabase.run` does and runs it.
+
+    Returns:
+        List[str]: The requests whose final SQL differs from the compiled SQL (besides the
+        qualified table name) or that failed to run.
+    """
+    from analytics import compile_request
+
+    failed = []
+    for request in ANALYTICS_REQUESTS:
+        sql = compile_request(request)
+        final, _ = db._prepare_query(sql, None)
+        label = f"analytics {request['operation']}"
+        if final != sql.replace("FROM demo.orders", 'FROM "demo"."orders"'):
+            failed.append(f"{label}: sent {final!r} for {sql!r}")
+            continue
+        output = str(db.run(sql))
+        if output.startswith("Error"):
+            failed.append(f"{label}: {output}")
+    return failed
+
+
+def bench_app(args, traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import logging
+    from werkzeug.serving import make_server
+    from serving import create_app
+    from telemetry import metrics
+
+    factory = replay_factory(args, traces)
+    start = time.perf_counter()
+    factory.agent
+    results: Dict[str, Any] = {"startup_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    app = create_app(factory.run, workers=args.clients, max_pending=4 * args.clients, deadline=120)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    def post(question: str) -> str:
+        with urllib.request.urlopen(url, data=urllib.parse.urlencode({"question": question}).encode()) as response:
+            return json.load(response)["response"]
+
+    metrics.reset()
+    results.update(ask(post, traces, args.repeat))
+
+    # ✅ Concurrent clients, each asking every question once more
+    def client():
+        for trace in traces:
+            post(trace["question"])
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results["answers_per_s"] = round(args.clients * len(traces) / (time.perf_counter() - start), 1)
+    server.shutdown()
+    return {"metrics": results, "spans": span_medians()}
+
+
+def replay_factory(args, traces: List[Dict[str, Any]]):
+    """An `AgentFactory` whose LLM replays the traces instead of calling OpenAI."""
+    from agent import AgentFactory, LLMMetrics
+
+    class ReplayFactory(AgentFactory):
+        @property
+        def llm(self):
+            with self._lock:
+                if self._llm is None:
+                    self._llm = ReplayLLM(traces=traces, latency=args.llm_latency, callbacks=[LLMMetrics()])
+                return self._llm
+
+    return ReplayFactory()
+
+
+BENCHMARKS = {"v1": bench_v1, "v2": bench_database, "v3": bench_database, "app": bench_app}
+
+
+def run_worker(args, traces: List[Dict[str, Any]]) -> None:
+    """Measures one target against the running stand-in and writes its results to `--worker-output`."""
+    os.environ.update(ENVIRONMENT, DREMIO_URI=args.location)
+    sys.path.insert(0, os.path.join(ROOT, FOLDERS[args.worker]))
+    warnings.simplefilter("ignore", DeprecationWarning)  # LangChain's notices about `Chain.run` and `initialize_agent`
+    with contextlib.redirect_stdout(io.StringIO()):  # ✅ Keep the agents' verbose output out of the report
+        results = BENCHMARKS[args.worker](args, traces)
+    with open(args.worker_output, "w") as f:
+        json.dump(results, f)
+
+
+# 🔹 Report
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    targets = list(report["results"])
+    names = sorted({name for result in report["results"].values() for name in result.get("metrics", {})})
+    print(f"{'metric':<22}" + "".join(f"{target:>12}" for target in targets))
+    for name in names:
+        values = [report["results"][target].get("metrics", {}).get(name) for target in targets]
+        print(f"{name:<22}" + "".join(f"{value:>12.2f}" if value is not None else f"{'-':>12}" for value in values))
+    for target in targets:
+        if "error" in report["results"][target]:
+            print(f"⚠️ {target}: {report['results'][target]['error']}")
+        for failure in report["results"][target].get("failed_checks", []):
+            print(f"🛑 {target}: {failure}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compares every metric with the baseline. Times should not grow and throughputs should not
+    shrink by more than `tolerance` (a fraction).
+
+    Returns:
+        List[str]: The regressions, as `target.metric` names.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('git_commit') or 'the baseline'} (tolerance {tolerance:.0%}):")
+    for target, result in report["results"].items():
+        before = baseline.get("results", {}).get(target, {}).get("metrics", {})
+        for name, value in sorted(result.get("metrics", {}).items()):
+            old = before.get(name)
+            if not old:
+                continue
+            change = (value - old) / old
+            worse = -change if name.endswith("_per_s") else change
+            flag = "  ⚠️ regression" if worse > tolerance else ""
+            print(f"  {target:<4} {name:<22} {old:12.2f} → {value:12.2f}  {change:+7.1%}{flag}")
+            if flag:
+                regressions.append(f"{target}.{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS, help="templates to measure")
+    parser.add_argument("--rows", type=int, default=100000, help="rows per synthetic table")
+    parser.add_argument("--schemas", type=int, default=4, help="synthetic filler schemas")
+    parser.add_argument("--tables", type=int, default=25, help="filler tables per schema")
+    parser.add_argument("--columns", type=int, default=12, help="columns per filler table")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stand-in adds to every query")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per replayed LLM call")
+    parser.add_argument("--result-rows", type=int, default=10000, help="rows of the result used for the conversion metrics")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per metric (and times each question is asked)")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent clients for the app throughput")
+    parser.add_argument("--traces", default=TRACES, help="recorded agent traces (JSON)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--worker", choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument("--location", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(args.traces) as f:
+        traces = json.load(f)
+    if args.worker:
+        return run_worker(args, traces)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from flight_server import start_server
+
+    start = time.perf_counter()
+    server, location = start_server(args.rows, args.schemas, args.tables, args.columns, args.latency)
+    print(f"✅ Flight stand-in on {location}, built in {time.perf_counter() - start:.1f}s")
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ("targets", "output", "baseline", "tolerance", "worker", "location", "worker_output")}
+    passed = ["--llm-latency", str(args.llm_latency), "--result-rows", str(args.result_rows), "--repeat", str(args.repeat), "--clients", str(args.clients), "--traces", args.traces]
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for target in args.targets:
+            output = os.path.join(folder, f"{target}.json")
+            print(f"🔹 Measuring {target}...")
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", target, "--location", location, "--worker-output", output] + passed)
+            if completed.returncode != 0:
+                results[target] = {"error": f"worker exited with status {completed.returncode}"}
+                continue
+            with open(output) as f:
+                results[target] = json.load(f)
+    server.shutdown()
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    if any(result.get("failed_checks") for result in results.values()):
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"🛑 {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark for batch execution: independent queries run one after another with `run` compared
+with one `run_many` call, against a stub Dremio that answers each query after a fixed latency.
+
+With N queries of equal latency, the sequential time is about N times the latency and the batch
+time about ceil(N / concurrency) times the latency.
+
+It then checks that `arun` and `arun_many` keep the caller's session: queries awaited inside
+`db.session(...)` must store their results as the session's working sets. The script exits with
+status 1 when they do not.
+
+    python benchmarks/bench_run_many.py --queries 6 --latency 0.2 --concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from async_executor import AsyncQueryExecutor  # noqa: E402
+from DremioSQLDatabase import DremioSQLDatabase  # noqa: E402
+from load_test_app import StubDremio  # noqa: E402
+from working_set import WorkingSetCache  # noqa: E402
+
+
+def check_async_session(latency: float, concurrency: int) -> bool:
+    """Awaits `arun` and `arun_many` inside a session and checks that their results became working sets."""
+    db = DremioSQLDatabase(StubDremio(latency), executor=AsyncQueryExecutor(max_workers=concurrency), working_sets=WorkingSetCache())
+
+    async def ask():
+        with db.session("bench"):
+            await db.arun("SELECT city, temp FROM weather WHERE temp > 30")
+            await db.arun_many(["SELECT city, day FROM weather", "SELECT city FROM weather WHERE temp < 0"])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(ask())
+    stored = db.working_set_stats()["stored"]
+    ok = stored == 3
+    print(f"async session check: {'passed' if ok else 'FAILED'} ({stored} of 3 results kept as working sets)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=6, help="independent queries per batch")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds the stub takes per query")
+    parser.add_argument("--concurrency", type=int, default=4, help="most queries of the batch running at once")
+    args = parser.parse_args()
+
+    db = DremioSQLDatabase(StubDremio(args.latency), executor=AsyncQueryExecutor(max_workers=args.concurrency))
+
+    # ✅ Distinct queries per run, so the result cache never answers them
+    def queries(offset: int):
+        return [f"SELECT city, temp FROM weather WHERE temp > {offset + i}" for i in range(args.queries)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for query in queries(0):
+            db.run(query)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = db.run_many(queries(args.queries), max_concurrency=args.concurrency)
+        batch = time.perf_counter() - start
+
+    print(f"{args.queries} queries, {args.latency * 1000:.0f} ms each, concurrency {args.concurrency}")
+    print(f"  sequential run    {sequential * 1000:8.0f} ms")
+    print(f"  run_many          {batch * 1000:8.0f} ms  ({sequential / batch:.1f}x, {len(results)} results in order)")
+    print()
+    if not check_async_session(args.latency, args.concurrency):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark for the schema loader on a synthetic INFORMATION_SCHEMA.COLUMNS catalog.
+
+Compares the legacy pandas `iterrows` loop with the Arrow loader for a cold load,
+a warm start from the memory-mapped snapshot and an incremental refresh.
+
+    python benchmarks/bench_schema_loader.py --rows 500000
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from schema_loader import SchemaLoader, SchemaSnapshot  # noqa: E402
+
+
+def build_catalog(rows: int, columns_per_table: int = 20, tables_per_schema: int = 100) -> pa.Table:
+    """Builds a synthetic INFORMATION_SCHEMA.COLUMNS table with `rows` rows."""
+    index = pa.array(range(rows), type=pa.int64())
+    table_id = pc.divide(index, columns_per_table)
+    schema_id = pc.divide(table_id, tables_per_schema)
+
+    def labels(prefix, ids):
+        return pc.binary_join_element_wise(prefix, pc.cast(ids, pa.string()), "")
+
+    return pa.table({
+        "TABLE_CATALOG": pa.array(["DREMIO"] * rows, type=pa.string()),
+        "TABLE_SCHEMA": labels("space_", schema_id),
+        "TABLE_NAME": labels("table_", table_id),
+        "COLUMN_NAME": labels("column_", pc.subtract(index, pc.multiply(table_id, columns_per_table))),
+        "ORDINAL_POSITION": pc.cast(pc.add(pc.subtract(index, pc.multiply(table_id, columns_per_table)), 1), pa.int32()),
+    })
+
+
+class SyntheticDremio:
+    """Answers the loader's INFORMATION_SCHEMA queries from an in-memory Arrow table."""
+
+    def __init__(self, catalog: pa.Table):
+        self.catalog = catalog
+        self.queries = 0
+
+    def toArrow(self, query):
+        self.queries += 1
+        if "GROUP BY TABLE_SCHEMA" in query:
+            result = self._fingerprints()
+        elif "WHERE TABLE_SCHEMA IN" in query:
+            schemas = re.findall(r"'((?:[^']|'')*)'", query.split("WHERE", 1)[1])
+            mask = pc.is_in(self.catalog["TABLE_SCHEMA"], value_set=pa.array(schemas, type=pa.string()))
+            result = self.catalog.filter(mask)
+        else:
+            result = self.catalog
+        return pa.RecordBatchReader.from_batches(result.schema, result.to_batches())
+
+    def toPandas(self, query):
+        return self.toArrow(query).read_pandas()
+
+    def _fingerprints(self) -> pa.Table:
+        lengths = pc.add(pc.utf8_length(self.catalog["TABLE_NAME"]), pc.utf8_length(self.catalog["COLUMN_NAME"]))
+        names = pc.binary_join_element_wise(self.catalog["TABLE_NAME"], self.catalog["COLUMN_NAME"], ".")
+        hashes = pa.array(pd.util.hash_array(names.to_numpy(zero_copy_only=False)) % 1000000007, type=pa.int64())  # Dremio: HASH64
+        grouped = self.catalog.append_column("NAME_LENGTH", lengths).append_column("NAME_HASH", hashes).group_by("TABLE_SCHEMA").aggregate([
+            ("TABLE_NAME", "count_distinct"),
+            ("COLUMN_NAME", "count"),
+            ("NAME_LENGTH", "sum"),
+            ("NAME_HASH", "sum"),
+        ])
+        return grouped.select(["TABLE_SCHEMA", "TABLE_NAME_count_distinct", "COLUMN_NAME_count", "NAME_LENGTH_sum", "NAME_HASH_sum"]).rename_columns(
+            ["TABLE_SCHEMA", "TABLE_COUNT", "COLUMN_COUNT", "NAME_LENGTH", "NAME_HASH"]
+        )
+
+
+def rename_column(catalog: pa.Table, schema: str, column: str, new_name: str) -> pa.Table:
+    """The catalog with `column` renamed in every table of `schema`."""
+    changed = pc.if_else(
+        pc.and_(pc.equal(catalog["TABLE_SCHEMA"], schema), pc.equal(catalog["COLUMN_NAME"], column)),
+        new_name, catalog["COLUMN_NAME"],
+    )
+    return catalog.set_column(catalog.schema.get_field_index("COLUMN_NAME"), "COLUMN_NAME", changed)
+
+
+def legacy_load(connection) -> dict:
+    """The original DremioSQLDatabase._load_schema_information loop."""
+    schema_info = {}
+    df = connection.toPandas("SELECT * FROM INFORMATION_SCHEMA.COLUMNS")
+    for _, row in df.iterrows():
+        schema, table, column = row["TABLE_SCHEMA"], row["TABLE_NAME"], row["COLUMN_NAME"]
+        if table not in schema_info:
+            schema_info[table] = {"fully_qualified_name": f'"{schema}"."{table}"', "columns": []}
+        schema_info[table]["columns"].append(column)
+    return schema_info
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:>10.1f} ms")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000, help="Number of INFORMATION_SCHEMA.COLUMNS rows")
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the slow iterrows baseline")
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.rows)
+    dremio = SyntheticDremio(catalog)
+    print(f"Synthetic catalog: {catalog.num_rows} columns, {len(pc.unique(catalog['TABLE_NAME']))} tables\n")
+
+    if not args.skip_legacy:
+        timed("legacy iterrows load", lambda: legacy_load(dremio))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schema.arrow")
+        loader = SchemaLoader(dremio, snapshot_path=path)
+
+        snapshot = timed("arrow cold load + snapshot save", loader.load)
+        timed("build catalog index", snapshot.to_catalog_index)
+        timed("warm start (mmap + fingerprints)", loader.load)
+        print(f"{'snapshot size':<40} {os.path.getsize(path) / 1024:>10.1f} KiB")
+
+        # ✅ Rename one column in one schema, only that schema should be re-read
+        renamed = rename_column(catalog, "space_1", "column_0", "renamed_column")
+        dremio.catalog = renamed
+        refreshed, schemas = timed("incremental refresh (1 schema changed)", lambda: loader.refresh(SchemaSnapshot.load(path)))
+        assert schemas == ["space_1"], schemas
+        assert refreshed.num_tables == snapshot.num_tables
+
+        # ✅ Changes that keep every count and name length: a rename to a name of the same length,
+        # and the last column of table_200 moved to table_201 (column_19 becomes column_20)
+        dremio.catalog = rename_column(catalog, "space_2", "column_1", "column_x")
+        assert loader.refresh(snapshot)[1] == ["space_2"], "same-length rename not detected"
+        last = pc.and_(pc.equal(catalog["TABLE_NAME"], "table_200"), pc.equal(catalog["COLUMN_NAME"], "column_19"))
+        moved = catalog.set_column(catalog.schema.get_field_index("TABLE_NAME"), "TABLE_NAME", pc.if_else(last, "table_201", catalog["TABLE_NAME"]))
+        dremio.catalog = moved.set_column(moved.schema.get_field_index("COLUMN_NAME"), "COLUMN_NAME", pc.if_else(last, "column_20", moved["COLUMN_NAME"]))
+        assert loader.refresh(snapshot)[1] == ["space_2"], "moved column not detected"
+        print("same-length rename and moved column detected")
+
+
+if __name__ == "__main__":
+    main()
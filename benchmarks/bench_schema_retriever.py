@@ -0,0 +1,120 @@
+"""
+Benchmark for the schema retriever on a synthetic catalog with readable table and column names.
+
+Measures building the BM25 index, an incremental re-sync after a few schemas changed compared
+with a full rebuild, search latency, how often a table matching the question (same schema and
+subject) is among the top-k results (recall@k), and the prompt size of the top-k tables compared
+with listing every table name.
+
+    python benchmarks/bench_schema_retriever.py --tables 20000 --top-k 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from catalog_index import CatalogIndex  # noqa: E402
+from schema_retriever import SchemaRetriever  # noqa: E402
+
+DOMAINS = ["sales", "weather", "taxi", "inventory", "marketing", "finance", "hr", "support", "shipping", "web"]
+SUBJECTS = [
+    "orders", "customers", "trips", "stations", "invoices", "payments", "employees", "tickets", "shipments",
+    "sessions", "products", "stores", "campaigns", "budgets", "forecasts", "readings", "drivers", "vendors",
+    "returns", "refunds", "clicks", "leads", "accounts", "warehouses", "carriers", "agents", "regions",
+]
+QUALIFIERS = ["daily", "monthly", "raw", "clean", "summary", "history", "latest", "archive", "staging", "eu", "us", "apac"]
+COLUMNS = [
+    "id", "created_at", "updated_at", "amount", "currency", "city", "country", "temperature", "precipitation",
+    "fare_amount", "tip_amount", "passenger_count", "pickup_time", "dropoff_time", "quantity", "unit_price",
+    "status", "priority", "email", "signup_date", "revenue", "cost", "margin", "clicks", "impressions",
+    "duration_seconds", "rating", "category", "sku", "zip_code", "latitude", "longitude",
+]
+
+
+def build_catalog(tables: int, seed: int = 7) -> CatalogIndex:
+    """Builds a catalog of `tables` tables named like `<domain>_<qualifier>.<subject>_<n>`."""
+    rng = random.Random(seed)
+    catalog = CatalogIndex()
+    for i in range(tables):
+        schema = f"{rng.choice(DOMAINS)}_{rng.choice(QUALIFIERS)}"
+        table = f"{rng.choice(SUBJECTS)}_{i}"
+        catalog.add("DREMIO", schema, table, rng.sample(COLUMNS, rng.randint(4, 16)))
+    return catalog
+
+
+def subject(entry: dict) -> str:
+    return entry["table"].rsplit("_", 1)[0]
+
+
+def question_for(entry: dict, rng: random.Random) -> str:
+    """A question naming the table's subject, schema words and two of its columns (but not the table itself), like a user would."""
+    domain, qualifier = entry["schema"].split("_", 1)
+    first, second = rng.sample(entry["columns"], 2)
+    return f"What is the average {first.replace('_', ' ')} by {second.replace('_', ' ')} in the {qualifier} {domain} {subject(entry)}?"
+
+
+def is_match(result: dict, entry: dict) -> bool:
+    """The synthetic catalog has many tables per schema and subject; any of them with the asked columns answers the question."""
+    return result["schema"] == entry["schema"] and subject(result) == subject(entry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=20000, help="tables in the synthetic catalog")
+    parser.add_argument("--questions", type=int, default=500, help="questions used for recall and latency")
+    parser.add_argument("--top-k", type=int, default=8, help="tables returned per question")
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.tables)
+    entries = list(catalog.entries())
+
+    start = time.perf_counter()
+    retriever = SchemaRetriever()
+    retriever.sync(entries)
+    build = time.perf_counter() - start
+
+    # 🔹 Change the columns of 1% of the tables and drop another 1%, as a schema refresh would
+    rng = random.Random(11)
+    changed = rng.sample(entries, max(1, len(entries) // 100))
+    for entry in changed:
+        entry["columns"] = entry["columns"] + ["loaded_at"]
+    dropped = {entry["fully_qualified_name"] for entry in rng.sample(entries, max(1, len(entries) // 100))}
+    remaining = [entry for entry in entries if entry["fully_qualified_name"] not in dropped]
+
+    start = time.perf_counter()
+    indexed, removed = retriever.sync(remaining)
+    incremental = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SchemaRetriever().sync(remaining)
+    rebuild = time.perf_counter() - start
+
+    hits = 0
+    latencies = []
+    prompt_chars = 0
+    for entry in rng.sample(remaining, min(args.questions, len(remaining))):
+        question = question_for(entry, rng)
+        start = time.perf_counter()
+        results = retriever.search(question, k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+        hits += any(is_match(result, entry) for result, _ in results)
+        prompt_chars += sum(len(result["fully_qualified_name"]) + len(", ".join(result["columns"])) + 4 for result, _ in results)
+
+    latencies.sort()
+    listing_chars = len(", ".join(catalog.display_name(entry) for entry in remaining))
+    print(f"{len(remaining)} tables, {retriever.stats()['terms']} terms, top-{args.top_k}")
+    print(f"  build index               {build * 1000:10.1f} ms")
+    print(f"  incremental sync          {incremental * 1000:10.1f} ms  ({indexed} re-indexed, {removed} removed)")
+    print(f"  full rebuild              {rebuild * 1000:10.1f} ms")
+    print(f"  search p50                {latencies[len(latencies) // 2] * 1000:10.2f} ms")
+    print(f"  search p99                {latencies[int(len(latencies) * 0.99)] * 1000:10.2f} ms")
+    print(f"  recall@{args.top_k:<3}                {hits / len(latencies):10.1%}")
+    print(f"  prompt, all table names   {listing_chars // 4:10d} tokens (approx.)")
+    print(f"  prompt, top-{args.top_k} + columns    {prompt_chars // len(latencies) // 4:10d} tokens (approx.)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Microbenchmark for the SQL rewrite pipeline on large, LLM-style queries with many CTEs.
+
+Compares the legacy split()/join() passes (table qualification, keyword quoting and one
+str.replace per parameter) with the single-pass tokenizer in sql_rewriter.py. Before timing,
+the keyword quoting is checked on the `CHECKS` cases, and the script exits with status 1 when
+one of them fails.
+
+    python benchmarks/bench_sql_rewriter.py --size-kb 128
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from catalog_index import CatalogIndex  # noqa: E402
+from sql_rewriter import (  # noqa: E402
+    KeywordQuotingRule, ParameterBindingRule, SQLRewriter, TableQualificationRule, sql_literal,
+)
+
+KEYWORDS = {"date", "timestamp", "user", "group", "order", "offset", "join"}
+
+CTE_TEMPLATE = """cte_{i} AS (
+    -- step {i}: daily aggregates for table_{table}
+    SELECT station, "name", date, tempmax, tempmin,
+           AVG(tempmax) OVER (PARTITION BY station ORDER BY date) AS avg_max_{i},
+           EXTRACT(YEAR FROM date) AS yr
+    FROM table_{table} t
+    JOIN stations s ON s.station = t.station
+    WHERE date >= DATE '2020-01-01'
+      AND note <> 'from table_{table} join stations where user = 1'
+      AND station = :station AND tempmax > :min_temp
+    GROUP BY station, "name", date, tempmax, tempmin
+)"""
+
+
+# 🔹 Keyword quoting cases: (query, expected rewrite). Type names of casts must stay unquoted,
+# since Dremio reads a quoted type as an unknown user-defined type (DuckDB accepts both).
+CHECKS = [
+    ("SELECT CAST(ts AS TIMESTAMP), CAST(y AS DATE) FROM t", "SELECT CAST(ts AS TIMESTAMP), CAST(y AS DATE) FROM t"),
+    ("SELECT ts::TIMESTAMP, y :: date FROM t", "SELECT ts::TIMESTAMP, y :: date FROM t"),
+    ("SELECT TRY_CAST(date AS date) AS date FROM t", 'SELECT TRY_CAST("date" AS date) AS "date" FROM t'),
+    ("SELECT CAST(CONCAT(a, ')') AS DATE) FROM t ORDER BY date", "SELECT CAST(CONCAT(a, ')') AS DATE) FROM t ORDER BY \"date\""),
+    ("SELECT x AS timestamp FROM t WHERE date >= DATE '2024-01-01'", 'SELECT x AS "timestamp" FROM t WHERE "date" >= DATE \'2024-01-01\''),
+    ("SELECT DATE_TRUNC('month', CAST(date AS TIMESTAMP)) AS bucket FROM t", 'SELECT DATE_TRUNC(\'month\', CAST("date" AS TIMESTAMP)) AS bucket FROM t'),
+]
+
+
+def check_rewrites() -> bool:
+    """Runs the keyword quoting on `CHECKS` and prints every mismatch."""
+    rewriter = SQLRewriter([KeywordQuotingRule(KEYWORDS)])
+    ok = True
+    for query, expected in CHECKS:
+        rewritten = rewriter.rewrite(query)
+        if rewritten != expected:
+            ok = False
+            print(f"❌ {query}\n   got:      {rewritten}\n   expected: {expected}")
+    print(f"keyword quoting checks:    {'passed' if ok else 'FAILED'} ({len(CHECKS)} cases)\n")
+    return ok
+
+
+def build_query(size_kb: int) -> str:
+    """Builds a query of at least `size_kb` KiB made of chained CTEs."""
+    ctes, size, i = [], 0, 0
+    while size < size_kb * 1024:
+        cte = CTE_TEMPLATE.format(i=i, table=i % 50)
+        ctes.append(cte)
+        size += len(cte)
+        i += 1
+    joins = "\n".join(f"JOIN cte_{j} c{j} ON c{j}.station = c0.station" for j in range(1, min(i, 20)))
+    return f"WITH {','.join(ctes)}\nSELECT c0.station, c0.date, c0.avg_max_0\nFROM cte_0 c0\n{joins}\nORDER BY c0.date LIMIT 100"
+
+
+def build_catalog(tables: int = 50) -> CatalogIndex:
+    index = CatalogIndex()
+    for i in range(tables):
+        index.add("DREMIO", f"space_{i % 5}", f"table_{i}", ["station", "name", "date", "tempmax", "tempmin", "note"])
+    index.add("DREMIO", "reference", "stations", ["station", "name"])
+    return index
+
+
+def legacy_rewrite(query: str, schema_info: dict, parameters: dict) -> str:
+    """The original three passes from DremioSQLDatabase.run."""
+    words = query.split()
+    for i, word in enumerate(words):
+        clean_table_name = word.strip("\"'")
+        if clean_table_name in schema_info:
+            words[i] = schema_info[clean_table_name]
+    query = " ".join(words)
+
+    words = query.split()
+    for i, word in enumerate(words):
+        clean_word = word.strip("\"'")
+        if clean_word.lower() in KEYWORDS and not word.startswith('"'):
+            words[i] = f'"{clean_word}"'
+    query = " ".join(words)
+
+    for key, value in parameters.items():
+        query = query.replace(f":{key}", sql_literal(value))
+    return query
+
+
+def bench(label: str, fn, size: int, repeat: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<28} {elapsed * 1000:>9.2f} ms/query {size / elapsed / 1024 / 1024:>8.2f} MiB/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, default=128, help="Minimum query size in KiB")
+    parser.add_argument("--repeat", type=int, default=20, help="Rewrites per measurement")
+    args = parser.parse_args()
+
+    if not check_rewrites():
+        sys.exit(1)
+
+    query = build_query(args.size_kb)
+    parameters = {"station": "USW00094728", "min_temp": 30}
+    index = build_catalog()
+    legacy_schema = {entry["table"]: entry["fully_qualified_name"] for entry in index.entries()}
+
+    def resolve(reference):
+        entry = index.resolve(reference)
+        return entry["fully_qualified_name"] if entry else None
+
+    rewriter = SQLRewriter([TableQualificationRule(resolve), KeywordQuotingRule(KEYWORDS), ParameterBindingRule()])
+
+    print(f"Query: {len(query) / 1024:.0f} KiB, {query.count(' AS (')} CTEs\n")
+    legacy = bench("legacy split/join passes", lambda: legacy_rewrite(query, legacy_schema, parameters), len(query), args.repeat)
+    single = bench("single-pass tokenizer", lambda: rewriter.rewrite(query, parameters), len(query), args.repeat)
+    print(f"\nspeedup: {legacy / single:.2f}x")
+
+    rewritten = rewriter.rewrite(query, parameters)
+    print(f"string literals preserved: {query.count('from table_1 join stations') == rewritten.count('from table_1 join stations')}")
+    print(f"line breaks preserved:     {query.count(chr(10)) == rewritten.count(chr(10))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmark for the telemetry layer: the time a query thread spends per log call and per span.
+
+Output goes to a stream whose writes take `--write-latency` seconds, like a busy terminal, a
+full pipe or a slow log collector. A `print` waits for the write. A logged line only waits to
+be queued, and the background thread does the writing. Per-query lines are logged at DEBUG, so
+with the default INFO level they cost only the level check.
+
+    python benchmarks/bench_telemetry.py --repeat 2000 --write-latency 0.0002
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from telemetry import configure_logging, get_logger, span  # noqa: E402
+
+QUERY = 'SELECT city, AVG(temp) FROM "demo"."weather" GROUP BY city'
+
+
+class SlowStream:
+    """Text stream whose every write takes `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def timed(repeat: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per measurement")
+    parser.add_argument("--write-latency", type=float, default=0.0002, help="seconds each write to the output takes")
+    args = parser.parse_args()
+
+    stream = SlowStream(args.write_latency)
+    configure_logging("INFO", "json", stream=stream)
+    log = get_logger("bench")
+
+    def empty_span():
+        with span("bench"):
+            pass
+
+    results = {
+        "log.debug (off)": timed(args.repeat, lambda: log.debug("✅ Final Query Sent to Dremio: %s", QUERY)),
+        "span": timed(args.repeat, empty_span),
+    }
+    with contextlib.redirect_stdout(stream):
+        results["print"] = timed(args.repeat, lambda: print("✅ Final Query Sent to Dremio:", QUERY))
+    results["log.info (queued)"] = timed(args.repeat, lambda: log.info("✅ Final Query Sent to Dremio: %s", QUERY))
+
+    print(f"{args.repeat} calls each, {args.write_latency * 1e6:.0f} µs per write")
+    for label, seconds in results.items():
+        print(f"  {label:<20} {seconds * 1e6:10.2f} µs per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Local Arrow Flight stand-in for Dremio, backed by an in-memory DuckDB database with synthetic data.
+
+It speaks the part of the Flight protocol the templates use. `get_flight_info` runs the SQL
+command and returns a ticket for its result, and `do_get` streams that result as record
+batches. INFORMATION_SCHEMA columns come back in upper case like Dremio's. The bearer token is
+accepted without any check, so the templates connect to it in `cloud` mode with any token.
+
+The catalog has a fixed `demo` schema used by the recorded agent traces (`orders`, `customers`)
+and `--schemas` x `--tables` filler tables of `--columns` columns, all with `--rows` rows.
+`sys.reflections` lists two reflections on the demo tables like Dremio's system table, so
+reflection routing and the reflection report can be tried (nothing is actually accelerated).
+
+    python benchmarks/flight_server.py --port 32010 --rows 100000
+    # then: DREMIO_ENVIRONMENT=cloud DREMIO_URI=grpc://127.0.0.1:32010 DREMIO_TOKEN=local python v2/run.py
+"""
+import argparse
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import duckdb
+import pyarrow as pa
+from pyarrow import flight
+
+# 🔹 Tables the recorded agent traces query
+DEMO_TABLES = {
+    "orders": """
+        SELECT range AS order_id,
+               range % 5000 AS customer_id,
+               ['north', 'south', 'east', 'west'][range % 4 + 1] AS region,
+               ['laptop', 'phone', 'tablet', 'monitor', 'keyboard'][range % 5 + 1] AS product,
+               ROUND(((range * 7919) % 100000) / 100.0, 2) AS amount,
+               DATE '2024-01-01' + CAST(range % 366 AS INTEGER) AS order_date
+        FROM range({rows})
+    """,
+    "customers": """
+        SELECT range AS customer_id,
+               'customer_' || range AS name,
+               ['consumer', 'corporate', 'home office'][range % 3 + 1] AS segment,
+               ['US', 'DE', 'FR', 'JP', 'BR'][range % 5 + 1] AS country
+        FROM range(5000)
+    """,
+}
+
+# 🔹 Rows of `sys.reflections`, with the columns of Dremio's system table that the templates read
+REFLECTIONS = """
+    SELECT * FROM (VALUES
+        ('r-orders-agg', 'orders_by_region', 'AGGREGATION', 'CAN_ACCELERATE', 'd-orders', 'demo.orders', 'PHYSICAL_DATASET', NULL, 'region, product', 'amount'),
+        ('r-customers-raw', 'customers_raw', 'RAW', 'CAN_ACCELERATE', 'd-customers', 'demo.customers', 'PHYSICAL_DATASET', 'customer_id, segment, country', NULL, NULL)
+    ) AS reflections(reflection_id, reflection_name, type, status, dataset_id, dataset_name, dataset_type, display_columns, dimensions, measures)
+"""
+
+# Column expressions of the filler tables, cycled through by column position
+FILLER_COLUMNS = [
+    "range AS id_{i}",
+    "(range * 31) % 1000 AS metric_{i}",
+    "ROUND(((range * 7) % 10000) / 7.0, 3) AS value_{i}",
+    "'label_' || (range % 97) AS label_{i}",
+    "DATE '2020-01-01' + CAST(range % 1500 AS INTEGER) AS day_{i}",
+]
+
+
+def build_catalog(rows: int = 100000, schemas: int = 4, tables: int = 25, columns: int = 12) -> duckdb.DuckDBPyConnection:
+    """
+    Creates the synthetic catalog in a new in-memory DuckDB database.
+
+    Args:
+        rows (int): Rows of `demo.orders` and of every filler table.
+        schemas (int): Filler schemas (`space_0`, `space_1`, ...).
+        tables (int): Filler tables per schema.
+        columns (int): Columns per filler table.
+
+    Returns:
+        duckdb.DuckDBPyConnection: The database connection.
+    """
+    db = duckdb.connect()
+    db.execute("CREATE MACRO hash64(value) AS hash(value)")  # ✅ Dremio's HASH64, used by the schema fingerprints
+    db.execute("CREATE SCHEMA demo")
+    for name, query in DEMO_TABLES.items():
+        db.execute(f"CREATE TABLE demo.{name} AS {query.format(rows=rows)}")
+
+    db.execute("CREATE SCHEMA sys")
+    db.execute(f"CREATE TABLE sys.reflections AS {REFLECTIONS}")
+
+    select = ", ".join(FILLER_COLUMNS[i % len(FILLER_COLUMNS)].format(i=i) for i in range(columns))
+    for s in range(schemas):
+        db.execute(f"CREATE SCHEMA space_{s}")
+        for t in range(tables):
+            db.execute(f"CREATE TABLE space_{s}.table_{t} AS SELECT {select} FROM range({rows})")
+    return db
+
+
+class DuckDBFlightServer(flight.FlightServerBase):
+    """
+    Flight server answering SQL commands from DuckDB. Like Dremio, the query runs when the
+    client asks for the flight info, and `do_get` streams the result held under the ticket.
+    """
+
+    def __init__(self, database: duckdb.DuckDBPyConnection, location: str = "grpc://127.0.0.1:0", latency: float = 0.0):
+        """
+        Args:
+            database (duckdb.DuckDBPyConnection): Database holding the catalog.
+            location (str): Address to listen on (port 0 picks a free port).
+            latency (float): Seconds added to every query, like Dremio's planning time.
+        """
+        super().__init__(location)
+        self.database = database
+        self.latency = latency
+        self.queries = 0
+        self._results: Dict[bytes, Tuple[duckdb.DuckDBPyConnection, pa.RecordBatchReader]] = {}
+        self._lock = threading.Lock()
+
+    def get_flight_info(self, context, descriptor):
+        query = descriptor.command.decode("utf-8")
+        if self.latency:
+            time.sleep(self.latency)
+
+        # ✅ One cursor per query: a DuckDB connection must not be shared between threads
+        cursor = self.database.cursor()
+        try:
+            reader = cursor.execute(query).to_arrow_reader()
+        except duckdb.Error as e:
+            cursor.close()
+            raise flight.FlightServerError(str(e))
+        if "INFORMATION_SCHEMA" in query.upper():
+            reader = _upper_case_names(reader)
+
+        ticket = uuid.uuid4().hex.encode()
+        with self._lock:
+            self.queries += 1
+            self._results[ticket] = (cursor, reader)
+        endpoint = flight.FlightEndpoint(ticket, [])
+        return flight.FlightInfo(reader.schema, descriptor, [endpoint], -1, -1)
+
+    def do_get(self, context, ticket):
+        with self._lock:
+            cursor, reader = self._results.pop(ticket.ticket)
+
+        def batches():
+            try:
+                yield from reader
+            finally:
+                cursor.close()
+
+        return flight.GeneratorStream(reader.schema, batches())
+
+
+def _upper_case_names(reader: pa.RecordBatchReader) -> pa.RecordBatchReader:
+    """Renames the result columns to upper case, as Dremio names INFORMATION_SCHEMA columns."""
+    schema = pa.schema([field.with_name(field.name.upper()) for field in reader.schema])
+    return pa.RecordBatchReader.from_batches(schema, (pa.RecordBatch.from_arrays(batch.columns, schema=schema) for batch in reader))
+
+
+def start_server(rows: int = 100000, schemas: int = 4, tables: int = 25, columns: int = 12, latency: float = 0.0, port: int = 0) -> Tuple[DuckDBFlightServer, str]:
+    """
+    Builds the catalog and serves it on a background thread.
+
+    Returns:
+        Tuple[DuckDBFlightServer, str]: The server (stop it with `shutdown`) and its grpc:// location.
+    """
+    server = DuckDBFlightServer(build_catalog(rows, schemas, tables, columns), f"grpc://127.0.0.1:{port}", latency)
+    threading.Thread(target=server.serve, name="flight-server", daemon=True).start()
+    return server, f"grpc://127.0.0.1:{server.port}"
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=32010, help="port to listen on")
+    parser.add_argument("--rows", type=int, default=100000, help="rows per table")
+    parser.add_argument("--schemas", type=int, default=4, help="filler schemas")
+    parser.add_argument("--tables", type=int, default=25, help="filler tables per schema")
+    parser.add_argument("--columns", type=int, default=12, help="columns per filler table")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every query")
+    args = parser.parse_args(argv)
+
+    server, location = start_server(args.rows, args.schemas, args.tables, args.columns, args.latency, args.port)
+    print(f"✅ Serving {1 + args.schemas} schemas and {2 + args.schemas * args.tables} tables on {location} (Ctrl+C to stop)")
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Load test for the v3 Flask serving mode with a stubbed LLM and a stubbed Dremio.
+
+Starts the app from serving.py on a local port with a real LangChain SQL agent and
+DremioSQLDatabase. The LLM is scripted and answers after a fixed delay, and Dremio is an
+in-memory Arrow source with its own delay. Concurrent clients then send questions, and the
+script reports throughput, p50/p95/p99 latency and how many requests were rejected (429) or
+expired (504). In `stream` mode it also reports the time until the first agent step arrives
+over Server-Sent Events.
+
+    python benchmarks/load_test_app.py --clients 16 --requests 200 --workers 4 --queue 16
+    python benchmarks/load_test_app.py --clients 64 --queue 8      # overload: expect 429s
+    python benchmarks/load_test_app.py --mode poll --llm-latency 0.5
+    python benchmarks/load_test_app.py --mode stream --llm-latency 1
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, List, Optional, Tuple
+
+import pyarrow as pa
+from langchain_community.agent_toolkits.sql.base import create_sql_agent
+from langchain_core.language_models.llms import LLM
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v3"))
+
+from DremioSQLDatabase import DremioSQLDatabase  # noqa: E402
+from serving import create_app  # noqa: E402
+from telemetry import metrics  # noqa: E402
+
+# 🔹 Marker value in the stub query result, so the scripted LLM knows the query has run
+STUB_CITY = "STUB_CITY"
+
+
+class StubDremio:
+    """Answers INFORMATION_SCHEMA queries with a one-table catalog and every other query with a small result."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def toArrow(self, query: str):
+        with self._lock:
+            self.queries += 1
+        if "GROUP BY TABLE_SCHEMA" in query:
+            result = pa.table({"TABLE_SCHEMA": ["demo"], "TABLE_COUNT": [1], "COLUMN_COUNT": [3], "NAME_LENGTH": [34], "NAME_HASH": [0]})
+        elif "INFORMATION_SCHEMA" in query:
+            result = pa.table({
+                "TABLE_CATALOG": ["DREMIO"] * 3,
+                "TABLE_SCHEMA": ["demo"] * 3,
+                "TABLE_NAME": ["weather"] * 3,
+                "COLUMN_NAME": ["city", "day", "temp"],
+                "ORDINAL_POSITION": pa.array([1, 2, 3], type=pa.int32()),
+            })
+        else:
+            time.sleep(self.latency)
+            result = pa.table({"city": [STUB_CITY, "NYC"], "avg_temp": [21.5, 18.25]})
+        return pa.RecordBatchReader.from_batches(result.schema, result.to_batches())
+
+
+class ScriptedLLM(LLM):
+    """
+    Runs one SQL query, then answers. Every call takes `latency` seconds like a remote model,
+    and the answer is streamed word by word over that time.
+    """
+
+    latency: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        if STUB_CITY in prompt:
+            text = "Thought: I now know the final answer\nFinal Answer: The average temperature in NYC is 18.25."
+        else:
+            text = "Thought: I should query the weather table.\nAction: sql_db_query\nAction Input: SELECT city, AVG(temp) AS avg_temp FROM weather GROUP BY city"
+
+        tokens = text.split(" ")
+        for i, token in enumerate(tokens):
+            time.sleep(self.latency / len(tokens))
+            if run_manager:
+                run_manager.on_llm_new_token(token if i == 0 else " " + token)
+        return text
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+def send(base_url: str, mode: str, deadline: float) -> Tuple[int, Optional[float]]:
+    """Sends one question and returns the final HTTP status and, when streaming, when the first agent step arrived."""
+    body = urllib.parse.urlencode({"question": "What is the average temperature in NYC?", "deadline": deadline}).encode()
+    final = {"done": 200, "failed": 500, "expired": 504}
+    try:
+        if mode == "sync":
+            with urllib.request.urlopen(f"{base_url}/", data=body) as response:
+                return response.status, None
+
+        with urllib.request.urlopen(f"{base_url}/jobs", data=body) as response:
+            job = json.load(response)
+
+        if mode == "stream":
+            first_step = None
+            with urllib.request.urlopen(base_url + job["events_url"]) as response:
+                for line in response:
+                    if not line.startswith(b"data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if first_step is None and event["type"] in ("sql", "action"):
+                        first_step = time.perf_counter()
+                    if event["type"] in final:
+                        return final[event["type"]], first_step
+            return 500, first_step
+
+        while True:
+            with urllib.request.urlopen(f"{base_url}{job['status_url']}?wait=10") as response:
+                state = json.load(response)
+            if state["status"] in final:
+                return final[state["status"]], None
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients (more than workers + queue triggers 429s)")
+    parser.add_argument("--requests", type=int, default=200, help="total requests")
+    parser.add_argument("--workers", type=int, default=4, help="agent worker threads")
+    parser.add_argument("--queue", type=int, default=16, help="admission queue size")
+    parser.add_argument("--deadline", type=float, default=30, help="per-request deadline in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per LLM call (two per request)")
+    parser.add_argument("--dremio-latency", type=float, default=0.05, help="seconds per data query")
+    parser.add_argument("--mode", choices=["sync", "poll", "stream"], default="sync", help="POST / and wait, POST /jobs and poll, or POST /jobs and follow the SSE stream")
+    args = parser.parse_args()
+
+    dremio = StubDremio(args.dremio_latency)
+    db = DremioSQLDatabase(dremio)
+    agent = create_sql_agent(llm=ScriptedLLM(latency=args.llm_latency), db=db, verbose=False, handle_parsing_errors=True)
+    app = create_app(agent.run, workers=args.workers, max_pending=args.queue, deadline=args.deadline)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # No access log per request
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    latencies: List[float] = []
+    first_steps: List[float] = []
+    statuses: dict = {}
+    remaining = [args.requests]
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            status, first_step = send(base_url, args.mode, args.deadline)
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+                if first_step is not None:
+                    first_steps.append(first_step - start)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    with contextlib.redirect_stdout(io.StringIO()):  # ✅ Keep the agent's verbose output out of the report
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+    server.shutdown()
+
+    ideal = args.workers / (2 * args.llm_latency + args.dremio_latency)
+    print(f"{args.requests} requests, {args.clients} clients, {args.workers} workers, queue {args.queue}, mode {args.mode}")
+    print(f"  status codes      {dict(sorted(statuses.items()))}")
+    print(f"  throughput        {len(latencies) / wall:8.2f} answers/s  (ideal {ideal:.2f}/s)")
+    print(f"  latency p50       {percentile(latencies, 50) * 1000:8.0f} ms")
+    print(f"  latency p95       {percentile(latencies, 95) * 1000:8.0f} ms")
+    print(f"  latency p99       {percentile(latencies, 99) * 1000:8.0f} ms")
+    if first_steps:
+        print(f"  first step p50    {percentile(first_steps, 50) * 1000:8.0f} ms")
+        print(f"  first step p99    {percentile(first_steps, 99) * 1000:8.0f} ms")
+    print(f"  dremio queries    {dremio.queries:8d}")
+    print(f"  queue stats       {app.config['JOB_QUEUE'].stats()}")
+    query_seconds = metrics.snapshot()["histograms"].get("sql_query_seconds")
+    if query_seconds:
+        print(f"  sql_query p50/p99 {query_seconds['p50'] * 1000:8.1f} / {query_seconds['p99'] * 1000:.1f} ms  ({query_seconds['count']} queries, from /metrics)")
+
+
+if __name__ == "__main__":
+    main()
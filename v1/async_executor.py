@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from stream_reader import cancel_reader
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query does not finish within its timeout (the query is cancelled)."""
+
+
+class QueryHandle:
+    """
+    Cancellation handle shared between the event loop and the worker thread running a query.
+
+    The worker attaches the Flight reader as soon as the stream is open and checks `cancelled`
+    between record batches, and the event loop calls `cancel` on timeout or task cancellation,
+    which also cancels the attached stream so Dremio stops the query.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def attach(self, reader: Any) -> None:
+        with self._lock:
+            self._reader = reader
+            if self.cancelled.is_set():
+                cancel_reader(reader)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled.set()
+            if self._reader is not None:
+                cancel_reader(self._reader)
+
+
+class AsyncQueryExecutor:
+    """
+    Runs blocking Dremio calls on a bounded thread pool behind an asyncio API.
+
+    pyarrow's Flight client has no asyncio interface, so queries run on at most `max_workers`
+    threads shared by every session; waiting coroutines hold no thread. Each call gets a
+    `QueryHandle` for cancellation and an optional timeout.
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: Optional[float] = None):
+        """
+        Args:
+            max_workers (int): Most queries running at the same time.
+            timeout (Optional[float]): Default per-query timeout in seconds (None for no timeout).
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dremio-query")
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Calls `fn(*args, handle=QueryHandle(), **kwargs)` on the pool and awaits the result.
+
+        Args:
+            fn (Callable[..., Any]): Blocking function accepting a `handle` keyword argument.
+            timeout (Optional[float]): Seconds before the query is cancelled (defaults to the executor's timeout).
+
+        Raises:
+            QueryTimeoutError: The query took longer than the timeout.
+            asyncio.CancelledError: The awaiting task was cancelled (the query is cancelled too).
+        """
+        handle = QueryHandle()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, functools.partial(fn, *args, handle=handle, **kwargs))
+        timeout = timeout if timeout is not None else self.timeout
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            handle.cancel()
+            raise QueryTimeoutError(f"Query cancelled after {timeout} seconds.") from None
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
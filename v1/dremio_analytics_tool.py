@@ -0,0 +1,61 @@
+from langchain.tools import BaseTool
+from analytics import AnalyticsError, TOOL_DESCRIPTION, compile_request, parse_request
+from async_executor import QueryTimeoutError
+from dremio_langchain_tool import DremioQueryTool
+
+class DremioAnalyticsTool(BaseTool):
+    """
+    A LangChain tool offering typed analytics operations (aggregate, group_by, top_k, histogram,
+    time_bucket) on Dremio. Each request compiles to one SQL query computed by Dremio, so the
+    agent receives the numbers instead of the rows they come from.
+    """
+
+    name: str = "DremioAnalyticsTool"
+    description: str = TOOL_DESCRIPTION
+    query_tool: object = None  # DremioQueryTool whose connection, result cache and executor run the compiled SQL
+
+    def __init__(self, query_tool: DremioQueryTool = None, mode: str = "software"):
+        """
+        Initialize the DremioAnalyticsTool.
+
+        Args:
+            query_tool (DremioQueryTool): Tool whose connection, result cache and executor are shared.
+            mode (str): "cloud" or "software", used when no query_tool is given.
+        """
+        super().__init__(query_tool=query_tool or DremioQueryTool(mode=mode))
+
+    def _compile(self, request: str) -> str:
+        return compile_request(parse_request(request))
+
+    def _run(self, request: str) -> str:
+        """
+        Compile the JSON request into SQL, run it on Dremio and return the compact result.
+
+        Args:
+            request (str): JSON object with the operation, the table and the operation's fields.
+
+        Returns:
+            str: The rendered result followed by the SQL that computed it, or the error message.
+        """
+        try:
+            sql = self._compile(request)
+        except AnalyticsError as e:
+            return f"Error: {e}"
+        return f"{self.query_tool._execute(sql)}\n\nSQL: {sql}"
+
+    async def _arun(self, request: str) -> str:
+        """
+        Asynchronous version of the run method, on the query tool's bounded executor.
+
+        Args:
+            request (str): JSON object with the operation, the table and the operation's fields.
+
+        Returns:
+            str: The rendered result followed by the SQL that computed it, or the error message.
+        """
+        try:
+            sql = self._compile(request)
+            result = await self.query_tool.executor.run(self.query_tool._execute, sql)
+        except (AnalyticsError, QueryTimeoutError) as e:
+            return f"Error: {e}"
+        return f"{result}\n\nSQL: {sql}"
@@ -1,5 +1,10 @@
 from langchain.tools import BaseTool
 from dremio_connect import get_dremio_connection
+from result_cache import ResultCache
+from stream_reader import read_with_budget
+from result_renderer import render_result
+from async_executor import AsyncQueryExecutor, QueryHandle, QueryTimeoutError
+from env import DREMIO_RESULT_CACHE_TTL, DREMIO_RESULT_CACHE_MB, DREMIO_RESULT_CACHE_DIR, DREMIO_ROW_BUDGET, DREMIO_BYTE_BUDGET_MB, DREMIO_TOKEN_BUDGET, DREMIO_QUERY_WORKERS, DREMIO_QUERY_TIMEOUT
 
 class DremioQueryTool(BaseTool):
     """
@@ -13,13 +18,20 @@ class DremioQueryTool(BaseTool):
     )  # Type annotation for tool description
     mode: str  # Declare mode as a required field
     connection: object = None  # Declare connection as a field, defaulting to None
+    result_cache: object = None  # Result cache keyed by SQL, built from the environment when not given
+    row_budget: int = DREMIO_ROW_BUDGET  # Rows read before the query is cancelled and the result truncated
+    byte_budget: int = DREMIO_BYTE_BUDGET_MB * 1024 * 1024  # Same, in Arrow bytes
+    token_budget: int = DREMIO_TOKEN_BUDGET  # Approximate LLM tokens the rendered result may use
+    executor: object = None  # Bounded thread pool used by _arun
 
-    def __init__(self, mode: str = "software"):
+    def __init__(self, mode: str = "software", result_cache: ResultCache = None, executor: AsyncQueryExecutor = None):
         """
         Initialize the DremioQueryTool with the appropriate Dremio connection mode.
 
         Args:
             mode (str): "cloud" or "software" (default is "software").
+            result_cache (ResultCache): Optional shared result cache.
+            executor (AsyncQueryExecutor): Optional shared executor for async queries.
         """
         # Initialize parent class with mode
         super().__init__(mode=mode)
@@ -27,6 +39,16 @@ class DremioQueryTool(BaseTool):
         # Set up Dremio connection
         self.connection = get_dremio_connection(mode=mode)
 
+        # Repeated queries within the TTL are answered without a round-trip to Dremio
+        self.result_cache = result_cache or ResultCache(
+            ttl=DREMIO_RESULT_CACHE_TTL,
+            max_bytes=DREMIO_RESULT_CACHE_MB * 1024 * 1024,
+            spill_dir=DREMIO_RESULT_CACHE_DIR or None,
+        )
+
+        # Async queries share a bounded pool of threads instead of one thread per request
+        self.executor = executor or AsyncQueryExecutor(max_workers=DREMIO_QUERY_WORKERS, timeout=DREMIO_QUERY_TIMEOUT)
+
     def _run(self, query: str) -> str:
         """
         Execute the provided SQL query and return the results as a string.
@@ -35,17 +57,45 @@ class DremioQueryTool(BaseTool):
             query (str): The SQL query to execute.
 
         Returns:
-            str: Query results as a string.
+            str: Query results rendered within the token budget.
+        """
+        return self._execute(query)
+
+    def _execute(self, query: str, handle: QueryHandle = None) -> str:
+        """
+        Shared body of _run and _arun. The handle lets the event loop cancel the Flight stream.
         """
         try:
-            # Execute the query and fetch results as a Pandas DataFrame
-            df = self.connection.toPandas(query)
-            return df.to_string(index=False)  # Return the DataFrame as a formatted string
+            # Stream the result (or reuse a cached one) and stop once the row/byte budget is reached
+            table = self.result_cache.get(query)
+            if table is None:
+                reader = self.connection.toArrow(query)
+                if handle is not None:
+                    handle.attach(reader)
+                cancelled = handle.cancelled if handle is not None else None
+                table, report = read_with_budget(reader, self.row_budget, self.byte_budget, cancelled)
+                if not report["truncated"]:
+                    self.result_cache.put(query, table)
+            else:
+                table, report = read_with_budget(table.to_reader(), self.row_budget, self.byte_budget)
+
+            # Compact CSV when it fits the token budget, otherwise column statistics and sampled rows
+            return render_result(table, self.token_budget, report)
         except Exception as e:
             return f"Error executing query: {e}"
 
     async def _arun(self, query: str) -> str:
         """
-        Asynchronous version of the run method (not implemented).
+        Asynchronous version of the run method. The query runs on the bounded executor so the
+        event loop is never blocked, and it is cancelled on timeout or when the task is cancelled.
+
+        Args:
+            query (str): The SQL query to execute.
+
+        Returns:
+            str: Query results rendered within the token budget, or the error message.
         """
-        raise NotImplementedError("DremioQueryTool does not support async execution yet.")
+        try:
+            return await self.executor.run(self._execute, query)
+        except QueryTimeoutError as e:
+            return f"Error executing query: {e}"
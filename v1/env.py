@@ -10,4 +10,14 @@ DREMIO_USERNAME = os.getenv("DREMIO_USERNAME")
 DREMIO_PASSWORD = os.getenv("DREMIO_PASSWORD")
 DREMIO_URI = os.getenv("DREMIO_URI")
 DREMIO_LOGIN_URI = os.getenv("DREMIO_LOGIN_URI")
-DREMIO_ENVIRONMENT= os.getenv("DREMIO_ENVIRONMENT")
\ No newline at end of file
+DREMIO_ENVIRONMENT= os.getenv("DREMIO_ENVIRONMENT")
+DREMIO_RESULT_CACHE_TTL = float(os.getenv("DREMIO_RESULT_CACHE_TTL", "60"))
+DREMIO_RESULT_CACHE_MB = int(os.getenv("DREMIO_RESULT_CACHE_MB", "256"))
+DREMIO_RESULT_CACHE_DIR = os.getenv("DREMIO_RESULT_CACHE_DIR")
+DREMIO_ROW_BUDGET = int(os.getenv("DREMIO_ROW_BUDGET", "10000"))
+DREMIO_BYTE_BUDGET_MB = int(os.getenv("DREMIO_BYTE_BUDGET_MB", "64"))
+DREMIO_TOKEN_BUDGET = int(os.getenv("DREMIO_TOKEN_BUDGET", "4000"))
+DREMIO_QUERY_WORKERS = int(os.getenv("DREMIO_QUERY_WORKERS", "8"))
+DREMIO_QUERY_TIMEOUT = float(os.getenv("DREMIO_QUERY_TIMEOUT", "0")) or None
+DREMIO_POOL_SIZE = int(os.getenv("DREMIO_POOL_SIZE", "4"))
+DREMIO_QUERY_RETRIES = int(os.getenv("DREMIO_QUERY_RETRIES", "3"))
\ No newline at end of file
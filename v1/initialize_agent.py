@@ -1,13 +1,20 @@
 from langchain.agents import initialize_agent, Tool, AgentType
 from langchain_community.llms import OpenAI
 from dremio_langchain_tool import DremioQueryTool 
+from dremio_analytics_tool import DremioAnalyticsTool
 from env import DREMIO_ENVIRONMENT
 
 # Initialize the tool
 dremio_tool = DremioQueryTool(mode=DREMIO_ENVIRONMENT)  # Use "cloud" if connecting to Dremio Cloud
 
-# Wrap the tool for LangChain
-tools = [Tool(name=dremio_tool.name, func=dremio_tool.run, description=dremio_tool.description)]
+# Aggregates, rankings, histograms and time buckets computed by Dremio, sharing the query tool's connection
+analytics_tool = DremioAnalyticsTool(query_tool=dremio_tool)
+
+# Wrap the tools for LangChain
+tools = [
+    Tool(name=dremio_tool.name, func=dremio_tool.run, description=dremio_tool.description),
+    Tool(name=analytics_tool.name, func=analytics_tool.run, description=analytics_tool.description),
+]
 
 # Initialize an OpenAI LLM
 llm = OpenAI(model="gpt-3.5-turbo-instruct", temperature=0)
@@ -2,12 +2,19 @@ from langchain.agents import initialize_agent, Tool, AgentType
 from langchain.llms import HuggingFacePipeline
 from transformers import pipeline
 from dremio_langchain_tool import DremioQueryTool
+from dremio_analytics_tool import DremioAnalyticsTool
 
 # Step 1: Initialize the Dremio Tool
 dremio_tool = DremioQueryTool(mode="software")  # Use "cloud" if connecting to Dremio Cloud
 
-# Wrap the tool for LangChain
-tools = [Tool(name=dremio_tool.name, func=dremio_tool.run, description=dremio_tool.description)]
+# Aggregates, rankings, histograms and time buckets computed by Dremio, sharing the query tool's connection
+analytics_tool = DremioAnalyticsTool(query_tool=dremio_tool)
+
+# Wrap the tools for LangChain
+tools = [
+    Tool(name=dremio_tool.name, func=dremio_tool.run, description=dremio_tool.description),
+    Tool(name=analytics_tool.name, func=analytics_tool.run, description=analytics_tool.description),
+]
 
 # Step 2: Load a Local Model using Hugging Face Transformers
 model_name = "gpt2"  # Replace with a better local model (e.g., EleutherAI/gpt-neo-125M or LLaMA)
@@ -0,0 +1,224 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# 🔹 Functions whose result changes between calls; queries using them are never cached
+NON_DETERMINISTIC = re.compile(
+    r"\b(?:NOW|RAND|RANDOM|UUID|RANDOM_UUID|CURRENT_TIMESTAMP|CURRENT_DATE|CURRENT_TIME|LOCALTIME|"
+    r"LOCALTIMESTAMP|UNIX_TIMESTAMP|SYSDATE|TIMEOFDAY)\b",
+    re.IGNORECASE,
+)
+
+# Only plain reads are cached (no DDL/DML, no metadata-changing statements)
+CACHEABLE = re.compile(r"\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*(?:SELECT|WITH|VALUES)\b", re.IGNORECASE | re.DOTALL)
+
+SPILL_PREFIX = "result-"
+
+
+class ResultCache:
+    """
+    Result-set cache keyed by the final SQL sent to Dremio.
+
+    Entries are Arrow tables with a per-entry TTL. The memory budget is measured in Arrow buffer
+    bytes (`Table.nbytes`), not entry count. When `spill_dir` is set, entries evicted from memory
+    are written as Arrow IPC files and memory-mapped back on the next hit, up to `spill_max_bytes`.
+    """
+
+    def __init__(self, ttl: float = 60, max_bytes: int = 256 * 1024 * 1024, spill_dir: Optional[str] = None, spill_max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Args:
+            ttl (float): Seconds an entry stays valid. 0 disables the cache.
+            max_bytes (int): Budget for the in-memory entries, in Arrow buffer bytes.
+            spill_dir (Optional[str]): Directory for entries evicted from memory, or None to drop them.
+            spill_max_bytes (int): Budget for the spilled files, in bytes on disk.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._spilled: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._spilled_bytes = 0
+        self._lock = threading.Lock()
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._load_spill_index()
+
+    @staticmethod
+    def cacheable(sql: str) -> bool:
+        """True for read-only statements that do not call a non-deterministic function."""
+        return bool(CACHEABLE.match(sql)) and NON_DETERMINISTIC.search(sql) is None
+
+    def get(self, sql: str) -> Optional[pa.Table]:
+        """
+        Returns the cached result for `sql`, or None on a miss, an expired entry or a bypassed query.
+        """
+        if not self.enabled or not self.cacheable(sql):
+            self.bypassed += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(sql)
+            if entry is not None and entry["expires"] > now:
+                self._entries.move_to_end(sql)
+                self.hits += 1
+                return entry["table"]
+            if entry is not None:
+                self._drop(sql)
+
+            table = self._read_spilled(sql, now)
+            if table is not None:
+                self.hits += 1
+                return table
+
+            self.misses += 1
+            return None
+
+    def put(self, sql: str, table: pa.Table) -> None:
+        """Stores a result unless it is bypassed or larger than the whole memory budget."""
+        if not self.enabled or not self.cacheable(sql) or table.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if sql in self._entries:
+                self._drop(sql)
+            self._entries[sql] = {"table": table, "expires": time.time() + self.ttl, "nbytes": table.nbytes}
+            self._bytes += table.nbytes
+            self._evict()
+
+    def clear(self) -> None:
+        """Drops every entry from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for key in list(self._spilled):
+                self._drop_spilled(key)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: hit/miss/bypass counters, entry counts and bytes in memory and on disk.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_entries": len(self._spilled),
+                "spilled_bytes": self._spilled_bytes,
+            }
+
+    def _drop(self, sql: str) -> None:
+        entry = self._entries.pop(sql)
+        self._bytes -= entry["nbytes"]
+
+    def _evict(self) -> None:
+        """Evicts least recently used entries until the memory budget holds, spilling them if configured."""
+        now = time.time()
+        while self._bytes > self.max_bytes and self._entries:
+            sql, entry = self._entries.popitem(last=False)
+            self._bytes -= entry["nbytes"]
+            if self.spill_dir and entry["expires"] > now:
+                self._spill(sql, entry)
+
+    # 🔹 On-disk store
+
+    def _spill_path(self, sql: str) -> str:
+        digest = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{SPILL_PREFIX}{digest}.arrow")
+
+    def _spill(self, sql: str, entry: Dict[str, Any]) -> None:
+        path = self._spill_path(sql)
+        table = entry["table"]
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({b"cache_sql": sql.encode("utf-8"), b"cache_expires": str(entry["expires"]).encode()})
+
+        try:
+            tmp_path = f"{path}.tmp"
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with ipc.new_file(sink, table.schema.with_metadata(metadata)) as writer:
+                    writer.write_table(table.replace_schema_metadata(metadata))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not spill cached result to disk: {e}")
+            return
+
+        if sql in self._spilled:
+            self._drop_spilled(sql, remove_file=False)
+        size = os.path.getsize(path)
+        self._spilled[sql] = {"path": path, "expires": entry["expires"], "size": size}
+        self._spilled_bytes += size
+
+        while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+            self._drop_spilled(next(iter(self._spilled)))
+
+    def _read_spilled(self, sql: str, now: float) -> Optional[pa.Table]:
+        spilled = self._spilled.get(sql)
+        if spilled is None:
+            return None
+        if spilled["expires"] <= now:
+            self._drop_spilled(sql)
+            return None
+
+        try:
+            with pa.memory_map(spilled["path"], "r") as source:
+                table = ipc.open_file(source).read_all()
+            metadata = {key: value for key, value in (table.schema.metadata or {}).items() if not key.startswith(b"cache_")}
+            table = table.replace_schema_metadata(metadata or None)
+        except (OSError, pa.ArrowInvalid):
+            self._drop_spilled(sql)
+            return None
+
+        self._spilled.move_to_end(sql)
+        return table
+
+    def _drop_spilled(self, sql: str, remove_file: bool = True) -> None:
+        spilled = self._spilled.pop(sql)
+        self._spilled_bytes -= spilled["size"]
+        if remove_file:
+            try:
+                os.remove(spilled["path"])
+            except OSError:
+                pass
+
+    def _load_spill_index(self) -> None:
+        """Indexes results spilled by earlier runs, removing the expired ones."""
+        now = time.time()
+        for item in sorted(os.scandir(self.spill_dir), key=lambda item: item.stat().st_mtime):
+            if not (item.name.startswith(SPILL_PREFIX) and item.name.endswith(".arrow")):
+                continue
+            try:
+                with pa.memory_map(item.path, "r") as source:
+                    metadata = ipc.open_file(source).schema.metadata or {}
+                sql = metadata[b"cache_sql"].decode("utf-8")
+                expires = float(metadata[b"cache_expires"])
+            except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+                continue
+
+            if expires <= now:
+                os.remove(item.path)
+                continue
+            self._spilled[sql] = {"path": item.path, "expires": expires, "size": item.stat().st_size}
+            self._spilled_bytes += item.stat().st_size
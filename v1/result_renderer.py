@@ -0,0 +1,150 @@
+import io
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+
+# 🔹 Rough size of one LLM token in characters for English text, numbers and CSV punctuation
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer dependency)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def to_csv(table: pa.Table) -> str:
+    """Renders a table as compact CSV (no index, no padding, nulls as empty cells)."""
+    header = ",".join(_csv_field(name) for name in table.column_names) + "\n"
+    for quoting_style in ("none", "needed"):
+        sink = io.BytesIO()
+        try:
+            # ✅ Unquoted first (shortest), quoted when a cell contains a comma, quote or line break
+            csv.write_csv(table, sink, csv.WriteOptions(include_header=False, quoting_style=quoting_style))
+            return header + sink.getvalue().decode("utf-8")
+        except pa.ArrowInvalid:
+            continue
+        except pa.ArrowNotImplementedError:
+            break
+
+    # ✅ Nested types (lists, structs, maps) have no CSV representation
+    lines = [header.rstrip("\n")]
+    lines += [",".join("" if value is None else str(value) for value in row.values()) for row in table.to_pylist()]
+    return "\n".join(lines) + "\n"
+
+
+def _csv_field(text: str) -> str:
+    if any(char in text for char in ',"\n\r'):
+        return '"{}"'.format(text.replace('"', '""'))
+    return text
+
+
+def shorten_strings(table: pa.Table, max_chars: int) -> pa.Table:
+    """Cuts long string cells to `max_chars` characters (vectorized)."""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            column = table.column(i)
+            if (pc.max(pc.utf8_length(column)).as_py() or 0) > max_chars:
+                table = table.set_column(i, field, pc.utf8_slice_codeunits(column, 0, max_chars))
+    return table
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def column_stats(column: pa.ChunkedArray, field: pa.Field, top_k: int = 3) -> str:
+    """
+    One-line summary of a column computed with Arrow kernels: null count, min/max/mean for
+    numbers and dates, distinct count and most frequent values for everything else.
+    """
+    parts = [f"nulls={column.null_count}"]
+    kind = field.type
+
+    if column.null_count == len(column):
+        return ", ".join(parts)
+
+    if pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_decimal(kind):
+        bounds = pc.min_max(column)
+        parts.append(f"min={_format(bounds['min'].as_py())}")
+        parts.append(f"max={_format(bounds['max'].as_py())}")
+        parts.append(f"mean={_format(pc.mean(column).as_py())}")
+    elif pa.types.is_temporal(kind):
+        bounds = pc.min_max(column)
+        parts.append(f"min={bounds['min'].as_py()}")
+        parts.append(f"max={bounds['max'].as_py()}")
+    elif pa.types.is_string(kind) or pa.types.is_large_string(kind) or pa.types.is_boolean(kind) or pa.types.is_dictionary(kind):
+        counts = pc.value_counts(column.drop_null())
+        parts.append(f"distinct={len(counts)}")
+        top = counts.take(pc.array_sort_indices(counts.field("counts"), order="descending")[:top_k])
+        parts.append("top=" + ", ".join(f"{_format(item['values'])} ({item['counts']})" for item in top.to_pylist()))
+
+    return ", ".join(parts)
+
+
+def _fit_lines(text: str, max_chars: int) -> str:
+    """Keeps whole lines only, so a row is never cut in half."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut + 1] if cut > 0 else ""
+
+
+def render_result(table: pa.Table, token_budget: int = 4000, report: Optional[Dict[str, Any]] = None, max_cell_chars: int = 200) -> str:
+    """
+    Renders a query result in the most compact useful form that fits a token budget.
+
+    Small results are returned as compact CSV. Larger ones become a header line, per-column
+    statistics over every row and an evenly spaced sample of rows that fills the rest of the budget.
+
+    Args:
+        table (pa.Table): The query result.
+        token_budget (int): Approximate number of LLM tokens the text may use.
+        report (Optional[Dict[str, Any]]): Budget report from `read_with_budget`; a truncation note is added when set.
+        max_cell_chars (int): Longest string cell kept as is.
+
+    Returns:
+        str: The rendered result.
+    """
+    note = ""
+    if report and report.get("truncated"):
+        limit = "row" if report["reason"] == "rows" else "byte"
+        note = f"\n(Result truncated at the {limit} budget after {report['rows']} rows; statistics cover the rows read. Add a LIMIT, filters or an aggregation.)"
+
+    if table.num_rows == 0:
+        return "(no rows)" + note
+
+    max_chars = max(token_budget * CHARS_PER_TOKEN - len(note), 200)
+    table = shorten_strings(table, max_cell_chars)
+
+    # ✅ Only render everything when it can plausibly fit (nbytes is a cheap upper-bound hint)
+    if table.nbytes <= max_chars * 2:
+        text = to_csv(table)
+        if len(text) <= max_chars:
+            return text + note
+
+    lines: List[str] = [f"{table.num_rows} rows x {table.num_columns} columns. Column statistics:"]
+    for field, column in zip(table.schema, table.columns):
+        lines.append(f"- {field.name} ({field.type}): {column_stats(column, field)}")
+    header = "\n".join(lines)
+
+    remaining = max_chars - len(header) - 40
+    if remaining <= 0:
+        return _fit_lines(header + "\n", max_chars) + note
+
+    # 🔹 Take an evenly spaced sample, shrinking it until its CSV fits the remaining budget
+    sample_size = min(table.num_rows, max(remaining // 8, 1))
+    for _ in range(4):
+        step = table.num_rows / sample_size
+        sample = table.take(pa.array([int(i * step) for i in range(sample_size)], type=pa.int64()))
+        rows = to_csv(sample)
+        if len(rows) <= remaining or sample_size == 1:
+            break
+        sample_size = max(int(sample_size * remaining / len(rows) * 0.95), 1)
+
+    rows = _fit_lines(rows, remaining)
+    shown = max(rows.count("\n") - 1, 0)
+    return f"{header}\nSample of {shown} rows (CSV):\n{rows}".rstrip("\n") + note
@@ -6,11 +6,14 @@ if __name__ == "__main__":
     # Example question for the agent
     question = sys.argv[1] if len(sys.argv) > 1 else "What is the average temperature in NYC?"
 
-    # SQL query to fetch the required data
-    query = """
-    SELECT station, "name", "date", awnd, prcp, snow, snwd, tempmax, tempmin  FROM Samples."samples.dremio.com"."NYC-weather.csv" LIMIT 3000;
-    """
+    # Dataset the question is about: the agent has Dremio compute the answer instead of reading its rows
+    table = 'Samples."samples.dremio.com"."NYC-weather.csv"'
+    columns = 'station, "name", "date", awnd, prcp, snow, snwd, tempmax, tempmin'
 
-    # Combine the question and query for the agent
-    response = agent.run(f"Answer the question: {question} with this Data: {query}")
-    print(response)
\ No newline at end of file
+    # Combine the question and the dataset for the agent
+    response = agent.run(
+        f"Answer the question: {question} using the table {table} with the columns {columns}. "
+        "Compute totals, averages, counts, rankings, distributions and trends with DremioAnalyticsTool, "
+        "and only fetch rows with DremioQueryTool when the question is about individual records."
+    )
+    print(response)
@@ -0,0 +1,115 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import pyarrow as pa
+
+
+class QueryCancelledError(Exception):
+    """Raised when a query is cancelled while its result is being read."""
+
+
+def batch_reader(reader: Any) -> Callable[[], pa.RecordBatch]:
+    """
+    Returns a function reading the next record batch (raising StopIteration at the end) from a
+    RecordBatchReader or from the FlightStreamReader returned by `DremioConnection.toArrow`.
+    """
+    if hasattr(reader, "read_next_batch"):
+        return reader.read_next_batch
+    # ✅ Flight stream readers yield chunks (batch + app metadata)
+    return lambda: reader.read_chunk().data
+
+
+def cancel_reader(reader: Any) -> None:
+    """Cancels a Flight stream (stopping the query on the server) or closes a local reader."""
+    try:
+        if hasattr(reader, "cancel"):
+            reader.cancel()
+        elif hasattr(reader, "close"):
+            reader.close()
+    except Exception as e:
+        print(f"⚠️ Could not cancel the result stream: {e}")
+
+
+def read_with_budget(reader: Any, max_rows: Optional[int] = None, max_bytes: Optional[int] = None, cancelled: Optional[threading.Event] = None) -> Tuple[pa.Table, Dict[str, Any]]:
+    """
+    Reads a result stream one batch at a time and stops as soon as the row or byte budget is
+    reached, cancelling the rest of the query instead of downloading it.
+
+    Args:
+        reader: A RecordBatchReader or FlightStreamReader.
+        max_rows (Optional[int]): Most rows to keep, or None for no limit.
+        max_bytes (Optional[int]): Most Arrow buffer bytes to keep, or None for no limit.
+        cancelled (Optional[threading.Event]): Checked between batches; when set the stream is cancelled.
+
+    Returns:
+        Tuple[pa.Table, Dict[str, Any]]: The rows read and a report with `rows`, `bytes`,
+        `truncated` and `reason` ("rows", "bytes" or None).
+
+    Raises:
+        QueryCancelledError: `cancelled` was set before the stream was read to the end.
+    """
+    read_batch = batch_reader(reader)
+    batches: List[pa.RecordBatch] = []
+    rows = nbytes = 0
+    reason = None
+
+    while True:
+        if cancelled is not None and cancelled.is_set():
+            cancel_reader(reader)
+            raise QueryCancelledError("Query cancelled while reading the result.")
+        try:
+            batch = read_batch()
+        except StopIteration:
+            break
+
+        if max_rows is not None and rows + batch.num_rows > max_rows:
+            batch = batch.slice(0, max_rows - rows)
+            reason = "rows"
+        if max_bytes is not None and nbytes + batch.nbytes > max_bytes:
+            # Keep the rows that fit, estimated from the batch's average row width
+            row_width = batch.nbytes / batch.num_rows if batch.num_rows else 0
+            fitting = int((max_bytes - nbytes) / row_width) if row_width else batch.num_rows
+            batch = batch.slice(0, max(fitting, 0))
+            reason = "bytes"
+
+        if batch.num_rows:
+            batches.append(batch)
+            rows += batch.num_rows
+            nbytes += batch.nbytes
+
+        if reason is not None:
+            cancel_reader(reader)
+            break
+
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table, {"rows": rows, "bytes": nbytes, "truncated": reason is not None, "reason": reason}
+
+
+def truncation_note(report: Dict[str, Any]) -> str:
+    """Human (and LLM) readable note explaining why a result was cut short."""
+    limit = "row" if report["reason"] == "rows" else "byte"
+    return (
+        f"⚠️ Result truncated: only the first {report['rows']} rows were read because the {limit} "
+        f"budget was reached. Add a LIMIT, filters or an aggregation to see the rest."
+    )
+
+
+class TruncatedRows(list):
+    """
+    A list of result rows that remembers it was truncated. It behaves like the plain list returned
+    by `run`, and its string form (what the agent sees) ends with the truncation note.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], report: Dict[str, Any]):
+        super().__init__(rows)
+        self.report = report
+
+    def __str__(self) -> str:
+        return f"{list.__repr__(self)}\n{truncation_note(self.report)}"
+
+
+def with_report(rows: Union[List[Dict[str, Any]], Dict[str, Any]], report: Dict[str, Any]):
+    """Wraps a list of rows in `TruncatedRows` when the report says the result was cut short."""
+    if report["truncated"] and isinstance(rows, list):
+        return TruncatedRows(rows, report)
+    return rows
@@ -1,4 +1,8 @@
 # Function to truncate the string to a certain number of characters
+# (query results are rendered within a token budget by result_renderer.render_result instead)
 def truncate_string(input_text: str, max_chars: int = 90000) -> str:
-    """Truncate the input string to ensure it's within the character limit."""
-    return input_text[:max_chars] if len(input_text) > max_chars else input_text
\ No newline at end of file
+    """Truncate the input string to ensure it's within the character limit, without cutting a line in half."""
+    if len(input_text) <= max_chars:
+        return input_text
+    cut = input_text.rfind("\n", 0, max_chars)
+    return input_text[:cut] if cut > 0 else input_text[:max_chars]
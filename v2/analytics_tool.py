@@ -0,0 +1,35 @@
+from typing import Optional, Type
+
+from langchain_community.tools.sql_database.tool import BaseSQLDatabaseTool
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from analytics import AnalyticsError, TOOL_DESCRIPTION, compile_request, parse_request
+
+ANALYTICS_TOOL = "sql_db_analytics"
+
+
+class _AnalyticsInput(BaseModel):
+    query: str = Field(..., description="A JSON object with the operation, table and its fields.")
+
+
+class DremioAnalyticsTool(BaseSQLDatabaseTool, BaseTool):
+    """
+    Agent tool offering typed analytics operations (aggregate, group_by, top_k, histogram,
+    time_bucket). Each compiles to one SQL query that Dremio computes, so the agent gets the
+    numbers instead of the rows they come from.
+    """
+
+    name: str = ANALYTICS_TOOL
+    description: str = TOOL_DESCRIPTION
+    args_schema: Type[BaseModel] = _AnalyticsInput
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        """Compiles the request and runs it through `DremioSQLDatabase.run` (validation, rewriting and caching included)."""
+        try:
+            sql = compile_request(parse_request(query))
+        except AnalyticsError as e:
+            return f"Error: {e}"
+        # ✅ The result comes first, so error results still start with their error prefix
+        return f"{self.db.run(sql)}\n\nSQL: {sql}"
@@ -0,0 +1,175 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from stream_reader import cancel_reader
+
+# 🔹 Deadline (a `time.time()` value) and cancel event of the request the current thread (or task) works for
+_request_deadline: contextvars.ContextVar[Optional[Tuple[float, threading.Event]]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(deadline_at: float, cancelled: threading.Event):
+    """
+    Bounds the queries run by the current thread (or task) until the block exits by the deadline
+    of the request they answer: executor timeouts are cut to the time left, and results stop
+    being read once `cancelled` is set (e.g. by `JobQueue` when the deadline passes).
+    """
+    token = _request_deadline.set((deadline_at, cancelled))
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def request_cancelled() -> Optional[threading.Event]:
+    """Returns the cancel event of the current request, or None outside `request_deadline`."""
+    deadline = _request_deadline.get()
+    return deadline[1] if deadline is not None else None
+
+
+def request_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Returns `timeout` cut to the seconds left before the current request's deadline, if any."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return timeout
+    left = max(deadline[0] - time.time(), 0.0)
+    return left if timeout is None else min(timeout, left)
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query does not finish within its timeout (the query is cancelled)."""
+
+
+class QueryHandle:
+    """
+    Cancellation handle shared between the event loop and the worker thread running a query.
+
+    The worker attaches the Flight reader as soon as the stream is open and checks `cancelled`
+    between record batches, and the event loop calls `cancel` on timeout or task cancellation,
+    which also cancels the attached stream so Dremio stops the query.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def attach(self, reader: Any) -> None:
+        with self._lock:
+            self._reader = reader
+            if self.cancelled.is_set():
+                cancel_reader(reader)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled.set()
+            if self._reader is not None:
+                cancel_reader(self._reader)
+
+
+class AsyncQueryExecutor:
+    """
+    Runs blocking Dremio calls on a bounded thread pool behind an asyncio API.
+
+    pyarrow's Flight client has no asyncio interface, so queries run on at most `max_workers`
+    threads shared by every session; waiting coroutines hold no thread. Each call gets a
+    `QueryHandle` for cancellation and an optional timeout.
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: Optional[float] = None):
+        """
+        Args:
+            max_workers (int): Most queries running at the same time.
+            timeout (Optional[float]): Default per-query timeout in seconds (None for no timeout).
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dremio-query")
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Calls `fn(*args, handle=QueryHandle(), **kwargs)` on the pool and awaits the result.
+
+        Args:
+            fn (Callable[..., Any]): Blocking function accepting a `handle` keyword argument.
+            timeout (Optional[float]): Seconds before the query is cancelled (defaults to the executor's
+                timeout, and never past the deadline of the current request).
+
+        Raises:
+            QueryTimeoutError: The query took longer than the timeout.
+            asyncio.CancelledError: The awaiting task was cancelled (the query is cancelled too).
+        """
+        handle = QueryHandle()
+        loop = asyncio.get_running_loop()
+        # ✅ The query sees the caller's context variables (session, question, focused tables)
+        future = loop.run_in_executor(self._pool, contextvars.copy_context().run, functools.partial(fn, *args, handle=handle, **kwargs))
+        timeout = request_timeout(timeout if timeout is not None else self.timeout)
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            handle.cancel()
+            raise QueryTimeoutError(f"Query cancelled after {timeout} seconds.") from None
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+
+    def run_batch(self, fn: Callable[..., Any], calls: Sequence[Tuple[Any, ...]], max_concurrency: Optional[int] = None, timeout: Optional[float] = None) -> List[Any]:
+        """
+        Calls `fn(*args, handle=QueryHandle())` for each `args` in `calls` on the pool, from synchronous
+        code, and waits for all of them. Each call runs in a copy of the caller's context, so context
+        variables (such as the question being answered) are seen by the worker threads.
+
+        Args:
+            fn (Callable[..., Any]): Blocking function accepting a `handle` keyword argument.
+            calls (Sequence[Tuple[Any, ...]]): Positional arguments of each call.
+            max_concurrency (Optional[int]): Most calls of this batch running at once (defaults to `max_workers`).
+            timeout (Optional[float]): Seconds for the whole batch (defaults to the executor's timeout,
+                and never past the deadline of the current request). Calls still running then are cancelled.
+
+        Returns:
+            List[Any]: The results in the order of `calls`. A call that failed or timed out has its
+            exception (`QueryTimeoutError` for timeouts) in its place instead of a result.
+        """
+        timeout = request_timeout(timeout if timeout is not None else self.timeout)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        slots = threading.Semaphore(max(1, max_concurrency or self.max_workers))
+
+        def remaining() -> Optional[float]:
+            return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+        # 🔹 A slot is taken before each submit and freed when the call finishes, so the batch never
+        # holds more than `max_concurrency` pool threads and the other sessions keep theirs
+        handles = [QueryHandle() for _ in calls]
+        futures = []
+        for args, handle in zip(calls, handles):
+            if not slots.acquire(timeout=remaining()):
+                futures.append(None)
+                continue
+            future = self._pool.submit(contextvars.copy_context().run, functools.partial(fn, *args, handle=handle))
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+
+        results: List[Any] = []
+        for future, handle in zip(futures, handles):
+            try:
+                if future is None:
+                    raise FutureTimeoutError()
+                results.append(future.result(timeout=remaining()))
+            except FutureTimeoutError:
+                handle.cancel()
+                if future is not None:
+                    future.cancel()
+                results.append(QueryTimeoutError(f"Query cancelled after {timeout} seconds."))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,8 +1,6 @@
-from dremio_simple_query.connect import DremioConnection, get_token
-from langchain_community.llms import OpenAI
 from os import getenv
 from dotenv import load_dotenv
-from DremioSQLDatabase import DremioSQLDatabase
+from connection_pool import create_connection_pool
 
 # ✅ Load environment variables
 load_dotenv()
@@ -14,25 +12,55 @@ DREMIO_TOKEN = getenv("DREMIO_TOKEN")
 DREMIO_USERNAME = getenv("DREMIO_USERNAME")
 DREMIO_PASSWORD = getenv("DREMIO_PASSWORD")
 DREMIO_LOGIN_URI = getenv("DREMIO_LOGIN_URI")
+DREMIO_SCHEMA_SNAPSHOT = getenv("DREMIO_SCHEMA_SNAPSHOT")
+DREMIO_LAZY_SCHEMA = getenv("DREMIO_LAZY_SCHEMA", "false").lower() == "true"
+DREMIO_RESULT_CACHE_TTL = float(getenv("DREMIO_RESULT_CACHE_TTL", "60"))
+DREMIO_RESULT_CACHE_MB = int(getenv("DREMIO_RESULT_CACHE_MB", "256"))
+DREMIO_RESULT_CACHE_DIR = getenv("DREMIO_RESULT_CACHE_DIR")
+DREMIO_ROW_BUDGET = int(getenv("DREMIO_ROW_BUDGET", "10000"))
+DREMIO_BYTE_BUDGET_MB = int(getenv("DREMIO_BYTE_BUDGET_MB", "64"))
+DREMIO_TOKEN_BUDGET = int(getenv("DREMIO_TOKEN_BUDGET", "4000"))
+DREMIO_QUERY_WORKERS = int(getenv("DREMIO_QUERY_WORKERS", "8"))
+DREMIO_QUERY_TIMEOUT = float(getenv("DREMIO_QUERY_TIMEOUT", "0")) or None
+DREMIO_POOL_SIZE = int(getenv("DREMIO_POOL_SIZE", "4"))
+DREMIO_QUERY_RETRIES = int(getenv("DREMIO_QUERY_RETRIES", "3"))
+DREMIO_SCHEMA_TOP_K = int(getenv("DREMIO_SCHEMA_TOP_K", "8"))
+DREMIO_TABLE_DESCRIPTIONS = getenv("DREMIO_TABLE_DESCRIPTIONS")
+DREMIO_VALIDATE_QUERIES = getenv("DREMIO_VALIDATE_QUERIES", "true").lower() == "true"
+DREMIO_QUERY_LIMIT = int(getenv("DREMIO_QUERY_LIMIT", "1000"))
+DREMIO_MAX_SCAN_ROWS = int(getenv("DREMIO_MAX_SCAN_ROWS", "0")) or None
+DREMIO_PRUNE_PROJECTIONS = getenv("DREMIO_PRUNE_PROJECTIONS", "true").lower() == "true"
+DREMIO_BATCH_CONCURRENCY = int(getenv("DREMIO_BATCH_CONCURRENCY", "4"))
+DREMIO_ANALYTICS_TOOL = getenv("DREMIO_ANALYTICS_TOOL", "true").lower() == "true"
+DREMIO_WORKING_SET_MB = int(getenv("DREMIO_WORKING_SET_MB", "64"))
+DREMIO_WORKING_SET_SESSIONS = int(getenv("DREMIO_WORKING_SET_SESSIONS", "32"))
+DREMIO_WORKING_SET_TTL = float(getenv("DREMIO_WORKING_SET_TTL", "600"))
+DREMIO_REFLECTION_ROUTING = getenv("DREMIO_REFLECTION_ROUTING", "true").lower() == "true"
+DREMIO_REFLECTION_TTL = float(getenv("DREMIO_REFLECTION_TTL", "300"))
+DREMIO_QUERY_LOG = getenv("DREMIO_QUERY_LOG")
+DREMIO_QUERY_LOG_SIZE = int(getenv("DREMIO_QUERY_LOG_SIZE", "500"))
 
-# 🔹 Get Dremio Token for Software Deployments
-def get_dremio_token():
-    """Fetches a token from the Dremio Software API if required."""
-    if DREMIO_ENVIRONMENT == "software":
-        print("🔄 Fetching Dremio Software Token...")
-        payload = {"userName": DREMIO_USERNAME, "password": DREMIO_PASSWORD}
-        return get_token(uri=DREMIO_LOGIN_URI, payload=payload)
-    return DREMIO_TOKEN  # Return predefined token for Dremio Cloud
-
-# ✅ Establish Dremio connection
-DREMIO_AUTH_TOKEN = get_dremio_token()
-dremio = DremioConnection(DREMIO_AUTH_TOKEN, DREMIO_URI)
-
-# ✅ Initialize the Custom Database for LangChain
-db = DremioSQLDatabase(dremio)
-
-# ✅ Initialize OpenAI LLM
-llm = OpenAI(model="gpt-3.5-turbo-instruct", temperature=0)
-
-
+# 🔹 Agent Configuration
+AGENT_ANSWER_CACHE_SIZE = int(getenv("AGENT_ANSWER_CACHE_SIZE", "256"))
+AGENT_ANSWER_CACHE_THRESHOLD = float(getenv("AGENT_ANSWER_CACHE_THRESHOLD", "0.9"))
+AGENT_MEMORY_TOKENS = int(getenv("AGENT_MEMORY_TOKENS", "800"))
+AGENT_MEMORY_TURNS = int(getenv("AGENT_MEMORY_TURNS", "2"))
+AGENT_MEMORY_SESSIONS = int(getenv("AGENT_MEMORY_SESSIONS", "256"))
+AGENT_MEMORY_TTL = float(getenv("AGENT_MEMORY_TTL", "3600"))
+AGENT_MEMORY_DB = getenv("AGENT_MEMORY_DB")
+AGENT_LOG_LEVEL = getenv("AGENT_LOG_LEVEL", "INFO").upper()
+AGENT_LOG_FORMAT = getenv("AGENT_LOG_FORMAT", "text").lower()
 
+# ✅ Pool of Dremio connections (Software tokens are fetched on first use and refreshed before they expire)
+def create_dremio_connection():
+    """Builds the Dremio connection pool from the environment. No connection or login happens until the first query."""
+    return create_connection_pool(
+        DREMIO_ENVIRONMENT,
+        DREMIO_URI,
+        token=DREMIO_TOKEN,
+        login_uri=DREMIO_LOGIN_URI,
+        username=DREMIO_USERNAME,
+        password=DREMIO_PASSWORD,
+        size=DREMIO_POOL_SIZE,
+        retries=DREMIO_QUERY_RETRIES,
+    )
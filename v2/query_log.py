@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from query_shaper import TOKEN
+from telemetry import get_logger
+
+log = get_logger("query_log")
+
+# 🔹 Tokens written without a space before / after them in a query shape
+NO_SPACE_BEFORE = {",", ")", ".", ";"}
+NO_SPACE_AFTER = {"(", "."}
+
+
+def fingerprint(sql: str) -> Tuple[str, str]:
+    """
+    Normalizes a query to its shape: literals and parameters become `?`, lists of them inside
+    parentheses (`IN (1, 2, 3)`) collapse to `(?)`, keywords and bare names are upper-cased and
+    comments and whitespace are dropped. Queries that differ only in their constants share a shape.
+
+    Returns:
+        Tuple[str, str]: A short id (hash of the shape) and the shape.
+    """
+    tokens: List[str] = []
+    for match in TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        text = match.group(kind)
+        if kind in ("string", "number", "param"):
+            text = "?"
+            if len(tokens) >= 2 and tokens[-1] == "," and tokens[-2] == "?" and _in_list(tokens):
+                tokens.pop()
+                continue
+        elif kind == "word":
+            text = text.upper()
+        tokens.append(text)
+
+    parts = []
+    for i, text in enumerate(tokens):
+        if i and text not in NO_SPACE_BEFORE and tokens[i - 1] not in NO_SPACE_AFTER:
+            parts.append(" ")
+        parts.append(text)
+    shape = "".join(parts).rstrip(";").rstrip()
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:12], shape
+
+
+def _in_list(tokens: List[str]) -> bool:
+    """True when the tokens end inside a parenthesized list holding only `?` so far."""
+    for text in reversed(tokens):
+        if text == "(":
+            return True
+        if text not in ("?", ","):
+            return False
+    return False
+
+
+class QueryLog:
+    """
+    Per-shape statistics of the queries an agent runs, keyed by `fingerprint`.
+
+    Every query is counted with its source: `dremio` (sent to Dremio), `cache` (result cache) or
+    `working_set` (answered locally). Latencies are kept for Dremio queries only, since they are
+    the ones a reflection can speed up. Shapes beyond `maxsize` are forgotten least recently seen
+    first. With a `path`, every record is also appended to a JSON lines file, which is read back
+    on start so the statistics cover restarts and every process writing to it.
+    """
+
+    def __init__(self, maxsize: int = 500, path: Optional[str] = None, samples: int = 100):
+        """
+        Args:
+            maxsize (int): Query shapes kept.
+            path (Optional[str]): JSON lines file the records are appended to and loaded from.
+            samples (int): Most recent Dremio latencies kept per shape for the percentiles.
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.samples = samples
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def record(self, sql: str, seconds: float, rows: int = 0, source: str = "dremio", tables: Iterable[str] = (), accelerated: bool = False) -> str:
+        """
+        Counts one run of a query.
+
+        Args:
+            sql (str): The final SQL.
+            seconds (float): Time the query took.
+            rows (int): Rows it returned.
+            source (str): "dremio", "cache" or "working_set".
+            tables (Iterable[str]): Fully qualified names of the tables it read.
+            accelerated (bool): One of those tables has a usable reflection.
+
+        Returns:
+            str: The query's fingerprint.
+        """
+        query_id, shape = fingerprint(sql)
+        record = {
+            "at": round(time.time(), 3),
+            "fingerprint": query_id,
+            "shape": shape,
+            "sql": sql,
+            "tables": list(tables),
+            "seconds": round(seconds, 4),
+            "rows": rows,
+            "source": source,
+            "accelerated": accelerated,
+        }
+        with self._lock:
+            self._add(record)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError as e:
+                    log.warning("⚠️ Could not append to the query log %s: %s", self.path, e)
+        return query_id
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        """Adds a record to its shape's statistics (called with the lock held)."""
+        entry = self._entries.get(record["fingerprint"])
+        if entry is None:
+            entry = self._entries[record["fingerprint"]] = {
+                "fingerprint": record["fingerprint"],
+                "shape": record["shape"],
+                "count": 0,
+                "dremio": 0,
+                "cache": 0,
+                "working_set": 0,
+                "accelerated": 0,
+                "dremio_seconds": 0.0,
+                "max_seconds": 0.0,
+                "rows": 0,
+                "first_seen": record["at"],
+                "latencies": deque(maxlen=self.samples),
+            }
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(record["fingerprint"])
+
+        entry["sql"] = record["sql"]
+        entry["tables"] = record["tables"]
+        entry["last_seen"] = record["at"]
+        entry["count"] += 1
+        entry[record["source"]] = entry.get(record["source"], 0) + 1
+        entry["accelerated"] += bool(record["accelerated"])
+        entry["rows"] += record["rows"]
+        if record["source"] == "dremio":
+            entry["dremio_seconds"] += record["seconds"]
+            entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+            entry["latencies"].append(record["seconds"])
+
+    def _load(self, path: str) -> None:
+        loaded = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._add(json.loads(line))
+                    loaded += 1
+                except (ValueError, KeyError):
+                    continue  # ✅ A line cut short by a crash is skipped
+        log.info("✅ Loaded %d queries (%d shapes) from the query log %s", loaded, len(self._entries), path)
+
+    def shapes(self, min_count: int = 1) -> List[Dict[str, Any]]:
+        """
+        Returns the shapes run at least `min_count` times, most Dremio time first, each with its
+        counts per source, total and maximum Dremio seconds, p50/p95 in milliseconds, tables and
+        the most recent SQL.
+        """
+        with self._lock:
+            entries = [dict(entry, latencies=list(entry["latencies"])) for entry in self._entries.values() if entry["count"] >= min_count]
+
+        for entry in entries:
+            latencies = sorted(entry.pop("latencies"))
+            entry["p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None
+            entry["p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None
+            entry["dremio_seconds"] = round(entry["dremio_seconds"], 4)
+        return sorted(entries, key=lambda entry: entry["dremio_seconds"], reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Shapes kept, queries counted per source and the total Dremio seconds.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "shapes": len(entries),
+            "queries": sum(entry["count"] for entry in entries),
+            "dremio": sum(entry["dremio"] for entry in entries),
+            "cache": sum(entry["cache"] for entry in entries),
+            "working_set": sum(entry["working_set"] for entry in entries),
+            "accelerated": sum(entry["accelerated"] for entry in entries),
+            "dremio_seconds": round(sum(entry["dremio_seconds"] for entry in entries), 4),
+        }
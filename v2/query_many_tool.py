@@ -0,0 +1,41 @@
+from typing import Optional, Type
+
+from langchain_community.tools.sql_database.tool import BaseSQLDatabaseTool
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from sql_validator import split_statements
+
+# 🔹 LangChain's single-query tool, and this tool that runs a batch of queries
+SQL_TOOL = "sql_db_query"
+QUERY_MANY_TOOL = "sql_db_query_many"
+
+
+class _QueryManyInput(BaseModel):
+    query: str = Field(..., description="Several independent SQL queries separated by semicolons.")
+
+
+class QuerySQLDatabaseManyTool(BaseSQLDatabaseTool, BaseTool):
+    """
+    Agent tool that runs several independent queries at once through `DremioSQLDatabase.run_many`,
+    so probing a few tables or columns costs one agent step and the time of the slowest query.
+    """
+
+    name: str = QUERY_MANY_TOOL
+    description: str = """
+    Execute several independent SQL queries at the same time and get back each result.
+    Input is the queries separated by semicolons, e.g. "SELECT ... ; SELECT ...".
+    Use this instead of calling sql_db_query repeatedly when no query needs the result of another.
+    Each result is returned under a "Query N:" header; a failing query returns its own error message.
+    """
+    args_schema: Type[BaseModel] = _QueryManyInput
+    max_concurrency: Optional[int] = None
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        """Splits the input into statements, runs them concurrently and lists the results in input order."""
+        queries = split_statements(query)
+        if not queries:
+            return "Error: No query given."
+        results = self.db.run_many(queries, max_concurrency=self.max_concurrency)
+        return "\n\n".join(f"Query {i}: {sql}\n{result}" for i, (sql, result) in enumerate(zip(queries, results), 1))
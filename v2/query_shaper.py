@@ -0,0 +1,291 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from answer_cache import SYNONYMS
+from schema_retriever import tokenize
+from telemetry import get_logger, span
+
+log = get_logger("query_shaper")
+
+# 🔹 Tokens with their positions; whitespace and comments are skipped
+TOKEN = re.compile(r"""
+    \s+|--[^\n]*|/\*.*?(?:\*/|\Z)
+    |(?P<string>'(?:[^']|'')*'?)
+    |(?P<quoted>"(?:[^"]|"")*"?)
+    |(?P<word>[^\W\d][\w$]*)
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+    |(?P<param>:[A-Za-z_]\w*)
+    |(?P<symbol>.)
+""", re.DOTALL | re.VERBOSE)
+
+# Aggregates that return one row per group
+AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX", "STDDEV", "VARIANCE", "APPROX_COUNT_DISTINCT", "MEDIAN", "LISTAGG"}
+
+# Words that make a question an aggregate ("what is the average temperature ...")
+AGGREGATE_WORDS = {"average", "total", "count", "number", "maximum", "minimum", "median", "sum", "how many"}
+
+# Clauses that may follow the table of `SELECT * FROM table`
+TRAILING_CLAUSES = {"WHERE", "ORDER", "LIMIT", "OFFSET", "FETCH"}
+
+# 🔹 Row estimates in the text of Dremio's EXPLAIN PLAN: "... TableScan(...) : rowType = ...: rowcount = 1.0E9, ..."
+ROWCOUNT = re.compile(r"rowcount = ([\d.]+(?:E[-+]?\d+)?)", re.IGNORECASE)
+CUMULATIVE_ROWS = re.compile(r"cumulative cost = \{([\d.]+(?:E[-+]?\d+)?) rows", re.IGNORECASE)
+
+
+class QueryCostError(Exception):
+    """The query's estimated cost is above the configured threshold; it was not run."""
+
+    def __init__(self, message: str, estimate: Dict[str, float]):
+        super().__init__(message)
+        self.estimate = estimate
+
+
+def _tokens(sql: str) -> List[tuple]:
+    """(kind, upper-cased text for words, start, end, depth) for every token, `depth` counting open parentheses."""
+    tokens, depth = [], 0
+    for match in TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        text = match.group(kind)
+        if text == ")":
+            depth -= 1
+        tokens.append((kind, text.upper() if kind == "word" else text, match.start(), match.end(), depth))
+        if text == "(":
+            depth += 1
+    return tokens
+
+
+def _words(text: str) -> Set[str]:
+    return {SYNONYMS.get(word, word) for word in tokenize(text)}
+
+
+def is_aggregate_question(question: str) -> bool:
+    """True when the question asks for an aggregate (average, total, count, ...) rather than rows."""
+    return bool(_words(question) & AGGREGATE_WORDS) or "how many" in question.lower()
+
+
+def parse_explain(plan: str) -> Dict[str, float]:
+    """
+    Reads row estimates from the text of `EXPLAIN PLAN FOR ...`.
+
+    Returns:
+        Dict[str, float]: `scan_rows` (rows the scans are estimated to read) and `cumulative_rows`
+        (the planner's cumulative row cost at the root), 0 when not found.
+    """
+    scan_rows = sum(float(match.group(1)) for line in plan.splitlines() if "Scan" in line for match in ROWCOUNT.finditer(line))
+    cumulative = CUMULATIVE_ROWS.search(plan)
+    return {"scan_rows": scan_rows, "cumulative_rows": float(cumulative.group(1)) if cumulative else 0.0}
+
+
+class QueryShaper:
+    """
+    Shapes the queries the agent sends before they reach Dremio:
+
+    - Injects a LIMIT into queries without one that return rows, and clamps larger LIMITs.
+    - Narrows `SELECT * FROM table` to the columns an aggregate question mentions.
+    - Optionally runs `EXPLAIN PLAN FOR` and rejects queries estimated to scan more than `max_scan_rows`.
+
+    Only single SELECT/WITH statements are shaped; anything else is returned unchanged.
+    """
+
+    def __init__(self, limit: Optional[int] = 1000, resolve: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+                 explain: Optional[Callable[[str], str]] = None, max_scan_rows: Optional[float] = None, estimate_cache_size: int = 256):
+        """
+        Args:
+            limit (Optional[int]): Most rows a shaped query may return (None or 0 leaves LIMITs alone).
+            resolve (Optional[Callable[[str], Optional[Dict[str, Any]]]]): Maps a table reference to its
+                catalog entry; enables projection pruning.
+            explain (Optional[Callable[[str], str]]): Returns the text plan of a query; enables cost checks.
+            max_scan_rows (Optional[float]): Highest estimated scan allowed (None or 0 disables the check).
+            estimate_cache_size (int): Plans kept per final SQL, so repeated queries are explained once.
+        """
+        self.limit = limit or None
+        self.resolve = resolve
+        self.explain = explain
+        self.max_scan_rows = max_scan_rows or None
+        self._estimates: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._estimate_cache_size = estimate_cache_size
+        self._lock = threading.Lock()
+
+    def shape(self, sql: str, question: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Args:
+            sql (str): The rewritten query.
+            question (Optional[str]): The question being answered, used for projection pruning.
+
+        Returns:
+            Dict[str, Any]: `sql` (the shaped query), `limit` (the LIMIT injected or clamped to, else None)
+            and `columns` (the columns `SELECT *` was narrowed to, else None).
+        """
+        result: Dict[str, Any] = {"sql": sql, "limit": None, "columns": None}
+        tokens = _tokens(sql)
+        end = next((i for i, token in enumerate(tokens) if token[1] == ";"), len(tokens))
+        if not tokens or tokens[0][1] not in ("SELECT", "WITH") or any(token[1] != ";" for token in tokens[end:]):
+            return result  # ✅ Only single queries are shaped
+
+        if question and self.resolve is not None and is_aggregate_question(question):
+            pruned = self._prune(sql, tokens, question)
+            if pruned is not None:
+                result["sql"], result["columns"] = pruned
+                tokens = _tokens(result["sql"])
+
+        if self.limit:
+            shaped = self._apply_limit(result["sql"], tokens)
+            if shaped is not None:
+                result["sql"] = shaped
+                result["limit"] = self.limit
+        return result
+
+    def _apply_limit(self, sql: str, tokens: List[tuple]) -> Optional[str]:
+        """Clamps a top-level LIMIT/FETCH above `limit`, or appends one when the query has none and returns rows."""
+        top = [token for token in tokens if token[4] == 0 and token[1] != ";"]
+        for i, token in enumerate(top):
+            if token[1] == "LIMIT" or token[1] == "FETCH" and i + 2 < len(top) and top[i + 1][1] in ("FIRST", "NEXT"):
+                count = top[i + 1] if token[1] == "LIMIT" else top[i + 2]
+                if count[0] == "number" and float(count[1]) > self.limit:
+                    return sql[:count[2]] + str(self.limit) + sql[count[3]:]
+                return None
+            if token[1] == "OFFSET":
+                return None
+
+        words = {token[1] for token in top if token[0] == "word"}
+        # Aggregate calls at the top level (the argument list is nested, so "(" and ")" are adjacent), not window functions
+        aggregated = any(
+            token[0] == "word" and token[1] in AGGREGATES and top[i + 1:i + 2] and top[i + 1][1] == "("
+            and not (i + 3 < len(top) and top[i + 3][1] == "OVER")
+            for i, token in enumerate(top)
+        )
+        if "FROM" not in words or aggregated and "GROUP" not in words:
+            return None  # ✅ No table, or a single aggregated row: nothing to limit
+        end = top[-1][3]
+        return f"{sql[:end]}\nLIMIT {self.limit}{sql[end:]}"
+
+    def _prune(self, sql: str, tokens: List[tuple], question: str) -> Optional[tuple]:
+        """Narrows `SELECT * FROM <one table> [WHERE/ORDER/LIMIT ...]` to the columns the question mentions."""
+        if len(tokens) < 4 or tokens[0][1] != "SELECT" or tokens[1][1] != "*" or tokens[2][1] != "FROM":
+            return None
+
+        # 🔹 The table reference (names joined by dots), an optional alias, then only trailing clauses
+        def is_name(i: int) -> bool:
+            return i < len(tokens) and (tokens[i][0] == "quoted" or tokens[i][0] == "word" and tokens[i][1] not in TRAILING_CLAUSES)
+
+        if not is_name(3):
+            return None
+        i = 4
+        while i + 1 < len(tokens) and tokens[i][1] == "." and is_name(i + 1):
+            i += 2
+        reference = sql[tokens[3][2]:tokens[i - 1][3]]
+        if i < len(tokens) and tokens[i][1] == "AS":
+            i += 1
+        if is_name(i) and tokens[i][0] == "word":
+            i += 1
+        if i < len(tokens) and tokens[i][1] not in TRAILING_CLAUSES and tokens[i][1] != ";":
+            return None  # Join, comma, subquery or anything more complex
+
+        entry = self.resolve(reference)
+        if entry is None or not entry["columns"]:
+            return None
+
+        wanted = _words(question)
+        columns = [column for column in entry["columns"] if _words(column) & wanted]
+        if not columns or len(columns) == len(entry["columns"]):
+            return None
+        projection = ", ".join('"{}"'.format(column.replace('"', '""')) for column in columns)
+        return sql[:tokens[1][2]] + projection + sql[tokens[1][3]:], columns
+
+    def estimate(self, sql: str) -> Optional[Dict[str, float]]:
+        """Runs EXPLAIN for `sql` (once per distinct query) and returns `parse_explain`'s estimates, or None without `explain`."""
+        if self.explain is None:
+            return None
+        with self._lock:
+            estimate = self._estimates.get(sql)
+            if estimate is not None:
+                self._estimates.move_to_end(sql)
+                return estimate
+
+        with span("sql_explain"):
+            estimate = parse_explain(self.explain(sql))
+        with self._lock:
+            self._estimates[sql] = estimate
+            while len(self._estimates) > self._estimate_cache_size:
+                self._estimates.popitem(last=False)
+        return estimate
+
+    def check_cost(self, sql: str) -> Optional[Dict[str, float]]:
+        """
+        Estimates `sql` when a threshold is set.
+
+        Raises:
+            QueryCostError: The query is estimated to scan more than `max_scan_rows` rows.
+        """
+        if self.max_scan_rows is None:
+            return None
+        try:
+            estimate = self.estimate(sql)
+        except Exception as e:
+            # ✅ A plan that cannot be read never blocks the query; Dremio reports real errors when it runs
+            log.warning("⚠️ EXPLAIN failed, cost not checked: %s", e)
+            return None
+        if estimate is not None and estimate["scan_rows"] > self.max_scan_rows:
+            raise QueryCostError(
+                f"The query is estimated to scan {estimate['scan_rows']:,.0f} rows, above the limit of {self.max_scan_rows:,.0f}. "
+                "Filter on partition or date columns, aggregate, or query a smaller table.",
+                estimate,
+            )
+        return estimate
+
+
+class CostTracker:
+    """Keeps the estimated and actual cost of the most recent queries and running totals."""
+
+    def __init__(self, size: int = 100):
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._totals = {"queries": 0, "rejected": 0, "limited": 0, "pruned": 0, "rows": 0, "bytes": 0, "seconds": 0.0, "estimated_scan_rows": 0.0}
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, shaped: Dict[str, Any], estimate: Optional[Dict[str, float]], report: Optional[Dict[str, Any]], seconds: float, rejected: bool = False) -> None:
+        """
+        Args:
+            sql (str): The final SQL.
+            shaped (Dict[str, Any]): The result of `QueryShaper.shape`.
+            estimate (Optional[Dict[str, float]]): EXPLAIN estimates, when the query was explained.
+            report (Optional[Dict[str, Any]]): The `read_with_budget` report (rows, bytes, truncated), None when it did not run.
+            seconds (float): Time spent on the query, EXPLAIN included.
+            rejected (bool): The query was refused because of its estimated cost.
+        """
+        entry = {
+            "sql": sql,
+            "at": time.time(),
+            "limit": shaped.get("limit"),
+            "columns": shaped.get("columns"),
+            "estimated_scan_rows": estimate["scan_rows"] if estimate else None,
+            "rows": report["rows"] if report else 0,
+            "bytes": report["bytes"] if report else 0,
+            "truncated": bool(report and report["truncated"]),
+            "seconds": round(seconds, 4),
+            "rejected": rejected,
+        }
+        with self._lock:
+            self._recent.append(entry)
+            totals = self._totals
+            totals["queries"] += 1
+            totals["rejected"] += rejected
+            totals["limited"] += entry["limit"] is not None
+            totals["pruned"] += entry["columns"] is not None
+            totals["rows"] += entry["rows"]
+            totals["bytes"] += entry["bytes"]
+            totals["seconds"] += seconds
+            totals["estimated_scan_rows"] += entry["estimated_scan_rows"] or 0
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """The most recent queries, oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._totals, seconds=round(self._totals["seconds"], 4))
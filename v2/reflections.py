@@ -0,0 +1,252 @@
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import pyarrow as pa
+
+from catalog_index import split_identifier
+from query_shaper import TOKEN, AGGREGATES
+from sql_validator import KEYWORDS
+from telemetry import get_logger
+
+log = get_logger("reflections")
+
+# 🔹 System tables listing reflections: Dremio Software, then Dremio Cloud
+REFLECTION_TABLES = ("sys.reflections", "sys.project.reflections")
+
+# Reflection statuses that let Dremio accelerate queries
+USABLE_STATUSES = ("CAN_ACCELERATE", "CAN_ACCELERATE_WITH_FAILURES")
+
+# Measures an aggregation reflection needs for each aggregate function
+MEASURES = {"SUM": ["SUM", "COUNT"], "AVG": ["SUM", "COUNT"], "COUNT": ["COUNT"], "MIN": ["MIN"], "MAX": ["MAX"], "APPROX_COUNT_DISTINCT": ["APPROXIMATE_COUNT_DISTINCT"]}
+
+# Clauses that switch the role of the columns that follow
+CLAUSES = {"SELECT": "select", "WHERE": "filter", "ON": "filter", "HAVING": "filter", "GROUP": "group", "ORDER": "order", "LIMIT": None, "OFFSET": None, "FETCH": None}
+
+REFLECTION_NAME = re.compile(r"[^a-z0-9]+")
+
+
+def dataset_key(name: str) -> str:
+    """Compares dataset names the way Dremio resolves them: quotes removed, case-insensitive."""
+    return ".".join(split_identifier(name)).lower()
+
+
+def _column_list(value: Any) -> List[str]:
+    """Column names of a reflection field: a list, or text like `a, b` or `amount (SUM, COUNT)`."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = [str(item) for item in value]
+    else:
+        items, depth, current = [], 0, ""
+        for char in str(value).strip("[]"):
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if char == "," and depth == 0:
+                items.append(current)
+                current = ""
+            else:
+                current += char
+        items.append(current)
+    return [item.split("(")[0].strip().strip('"').lower() for item in items if item.strip()]
+
+
+class ReflectionCatalog:
+    """
+    The reflections defined in Dremio, read from its system tables and kept for `ttl` seconds.
+
+    Only reflections whose status lets them accelerate queries are kept, by dataset. Reading
+    the system table is retried after `ttl` seconds when it fails (e.g. missing privileges), and
+    the previous list stays in use meanwhile. `version` is bumped whenever the list changes.
+    """
+
+    def __init__(self, fetch: Callable[[str], pa.Table], ttl: float = 300):
+        """
+        Args:
+            fetch (Callable[[str], pa.Table]): Runs a query against Dremio and returns its result.
+            ttl (float): Seconds before the reflections are read again.
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.version = 0
+        self._by_dataset: Dict[str, List[Dict[str, Any]]] = {}
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the usable reflections keyed by `dataset_key`, reading them again once the TTL passed."""
+        if time.time() >= self._expires:
+            with self._lock:
+                if time.time() >= self._expires:
+                    self._refresh()
+        return self._by_dataset
+
+    def _refresh(self) -> None:
+        self._expires = time.time() + self.ttl
+        for table in REFLECTION_TABLES:
+            try:
+                rows = self.fetch(f"SELECT * FROM {table}").to_pylist()
+                break
+            except Exception as e:
+                error = e
+        else:
+            log.warning("⚠️ Could not read reflections, keeping the previous list: %s", error)
+            return
+
+        by_dataset: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            row = {key.lower(): value for key, value in row.items()}
+            if not str(row.get("status", "")).upper().startswith(USABLE_STATUSES) or not row.get("dataset_name"):
+                continue
+            by_dataset.setdefault(dataset_key(row["dataset_name"]), []).append({
+                "name": row.get("reflection_name") or row.get("reflection_id"),
+                "type": "aggregation" if str(row.get("type", "")).upper().startswith("AGG") else "raw",
+                "dataset": row["dataset_name"],
+                "display": _column_list(row.get("display_columns")),
+                "dimensions": _column_list(row.get("dimensions")),
+                "measures": _column_list(row.get("measures")),
+            })
+
+        if by_dataset != self._by_dataset:
+            self._by_dataset = by_dataset
+            self.version += 1
+            log.info("🔄 Loaded %d usable reflection(s) on %d dataset(s).", sum(len(found) for found in by_dataset.values()), len(by_dataset))
+
+    def for_dataset(self, name: str) -> List[Dict[str, Any]]:
+        """Usable reflections of a table or view (bare names are not resolved)."""
+        return self.get().get(dataset_key(name), [])
+
+    def describe(self, name: str) -> Optional[str]:
+        """A short description of a dataset's reflections for the agent, or None."""
+        found = self.for_dataset(name)
+        if not found:
+            return None
+        parts = []
+        for reflection in found:
+            if reflection["type"] == "aggregation":
+                parts.append(f"aggregation reflection (dimensions: {', '.join(reflection['dimensions']) or '-'}; measures: {', '.join(reflection['measures']) or '-'})")
+            else:
+                parts.append(f"raw reflection ({', '.join(reflection['display']) or 'all columns'})")
+        return "accelerated by " + ", ".join(parts)
+
+    def stats(self) -> Dict[str, Any]:
+        by_dataset = self._by_dataset
+        return {"reflections": sum(len(found) for found in by_dataset.values()), "datasets": len(by_dataset), "version": self.version}
+
+
+def analyze_shape(sql: str, columns: Set[str]) -> Dict[str, Any]:
+    """
+    Sorts the columns a query uses by role: grouped, filtered, ordered, selected and aggregated.
+    Only names in `columns` (lower-cased column names of the query's tables) are kept, so aliases
+    and function names are left out.
+
+    Returns:
+        Dict[str, Any]: `aggregate` (the query groups or aggregates), `group`, `filter`, `order`
+        and `select` column lists and `measures` (column -> aggregate functions).
+    """
+    tokens = [(match.lastgroup, match.group(match.lastgroup)) for match in TOKEN.finditer(sql) if match.lastgroup]
+    roles: Dict[str, List[str]] = {"select": [], "filter": [], "group": [], "order": []}
+    measures: Dict[str, Set[str]] = {}
+    functions: List[Optional[str]] = []
+    clause: Optional[str] = None
+    aggregate = False
+
+    for i, (kind, text) in enumerate(tokens):
+        upper = text.upper()
+        following = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+        if text == "(":
+            # 🔹 The aggregate's name, "" for another function call, None for a subquery or grouping
+            previous = tokens[i - 1] if i else ("symbol", "")
+            called = previous[0] in ("word", "quoted") and previous[1].upper() not in KEYWORDS
+            functions.append(previous[1].upper() if previous[1].upper() in AGGREGATES else "" if called else None)
+            continue
+        if text == ")":
+            if functions:
+                functions.pop()
+            continue
+        if kind == "word" and upper in CLAUSES:
+            clause = CLAUSES[upper]
+            aggregate = aggregate or upper in ("GROUP", "HAVING")
+            continue
+        if kind == "word" and upper in ("FROM", "JOIN") and not (functions and functions[-1] == ""):
+            clause = None  # ✅ but not for EXTRACT(YEAR FROM ...)
+            continue
+        if kind not in ("word", "quoted") or following in (".", "("):
+            continue
+
+        name = text[1:-1].replace('""', '"').lower() if kind == "quoted" else text.lower()
+        if (kind == "word" and upper in KEYWORDS) or name not in columns or clause is None:
+            continue
+        aggregated = next((function for function in reversed(functions) if function), None)
+        if aggregated:
+            aggregate = True
+            measures.setdefault(name, set()).add(aggregated)
+        elif name not in roles[clause]:
+            roles[clause].append(name)
+
+    aggregate = aggregate or any(
+        kind == "word" and text.upper() in AGGREGATES and i + 1 < len(tokens) and tokens[i + 1][1] == "("
+        for i, (kind, text) in enumerate(tokens)
+    )
+    return {"aggregate": aggregate, "measures": {name: sorted(found) for name, found in measures.items()}, **roles}
+
+
+def recommend(shape: Dict[str, Any], table: str, fingerprint: str) -> Dict[str, Any]:
+    """
+    Proposes a reflection for a single-table query shape from `analyze_shape`: an aggregation
+    reflection (dimensions: grouped and filtered columns, measures: aggregated columns) for
+    aggregates, otherwise a raw reflection on the columns the query reads.
+
+    Returns:
+        Dict[str, Any]: `type`, `table`, `dimensions`, `measures`, `display` and the `ddl` to create it.
+    """
+    base = REFLECTION_NAME.sub("_", split_identifier(table)[-1].lower()).strip("_")
+    if shape["aggregate"]:
+        dimensions = list(dict.fromkeys(shape["group"] + shape["filter"] + [name for name in shape["select"] if name not in shape["measures"]]))
+        measures = {name: sorted({measure for function in functions for measure in MEASURES.get(function, ["COUNT"])}) for name, functions in shape["measures"].items()}
+        name = f"agent_{base}_agg_{fingerprint[:6]}"
+        ddl = f"ALTER TABLE {table} CREATE AGGREGATE REFLECTION {name} USING DIMENSIONS ({', '.join(dimensions)})"
+        if measures:
+            ddl += " MEASURES (" + ", ".join(f"{column} ({', '.join(found)})" for column, found in measures.items()) + ")"
+        return {"type": "aggregation", "table": table, "dimensions": dimensions, "measures": measures, "display": [], "ddl": ddl}
+
+    display = list(dict.fromkeys(shape["select"] + shape["filter"] + shape["group"] + shape["order"]))
+    name = f"agent_{base}_raw_{fingerprint[:6]}"
+    ddl = f"ALTER TABLE {table} CREATE RAW REFLECTION {name} USING DISPLAY ({', '.join(display)})"
+    return {"type": "raw", "table": table, "dimensions": [], "measures": {}, "display": display, "ddl": ddl}
+
+
+def covering_reflection(shape: Dict[str, Any], reflections: List[Dict[str, Any]], columns: Set[str]) -> Optional[Dict[str, Any]]:
+    """The first reflection that holds every column the shape needs in the role it needs it, or None."""
+    needed = set(shape["select"] + shape["filter"] + shape["group"] + shape["order"]) | set(shape["measures"])
+    for reflection in reflections:
+        if reflection["type"] == "raw" and needed <= set(reflection["display"] or columns):
+            return reflection
+        if reflection["type"] == "aggregation" and shape["aggregate"]:
+            dimensions = set(shape["group"] + shape["filter"] + [name for name in shape["select"] if name not in shape["measures"]])
+            if dimensions <= set(reflection["dimensions"]) and set(shape["measures"]) <= set(reflection["measures"]):
+                return reflection
+    return None
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Renders `DremioSQLDatabase.reflection_report` as text."""
+    lines = [
+        f"Reflection report: {report['queries']} queries, {report['shapes']} shapes, "
+        f"{report['dremio_seconds']:.2f}s in Dremio, {report['reflections']} usable reflection(s).",
+        "",
+        "Hot query shapes without a covering reflection (most Dremio time first):",
+    ]
+    if not report["candidates"]:
+        lines.append("  (none)")
+    for i, candidate in enumerate(report["candidates"], 1):
+        lines.append(f"{i}. [{candidate['fingerprint']}] {candidate['count']} runs, {candidate['dremio_seconds']:.2f}s in Dremio, p50 {candidate['p50_ms']} ms, p95 {candidate['p95_ms']} ms")
+        lines.append(f"   {candidate['shape']}")
+        lines.append(f"   {candidate['reason']}")
+        if candidate["recommendation"]:
+            lines.append(f"   -> {candidate['recommendation']['ddl']}")
+    if report["covered"]:
+        lines += ["", "Hot query shapes already covered by a reflection:"]
+        for covered in report["covered"]:
+            lines.append(f"- [{covered['fingerprint']}] {covered['count']} runs, {covered['reflection']} on {covered['table']}")
+    return "\n".join(lines)
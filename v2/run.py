@@ -1,8 +1,26 @@
 import sys
-from agent import sql_agent
+from agent import get_factory, run_agent
+from connection import AGENT_LOG_LEVEL, AGENT_LOG_FORMAT
+from reflections import format_report
+from telemetry import configure_logging
+
+configure_logging(AGENT_LOG_LEVEL, AGENT_LOG_FORMAT)
+
+# 🔹 `python run.py --reflections` prints the hot query shapes of DREMIO_QUERY_LOG instead of asking a question
+if sys.argv[1:] == ["--reflections"]:
+    print(format_report(get_factory().db.reflection_report()))
+    sys.exit()
+
+# 🔹 `--session <name>` continues a conversation: set AGENT_MEMORY_DB so it is kept between runs
+args = sys.argv[1:]
+session = None
+if "--session" in args[:-1]:
+    index = args.index("--session")
+    session = args[index + 1]
+    del args[index:index + 2]
 
 # Define a natural language question
-question = sys.argv[1] if len(sys.argv) > 1 else "What is the average temperature in NYC?"
+question = args[0] if args else "What is the average temperature in NYC?"
 
 prompt = f"""
 You are an expert SQL agent working with a Dremio database to answer the follow question "{question}".
@@ -18,7 +36,7 @@ Follow these steps every time you generate a SQL query. Ensure your queries are
 """
 
 print("\n🚀 Running Query Through Agent...")
-response = sql_agent.run(question)
+response = run_agent(question, session=session)
 
 print("\n✅ Agent Response:\n", response)
 
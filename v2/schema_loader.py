@@ -0,0 +1,324 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from catalog_index import CatalogIndex
+from telemetry import get_logger
+
+log = get_logger("schema_loader")
+
+# 🔹 Columnar layout of the snapshot: one row per table, columns kept as a list
+SNAPSHOT_SCHEMA = pa.schema([
+    ("TABLE_CATALOG", pa.string()),
+    ("TABLE_SCHEMA", pa.string()),
+    ("TABLE_NAME", pa.string()),
+    ("COLUMNS", pa.list_(pa.string())),
+])
+SNAPSHOT_FORMAT_VERSION = "1"
+
+# 🔹 Layout of the raw INFORMATION_SCHEMA.COLUMNS rows the snapshot is built from
+COLUMNS_SCHEMA = pa.schema([
+    ("TABLE_CATALOG", pa.string()),
+    ("TABLE_SCHEMA", pa.string()),
+    ("TABLE_NAME", pa.string()),
+    ("COLUMN_NAME", pa.string()),
+    ("ORDINAL_POSITION", pa.int32()),
+])
+
+COLUMNS_QUERY = """
+    SELECT TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION
+    FROM INFORMATION_SCHEMA.COLUMNS
+"""
+
+TABLES_QUERY = """
+    SELECT TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME
+    FROM INFORMATION_SCHEMA."TABLES"
+    ORDER BY TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME
+"""
+
+# Cheap per-schema fingerprint: Dremio aggregates server side, so only one row per schema
+# crosses the wire. NAME_HASH sums a hash of every "table.column" name, which does not depend on
+# the row order, so a renamed table or column (even to a name of the same length) or a column
+# moved to another table changes it. Only a hash collision goes unnoticed.
+FINGERPRINT_QUERY = """
+    SELECT TABLE_SCHEMA,
+           COUNT(DISTINCT TABLE_NAME) AS TABLE_COUNT,
+           COUNT(*) AS COLUMN_COUNT,
+           SUM(LENGTH(TABLE_NAME) + LENGTH(COLUMN_NAME)) AS NAME_LENGTH,
+           SUM(MOD(HASH64(TABLE_NAME || '.' || COLUMN_NAME), 1000000007)) AS NAME_HASH
+    FROM INFORMATION_SCHEMA.COLUMNS
+    GROUP BY TABLE_SCHEMA
+"""
+
+Fingerprints = Dict[str, List[int]]
+
+
+def _quote_literal(value: str) -> str:
+    """Quotes a string as a SQL literal."""
+    return "'{}'".format(value.replace("'", "''"))
+
+
+class SchemaSnapshot:
+    """
+    Immutable, columnar table→columns map built from INFORMATION_SCHEMA.COLUMNS.
+
+    The data lives in a single Arrow table with one row per table, so it can be written to
+    and memory-mapped from an Arrow IPC file without any per-row Python work.
+    """
+
+    def __init__(self, table: pa.Table, fingerprints: Optional[Fingerprints] = None):
+        self.table = table
+        self.fingerprints = fingerprints or {}
+
+    @classmethod
+    def from_columns(cls, columns: pa.Table, fingerprints: Optional[Fingerprints] = None) -> "SchemaSnapshot":
+        """
+        Groups raw INFORMATION_SCHEMA.COLUMNS rows into one row per table.
+
+        Args:
+            columns (pa.Table): TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME and
+                (optionally) ORDINAL_POSITION columns.
+            fingerprints (Optional[Fingerprints]): Per-schema fingerprints matching the data.
+
+        Returns:
+            SchemaSnapshot: The grouped snapshot.
+        """
+        if "ORDINAL_POSITION" in columns.column_names:
+            # ✅ Sort once so the grouped column lists keep their declared order
+            columns = columns.sort_by([("ORDINAL_POSITION", "ascending")])
+
+        grouped = (
+            columns.select(["TABLE_CATALOG", "TABLE_SCHEMA", "TABLE_NAME", "COLUMN_NAME"])
+            .group_by(["TABLE_CATALOG", "TABLE_SCHEMA", "TABLE_NAME"], use_threads=False)
+            .aggregate([("COLUMN_NAME", "list")])
+            .select(["TABLE_CATALOG", "TABLE_SCHEMA", "TABLE_NAME", "COLUMN_NAME_list"])
+            .rename_columns(SNAPSHOT_SCHEMA.names)
+            .sort_by([(name, "ascending") for name in ("TABLE_CATALOG", "TABLE_SCHEMA", "TABLE_NAME")])
+        )
+        return cls(grouped.cast(SNAPSHOT_SCHEMA), fingerprints)
+
+    @classmethod
+    def load(cls, path: str) -> "SchemaSnapshot":
+        """
+        Memory-maps a snapshot written by `save`. Column data is not copied into Python.
+
+        Args:
+            path (str): Location of the Arrow IPC snapshot file.
+
+        Returns:
+            SchemaSnapshot: The snapshot backed by the memory-mapped file.
+        """
+        source = pa.memory_map(path, "r")
+        table = ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+
+        if metadata.get(b"format_version", b"").decode() != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported schema snapshot format in {path}")
+
+        fingerprints = json.loads(metadata.get(b"fingerprints", b"{}"))
+        return cls(table.replace_schema_metadata(None), fingerprints)
+
+    def save(self, path: str) -> None:
+        """
+        Atomically writes the snapshot to an Arrow IPC file.
+
+        Args:
+            path (str): Destination of the snapshot file.
+        """
+        table = self.table.replace_schema_metadata({
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "fingerprints": json.dumps(self.fingerprints),
+        })
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def replace_schemas(self, schemas: Iterable[str], columns: pa.Table, fingerprints: Fingerprints) -> "SchemaSnapshot":
+        """
+        Returns a new snapshot where every table of `schemas` is replaced by the grouped `columns`.
+
+        Args:
+            schemas (Iterable[str]): Schemas that changed or disappeared.
+            columns (pa.Table): Fresh INFORMATION_SCHEMA.COLUMNS rows for those schemas.
+            fingerprints (Fingerprints): Current fingerprints for the whole catalog.
+
+        Returns:
+            SchemaSnapshot: The merged snapshot.
+        """
+        stale = pa.array(list(schemas), type=pa.string())
+        kept = self.table.filter(pc.invert(pc.is_in(self.table["TABLE_SCHEMA"], value_set=stale)))
+        fresh = SchemaSnapshot.from_columns(columns).table
+
+        merged = pa.concat_tables([kept, fresh]).sort_by(
+            [(name, "ascending") for name in ("TABLE_CATALOG", "TABLE_SCHEMA", "TABLE_NAME")]
+        )
+        return SchemaSnapshot(merged, fingerprints)
+
+    @property
+    def num_tables(self) -> int:
+        return self.table.num_rows
+
+    def to_catalog_index(self) -> CatalogIndex:
+        """
+        Builds the CatalogIndex used by DremioSQLDatabase.
+
+        Only one Python step per table is needed, the per-column work already happened in Arrow.
+        """
+        index = CatalogIndex()
+        column_lists = self.table["COLUMNS"].combine_chunks()
+        # ✅ numpy conversion is an order of magnitude faster than to_pylist for large string arrays
+        names = column_lists.flatten().to_numpy(zero_copy_only=False).tolist()
+        offsets = column_lists.offsets.to_pylist()
+
+        rows = zip(
+            self.table["TABLE_CATALOG"].to_numpy().tolist(),
+            self.table["TABLE_SCHEMA"].to_numpy().tolist(),
+            self.table["TABLE_NAME"].to_numpy().tolist(),
+        )
+        for i, (catalog, schema, table) in enumerate(rows):
+            index.add(catalog, schema, table, names[offsets[i]:offsets[i + 1]])
+
+        return index
+
+
+class SchemaLoader:
+    """
+    Loads Dremio schema metadata as Arrow, keeps an optional on-disk snapshot and only
+    re-reads the schemas whose fingerprint changed since the snapshot was written.
+    """
+
+    def __init__(self, dremio_connection, snapshot_path: Optional[str] = None, max_schemas_per_query: int = 200):
+        """
+        Args:
+            dremio_connection (DremioConnection): Connection to Dremio.
+            snapshot_path (Optional[str]): Arrow IPC file used to persist the snapshot between runs.
+            max_schemas_per_query (int): Maximum number of schemas in one `IN (...)` refresh query.
+        """
+        self.dremio_connection = dremio_connection
+        self.snapshot_path = snapshot_path
+        self.max_schemas_per_query = max_schemas_per_query
+
+    def _read(self, query: str) -> pa.Table:
+        return self.dremio_connection.toArrow(query).read_all()
+
+    def fetch_fingerprints(self) -> Fingerprints:
+        """Returns `{schema: [table_count, column_count, name_length, name_hash]}` for the whole catalog."""
+        table = self._read(FINGERPRINT_QUERY)
+        return {
+            schema: [int(tables or 0), int(columns or 0), int(length or 0), int(names or 0)]
+            for schema, tables, columns, length, names in zip(
+                table["TABLE_SCHEMA"].to_pylist(),
+                table["TABLE_COUNT"].to_pylist(),
+                table["COLUMN_COUNT"].to_pylist(),
+                table["NAME_LENGTH"].to_pylist(),
+                table["NAME_HASH"].to_pylist(),
+            )
+        }
+
+    def fetch_columns(self, schemas: Optional[List[str]] = None) -> pa.Table:
+        """
+        Reads INFORMATION_SCHEMA.COLUMNS for the given schemas, or the whole catalog if None.
+        """
+        if schemas is None:
+            return self._read(COLUMNS_QUERY)
+
+        chunks = []
+        for start in range(0, len(schemas), self.max_schemas_per_query):
+            batch = schemas[start:start + self.max_schemas_per_query]
+            in_list = ", ".join(_quote_literal(schema) for schema in batch)
+            chunks.append(self._read(f"{COLUMNS_QUERY} WHERE TABLE_SCHEMA IN ({in_list})"))
+
+        return pa.concat_tables(chunks) if chunks else COLUMNS_SCHEMA.empty_table()
+
+    def fetch_tables(self) -> List[Tuple[str, str, str]]:
+        """
+        Lists every table through INFORMATION_SCHEMA."TABLES" without reading any column metadata.
+
+        Returns:
+            List[Tuple[str, str, str]]: `(catalog, schema, table)` triples in catalog order.
+        """
+        table = self._read(TABLES_QUERY)
+        return list(zip(
+            table["TABLE_CATALOG"].to_numpy().tolist(),
+            table["TABLE_SCHEMA"].to_numpy().tolist(),
+            table["TABLE_NAME"].to_numpy().tolist(),
+        ))
+
+    def fetch_table_columns(self, schema: str, table_name: str) -> List[str]:
+        """
+        Reads the columns of one table, in ordinal order.
+
+        Args:
+            schema (str): TABLE_SCHEMA of the table.
+            table_name (str): TABLE_NAME of the table.
+
+        Returns:
+            List[str]: The column names.
+        """
+        table = self._read(
+            f"{COLUMNS_QUERY} WHERE TABLE_SCHEMA = {_quote_literal(schema)}"
+            f" AND TABLE_NAME = {_quote_literal(table_name)} ORDER BY ORDINAL_POSITION"
+        )
+        return table["COLUMN_NAME"].to_numpy().tolist()
+
+    def load_full(self) -> SchemaSnapshot:
+        """Reads the whole catalog and groups it into a snapshot."""
+        fingerprints = self.fetch_fingerprints()
+        return SchemaSnapshot.from_columns(self.fetch_columns(), fingerprints)
+
+    def refresh(self, snapshot: SchemaSnapshot) -> Tuple[SchemaSnapshot, List[str]]:
+        """
+        Re-reads only the schemas whose fingerprint differs from the snapshot.
+
+        Args:
+            snapshot (SchemaSnapshot): The previously loaded snapshot.
+
+        Returns:
+            Tuple[SchemaSnapshot, List[str]]: The up-to-date snapshot and the refreshed schemas.
+        """
+        current = self.fetch_fingerprints()
+        changed = sorted(
+            schema for schema in set(current) | set(snapshot.fingerprints)
+            if current.get(schema) != snapshot.fingerprints.get(schema)
+        )
+
+        if not changed:
+            return snapshot, []
+
+        live = [schema for schema in changed if schema in current]
+        columns = self.fetch_columns(live)
+        return snapshot.replace_schemas(changed, columns, current), changed
+
+    def load(self, refresh: bool = True) -> SchemaSnapshot:
+        """
+        Returns an up-to-date snapshot, reusing and incrementally refreshing the on-disk one when present.
+
+        Args:
+            refresh (bool): Check the on-disk snapshot against Dremio. When False it is returned as is
+                (no query at all), and the caller is expected to refresh it later, e.g. in the background.
+        """
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                snapshot = SchemaSnapshot.load(self.snapshot_path)
+                if not refresh:
+                    return snapshot
+                snapshot, changed = self.refresh(snapshot)
+                if changed:
+                    snapshot.save(self.snapshot_path)
+                return snapshot
+            except (OSError, ValueError, pa.ArrowInvalid) as e:
+                log.warning("⚠️ Ignoring unreadable schema snapshot %s: %s", self.snapshot_path, e)
+
+        snapshot = self.load_full()
+        if self.snapshot_path:
+            snapshot.save(self.snapshot_path)
+        return snapshot
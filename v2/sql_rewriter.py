@@ -0,0 +1,421 @@
+import re
+import string
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 🔹 Building blocks shared by the scanner patterns
+IDENTIFIER = r'(?:[A-Za-z_][\w$]*|"(?:[^"]|"")*")'
+SKIP = r"(?:\s+|--[^\n]*|/\*.*?(?:\*/|\Z))*"
+
+# Keywords that drive the scanner state (clause tracking), always matched
+STRUCTURE_WORDS = {
+    "FROM", "JOIN", "WITH", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "FETCH",
+    "UNION", "INTERSECT", "EXCEPT", "WINDOW", "QUALIFY", "SELECT",
+}
+
+# Keywords that end the table list of a FROM clause (ON/USING do not: `a JOIN b ON ..., c` is valid)
+FROM_CLAUSE_TERMINATORS = STRUCTURE_WORDS - {"FROM", "JOIN", "WITH"}
+
+# Functions whose arguments use FROM without naming a table, e.g. EXTRACT(YEAR FROM "date")
+FROM_FUNCTIONS = ("EXTRACT", "TRIM", "SUBSTRING", "OVERLAY")
+
+TABLE_REFERENCE = re.compile(SKIP + rf"({IDENTIFIER}(?:\s*\.\s*{IDENTIFIER})*)", re.DOTALL)
+CTE_DEFINITION = re.compile(SKIP + rf"(?:RECURSIVE\b{SKIP})?({IDENTIFIER}){SKIP}(?:\([^()]*\){SKIP})?AS{SKIP}(?=\()", re.IGNORECASE | re.DOTALL)
+NEXT_CTE_DEFINITION = re.compile(SKIP + rf",{SKIP}({IDENTIFIER}){SKIP}(?:\([^()]*\){SKIP})?AS{SKIP}(?=\()", re.IGNORECASE | re.DOTALL)
+NEXT_TOKEN = re.compile(SKIP + r"(?:(?P<string>')|(?P<word>[A-Za-z_][\w$]*)|(?P<quoted>\")|(?P<number>[\d.])|(?P<param>:[A-Za-z_])|(?P<symbol>\S))", re.DOTALL)
+PREVIOUS_WORD = re.compile(r"([A-Za-z_][\w$]*)\s*\Z")
+
+# Functions whose `AS` is followed by a type name, e.g. CAST(x AS DATE)
+CAST_FUNCTIONS = ("CAST", "TRY_CAST")
+
+# Functions whose parentheses `RewriteState` tracks, lower-cased, longest first (TRY_CAST ends in CAST)
+CALL_NAMES = tuple(sorted((name.lower() for name in FROM_FUNCTIONS + CAST_FUNCTIONS), key=len, reverse=True))
+
+# The scanner reads a copy of the SQL with only A-Z lower-cased, so positions stay the same
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# 🔹 Text the scanner consumes without stopping in Python: literals, quoted identifiers, comments and `::`
+SKIPPED_TOKENS = (r"'[^']*(?:''[^']*)*'?", r'"[^"]*(?:""[^"]*)*"?', r"--[^\n]*", r"/\*.*?(?:\*/|\Z)", r"::")
+SKIPPED_STARTS = frozenset("'\"-/")
+
+# Characters `peek` classifies without the regex: they cannot start whitespace, a comment, a literal or a word
+SYMBOLS = frozenset(",()=<>+*;|%")
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+def sql_literal(value: Any) -> str:
+    """Ensures safe and correctly formatted SQL values."""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, str):
+        return "'{}'".format(value.replace("'", "''"))
+    elif isinstance(value, (int, float)):
+        return str(value)
+    else:
+        return "NULL"
+
+
+def identifier_text(identifier: str) -> str:
+    """Removes the quotes of a quoted identifier."""
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+class RewriteRule:
+    """
+    Base class for pluggable rewrite rules.
+
+    A rule declares the `words` it wants to see and overrides the hooks it needs. Each hook returns
+    the replacement text for the token, or None to leave it to the next rule.
+    """
+
+    #: Words (matched case-insensitively as whole words) passed to `rewrite_word`
+    words: FrozenSet[str] = frozenset()
+
+    def rewrite_word(self, state: "RewriteState", token: Token) -> Optional[str]:
+        return None
+
+    def rewrite_table(self, state: "RewriteState", token: Token) -> Optional[str]:
+        """Called for each table reference found in a FROM/JOIN position (CTE names excluded)."""
+        return None
+
+    def rewrite_parameter(self, state: "RewriteState", token: Token) -> Optional[str]:
+        return None
+
+
+class RewriteState:
+    """
+    Per-statement scanner state shared by all rules while the rewriter walks the SQL once.
+
+    It tracks parenthesis depth, which FROM clauses and WITH lists are open and the CTE names defined so far.
+    """
+
+    def __init__(self, sql: str, parameters: Optional[Dict[str, Any]] = None):
+        self.sql = sql
+        self.parameters = parameters or {}
+        self.tables: Dict[str, Optional[str]] = {}  # table references already resolved in this statement
+        self.cte_names: Set[str] = set()
+        self.depth = 0
+        self._from_depths: List[int] = []
+        self._with_depths: List[int] = []
+        self._calls: List[Tuple[int, str]] = []
+
+    def peek(self, position: int) -> Tuple[str, str]:
+        """Returns the kind and first characters of the next token after `position`, skipping whitespace and comments."""
+        char = self.sql[position:position + 1]
+        if char in SYMBOLS and char:
+            return "symbol", char
+        match = NEXT_TOKEN.match(self.sql, position)
+        if match is None:
+            return "", ""
+        return match.lastgroup, match.group(match.lastgroup)
+
+    def previous_word(self, position: int) -> str:
+        """Returns the word right before `position` (upper-cased), or an empty string."""
+        match = PREVIOUS_WORD.search(self.sql, max(position - 64, 0), position)
+        return match.group(1).upper() if match else ""
+
+    def enclosing_call(self) -> str:
+        """
+        Returns the name of the function whose parentheses directly enclose the current token
+        (upper-cased), or an empty string. Only `FROM_FUNCTIONS` and `CAST_FUNCTIONS` are tracked.
+        """
+        if self._calls and self._calls[-1][0] == self.depth:
+            return self._calls[-1][1]
+        return ""
+
+    def in_from_clause(self) -> bool:
+        return bool(self._from_depths) and self._from_depths[-1] == self.depth
+
+    def open_from_clause(self) -> bool:
+        """Starts a FROM clause unless the FROM belongs to a function such as EXTRACT."""
+        if self.enclosing_call() in FROM_FUNCTIONS:
+            return False
+        if self.in_from_clause():
+            self._from_depths.pop()
+        self._from_depths.append(self.depth)
+        return True
+
+    def close_from_clause(self) -> None:
+        if self.in_from_clause():
+            self._from_depths.pop()
+
+    def open_with(self, position: int) -> None:
+        self._with_depths.append(self.depth)
+        self._define_cte(CTE_DEFINITION, position)
+
+    def open_paren(self, call: str = "") -> None:
+        """Opens a parenthesis, the argument list of the function `call` (upper-cased) when given."""
+        self.depth += 1
+        if call:
+            self._calls.append((self.depth, call))
+
+    def close_paren(self, position: int) -> None:
+        self.close_from_clause()
+        if self._calls and self._calls[-1][0] == self.depth:
+            self._calls.pop()
+        self.depth = max(self.depth - 1, 0)
+
+        # ✅ The body of a CTE just closed: either another CTE follows or the main query starts
+        if self._with_depths and self._with_depths[-1] == self.depth:
+            if not self._define_cte(NEXT_CTE_DEFINITION, position):
+                self._with_depths.pop()
+
+    def end_statement(self) -> None:
+        self.cte_names.clear()
+        self.depth = 0
+        self._from_depths.clear()
+        self._with_depths.clear()
+        self._calls.clear()
+
+    def _define_cte(self, pattern, position: int) -> bool:
+        match = pattern.match(self.sql, position)
+        if match is None:
+            return False
+        self.cte_names.add(identifier_text(match.group(1)).lower())
+        return True
+
+
+class TableQualificationRule(RewriteRule):
+    """Replaces table references in FROM/JOIN positions with their fully qualified names."""
+
+    def __init__(self, resolve: Callable[[str], Optional[str]]):
+        """
+        Args:
+            resolve (Callable[[str], Optional[str]]): Maps a table reference to its fully qualified name, or None.
+        """
+        self.resolve = resolve
+
+    def rewrite_table(self, state: RewriteState, token: Token) -> Optional[str]:
+        # ✅ Generated queries name the same few tables again and again
+        if token.text not in state.tables:
+            state.tables[token.text] = self.resolve(token.text)
+        return state.tables[token.text]
+
+
+class KeywordQuotingRule(RewriteRule):
+    """Quotes column names that collide with Dremio keywords, leaving real keyword uses alone."""
+
+    JOIN_MODIFIERS = {"INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER", "NATURAL"}
+
+    def __init__(self, keywords: Iterable[str]):
+        self.words = frozenset(keyword.upper() for keyword in keywords)
+
+    def rewrite_word(self, state: RewriteState, token: Token) -> Optional[str]:
+        word = token.text.upper()
+        following_kind, following = state.peek(token.end)
+
+        if following == "(":
+            return None  # function call, e.g. DATE(...)
+        if word in ("GROUP", "ORDER") and following.upper() == "BY":
+            return None
+        if word in ("DATE", "TIMESTAMP") and following_kind == "string":
+            return None  # typed literal, e.g. DATE '2024-01-01'
+        if word == "OFFSET" and following_kind in ("number", "param"):
+            return None
+        if word == "JOIN" and (following_kind in ("word", "quoted") or state.previous_word(token.start) in self.JOIN_MODIFIERS):
+            return None
+
+        # ✅ Dremio reads a quoted type name as an unknown user-defined type
+        before = state.sql[max(token.start - 32, 0):token.start].rstrip()
+        if before.endswith("::"):
+            return None  # type of a cast, e.g. x::DATE
+        if state.enclosing_call() in CAST_FUNCTIONS and before[-2:].upper() == "AS" and not (before[-3:-2].isalnum() or before[-3:-2] in ("_", "$")):
+            return None  # type of a cast, e.g. CAST(x AS TIMESTAMP)
+
+        return f'"{token.text}"'
+
+
+class ParameterBindingRule(RewriteRule):
+    """Binds `:name` placeholders outside of string literals and comments."""
+
+    def rewrite_parameter(self, state: RewriteState, token: Token) -> Optional[str]:
+        name = token.text[1:]
+        if name not in state.parameters:
+            return None
+        return sql_literal(state.parameters[name])
+
+
+class SQLRewriter:
+    """
+    Rewrites a statement in a single linear scan, running every rule on the tokens it asks for.
+
+    The scanner regex only stops on tokens that matter (clause keywords, parentheses, parameters
+    and the rules' words), plus the literals, quoted identifiers and comments it skips whole.
+    Every alternative starts with a literal character, so the regex engine jumps over the rest of
+    the text without trying them at each position. Everything not replaced is copied through
+    unchanged.
+    """
+
+    def __init__(self, rules: List[RewriteRule]):
+        self.rules = rules
+        self._word_hooks: Dict[str, List[Callable]] = {}
+        for rule in rules:
+            for word in rule.words:
+                self._word_hooks.setdefault(word.upper(), []).append(rule.rewrite_word)
+        self._table_hooks = self._hooks("rewrite_table")
+        self._parameter_hooks = self._hooks("rewrite_parameter")
+
+        # 🔹 What each word the scanner stops on does: (clause role, hooks), keyed by the lower-cased word
+        self._words: Dict[str, Tuple[str, List[Callable]]] = {}
+        for word in set(self._word_hooks) | STRUCTURE_WORDS:
+            role = word if word in ("FROM", "JOIN", "WITH") else "END_FROM" if word in FROM_CLAUSE_TERMINATORS else ""
+            self._words[word.lower()] = (role, self._word_hooks.get(word, []))
+
+        # 🔹 Scanner pairs keyed by the rule words that occur in a statement
+        self._rule_words = frozenset(word.lower() for word in self._word_hooks)
+        self._scanners: Dict[FrozenSet[str], Tuple[Any, Any]] = {}
+
+    def _hooks(self, name: str) -> List[Callable]:
+        """Bound hooks of the rules that override `name`."""
+        return [getattr(rule, name) for rule in self.rules if getattr(type(rule), name) is not getattr(RewriteRule, name)]
+
+    def _scanners_for(self, text: str) -> Tuple[Any, Any]:
+        """
+        Returns the (main, FROM clause) scanners for the lower-cased statement `text`. A rule word
+        that does not occur anywhere in the text cannot match, so it is left out of the regex.
+        Outside a FROM clause only FROM/JOIN/WITH change the state, and commas do not matter.
+        """
+        words = frozenset(word for word in self._rule_words if word in text)
+        scanners = self._scanners.get(words)
+        if scanners is None:
+            scanners = self._scanners[words] = (
+                self._compile(words | {"from", "join", "with"}, commas=False),
+                self._compile(words | {word.lower() for word in STRUCTURE_WORDS}, commas=True),
+            )
+        return scanners
+
+    @staticmethod
+    def _compile(words: Set[str], commas: bool):
+        """
+        Builds a scanner over the lower-cased SQL that finds the next token Python has to look at.
+        Words only match at the start of a word: the lookbehind after their first letter checks the
+        character before it.
+        """
+        endings: Dict[str, List[str]] = {}
+        for word in sorted((word.lower() for word in words), key=len, reverse=True):
+            endings.setdefault(word[0], []).append(re.escape(word[1:]) + r"(?![\w$])")
+
+        # ✅ One branch per first letter: the engine tries a single branch at each candidate letter
+        tokens = list(SKIPPED_TOKENS) + [r":[a-z_]\w*", r"\(", r"\)", ";"] + ([","] if commas else [])
+        for first, rests in endings.items():
+            first = re.escape(first)
+            tokens.append(rf"{first}(?<![\w$]{first})(?:{'|'.join(rests)})")
+        return re.compile("|".join(tokens), re.DOTALL)
+
+    @staticmethod
+    def _call_name(text: str, position: int) -> str:
+        """
+        Returns the tracked function (`FROM_FUNCTIONS`, `CAST_FUNCTIONS`, upper-cased) whose argument
+        list opens at `position` in the lower-cased SQL, or an empty string.
+        """
+        end = position
+        while end and text[end - 1].isspace():
+            end -= 1
+        if not text.endswith(CALL_NAMES, 0, end):
+            return ""
+        for name in CALL_NAMES:
+            before = end - len(name)
+            if text.startswith(name, before) and not (before and (text[before - 1].isalnum() or text[before - 1] in "_$")):
+                return name.upper()
+        return ""
+
+    def rewrite(self, sql: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Args:
+            sql (str): The statement to rewrite.
+            parameters (Optional[Dict[str, Any]]): Values for `:name` placeholders.
+
+        Returns:
+            str: The rewritten statement.
+        """
+        state = RewriteState(sql, parameters)
+        text = sql.translate(ASCII_LOWER)
+        scanner, from_scanner = self._scanners_for(text)
+        scan, scan_from = scanner.search, from_scanner.search
+        search = scan
+        words = self._words
+        output: List[str] = []
+        emitted = position = 0
+
+        while True:
+            match = search(text, position)
+            if match is None:
+                break
+            start, position = match.span()
+            first = text[start]
+            if first in SKIPPED_STARTS:
+                continue
+            if first == "(":
+                state.open_paren(self._call_name(text, start))
+                search = scan  # a FROM clause never starts right inside a parenthesis
+                continue
+            if first == ")":
+                state.close_paren(position)
+                search = scan_from if state.in_from_clause() else scan
+                continue
+
+            table_expected = False
+            if first == ":":
+                if text[start + 1] == ":":
+                    continue
+                kind, hooks = "param", self._parameter_hooks
+            elif first == ",":
+                kind, hooks, table_expected = "comma", (), True
+            elif first == ";":
+                state.end_statement()
+                search = scan
+                continue
+            else:
+                kind = "word"
+                role, hooks = words[text[start:position]]
+                if role == "FROM":
+                    table_expected = state.open_from_clause()
+                elif role == "JOIN":
+                    table_expected = True
+                elif role == "WITH":
+                    state.open_with(position)
+                elif role == "END_FROM":
+                    state.close_from_clause()
+                if role:
+                    search = scan_from if state.in_from_clause() else scan
+
+            if hooks:
+                token = Token(kind, sql[start:position], start, position)
+                replacement = hooks[0](state, token) if len(hooks) == 1 else self._apply(hooks, state, token)
+                if replacement is not None:
+                    output.append(sql[emitted:start])
+                    output.append(replacement)
+                    emitted = position
+
+            if table_expected:
+                reference = TABLE_REFERENCE.match(sql, position)
+                if reference is None:
+                    continue
+                token = Token("table", reference.group(1), reference.start(1), reference.end(1))
+                position = token.end
+                if "." not in token.text and identifier_text(token.text).lower() in state.cte_names:
+                    continue
+
+                replacement = self._apply(self._table_hooks, state, token)
+                if replacement is not None:
+                    output.append(sql[emitted:token.start])
+                    output.append(replacement)
+                    emitted = token.end
+
+        output.append(sql[emitted:])
+        return "".join(output)
+
+    @staticmethod
+    def _apply(hooks: Iterable[Callable], state: RewriteState, token: Token) -> Optional[str]:
+        for hook in hooks:
+            replacement = hook(state, token)
+            if replacement is not None:
+                return replacement
+        return None
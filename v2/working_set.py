@@ -0,0 +1,425 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+
+from query_shaper import TOKEN
+from result_cache import ResultCache
+from telemetry import get_logger
+
+log = get_logger("working_set")
+
+# 🔹 Clauses that end the outermost WHERE clause
+WHERE_TERMINATORS = {"GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "FETCH", "UNION", "INTERSECT", "EXCEPT", "WINDOW", "QUALIFY"}
+
+# Words after FROM/JOIN that are not a table name (table functions, lateral joins)
+NOT_TABLES = {"LATERAL", "UNNEST", "TABLE", "SELECT", "VALUES"}
+
+# Words that cannot be a table alias
+NOT_ALIASES = WHERE_TERMINATORS | {
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER", "NATURAL", "ON", "USING", "AS",
+}
+
+# Clauses a working set query may not have: its result must be rows of a single table
+NOT_IN_WORKING_SET = {"JOIN", "GROUP", "HAVING", "DISTINCT", "UNION", "INTERSECT", "EXCEPT", "OFFSET", "FETCH", "WINDOW", "QUALIFY", "OVER"}
+
+
+def _tokens(sql: str) -> List[tuple]:
+    """(kind, upper-cased text for words, start, end) for every token outside comments."""
+    tokens = []
+    for match in TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind is not None:
+            text = match.group(kind)
+            tokens.append((kind, text.upper() if kind == "word" else text, match.start(), match.end()))
+    return tokens
+
+
+def _name_key(parts: List[str]) -> str:
+    """Compares table names the way Dremio resolves them: quotes removed, case-insensitive."""
+    return ".".join(part[1:-1].replace('""', '"') if part.startswith('"') else part for part in parts).lower()
+
+
+def analyze(sql: str) -> Optional[Dict[str, Any]]:
+    """
+    Finds the tables a final SQL statement reads and the conditions of its outermost WHERE clause.
+
+    Returns:
+        Optional[Dict[str, Any]]: `references` (one per FROM/JOIN table: its span, name key and
+        alias), `conditions` (the AND-ed conditions of the outermost WHERE, normalized), `where`
+        (the span of that WHERE clause and of each condition, or None), `select` (the plain column names selected, None for anything else), `star`, `limit`,
+        `plain` (no join, grouping, DISTINCT, set operation or window) and `subqueries`;
+        None for statements that cannot be analyzed (several statements, table functions, ...).
+    """
+    tokens = _tokens(sql)
+    if not tokens or tokens[0][1] not in ("SELECT", "WITH"):
+        return None
+    if any(token[1] == ";" for token in tokens[:-1]):
+        return None
+
+    references: List[Dict[str, Any]] = []
+    where: List[tuple] = []
+    stack: List[bool] = []  # True for parentheses holding a subquery
+    subqueries = False
+    plain = True
+    limit = None
+    where_start = 0
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i][0], tokens[i][1]
+        in_query = not stack or stack[-1]
+
+        if text == "(":
+            opens_query = i + 1 < len(tokens) and tokens[i + 1][1] in ("SELECT", "WITH")
+            subqueries = subqueries or opens_query
+            stack.append(opens_query)
+        elif text == ")":
+            if stack:
+                stack.pop()
+        elif kind == "word" and in_query and text in NOT_IN_WORKING_SET and text != "JOIN":
+            plain = False
+        elif kind == "word" and in_query and text in ("FROM", "JOIN"):
+            plain = plain and text == "FROM"
+            i = _read_references(tokens, i + 1, references)
+            if i < 0:
+                return None
+            continue
+        elif kind == "word" and text == "WHERE" and not stack:
+            where_start, i, depth = tokens[i][2], i + 1, 0
+            while i < len(tokens) and not (tokens[i][0] == "word" and tokens[i][1] in WHERE_TERMINATORS and depth == 0):
+                depth += {"(": 1, ")": -1}.get(tokens[i][1], 0)
+                where.append(tokens[i])
+                i += 1
+            continue
+        elif kind == "word" and text == "LIMIT" and not stack and i + 1 < len(tokens) and tokens[i + 1][0] == "number":
+            limit = int(float(tokens[i + 1][1]))
+        i += 1
+
+    parts = _conditions(where)
+    return {
+        "references": references,
+        "conditions": sorted({part["text"] for part in parts}),
+        "where": {"start": where_start, "end": where[-1][3], "parts": parts} if where else None,
+        "select": _select_list(tokens),
+        "star": len(tokens) > 2 and tokens[1][1] == "*" and tokens[2][1] == "FROM",
+        "limit": limit,
+        "plain": plain and tokens[0][1] == "SELECT",
+        "subqueries": subqueries,
+    }
+
+
+def _read_references(tokens: List[tuple], i: int, references: List[Dict[str, Any]]) -> int:
+    """
+    Reads the comma-separated table references after FROM (or the one after JOIN) starting at
+    token `i`. Returns the index of the first token after them, or -1 for a table function.
+    """
+    while i < len(tokens):
+        if tokens[i][1] == "(":
+            return i  # subquery, analyzed as it is scanned
+        if tokens[i][0] not in ("word", "quoted") or tokens[i][1] in NOT_TABLES:
+            return -1
+
+        start = i
+        parts = [tokens[i][1] if tokens[i][0] == "quoted" else tokens[i][1].lower()]
+        i += 1
+        while i + 1 < len(tokens) and tokens[i][1] == "." and tokens[i + 1][0] in ("word", "quoted"):
+            parts.append(tokens[i + 1][1] if tokens[i + 1][0] == "quoted" else tokens[i + 1][1].lower())
+            i += 2
+        if i < len(tokens) and tokens[i][1] in ("(", "AT"):
+            return -1  # table function, e.g. TABLE(...), or a table at a branch, tag or snapshot
+        end = i - 1
+
+        alias = None
+        if i < len(tokens) and tokens[i][1] == "AS":
+            i += 1
+        if i < len(tokens) and tokens[i][0] in ("word", "quoted") and tokens[i][1] not in NOT_ALIASES:
+            alias = tokens[i][1]
+            i += 1
+        references.append({"start": tokens[start][2], "end": tokens[end][3], "key": _name_key(parts), "alias": alias})
+
+        if i < len(tokens) and tokens[i][1] == ",":
+            i += 1
+            continue
+        return i
+    return i
+
+
+def _conditions(where: List[tuple]) -> List[Dict[str, Any]]:
+    """Splits a WHERE clause at its top-level ANDs into normalized texts (qualifiers such as `o.` dropped) and spans."""
+    conditions, current, depth, between, start = [], [], 0, False, 0
+    for i, token in enumerate(where):
+        text = token[1]
+        depth += {"(": 1, ")": -1}.get(text, 0)
+        if text == "BETWEEN":
+            between = True
+        elif text == "AND" and depth == 0:
+            if between:
+                between = False
+            else:
+                conditions.append({"text": " ".join(current), "start": where[start][2], "end": where[i - 1][3]})
+                current, start = [], i + 1
+                continue
+        if token[0] in ("word", "quoted") and i + 1 < len(where) and where[i + 1][1] == ".":
+            continue
+        if text == "." and i > 0 and where[i - 1][0] in ("word", "quoted"):
+            continue
+        current.append(text)
+    if current:
+        conditions.append({"text": " ".join(current), "start": where[start][2], "end": where[-1][3]})
+    return conditions
+
+
+def _select_list(tokens: List[tuple]) -> Optional[List[str]]:
+    """The column names of `SELECT a, b, "c" FROM`, or None when the list holds anything else."""
+    columns, i = [], 1
+    while i < len(tokens):
+        if tokens[i][0] not in ("word", "quoted") or tokens[i][1] in ("FROM", "DISTINCT"):
+            return None
+        if i + 2 < len(tokens) and tokens[i + 1][1] == "." and tokens[i + 2][0] in ("word", "quoted"):
+            i += 2  # qualified column, e.g. o.region
+        columns.append(tokens[i][1])
+        if i + 1 < len(tokens) and tokens[i + 1][1] == ",":
+            i += 2
+        elif i + 1 < len(tokens) and tokens[i + 1][1] == "FROM":
+            return columns
+        else:
+            return None
+    return None
+
+
+class _Session:
+    """One conversation's working sets, registered as views of its own DuckDB connection."""
+
+    def __init__(self, memory_limit: int):
+        import duckdb  # ✅ Only loaded once a session keeps a working set
+
+        self.connection = duckdb.connect()
+        self.connection.execute(f"SET memory_limit = '{max(memory_limit // (1024 * 1024), 16)}MB'")
+        self.connection.execute("SET threads = 1")  # ✅ Sessions answer in parallel, each on one thread
+        self.sets: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.bytes = 0
+        self.used = time.time()
+        self.lock = threading.Lock()
+        self.views = 0
+        self.closed = False
+
+    def close(self) -> None:
+        """Closes the DuckDB connection; call it with `lock` held."""
+        self.closed = True
+        self.sets.clear()
+        self.bytes = 0
+        self.connection.close()
+
+
+class WorkingSetCache:
+    """
+    Session-scoped local cache of row-level results for follow-up questions.
+
+    A complete result of `SELECT <columns> FROM <table> [WHERE ...]` run in a session is kept as
+    an Arrow table and registered in the session's in-process DuckDB database. A later query of
+    the session that reads only that table, keeps the working set's WHERE conditions (it may add
+    more) and uses only its columns runs in DuckDB over the cached rows instead of in Dremio.
+    Anything else, or any DuckDB error, falls back to Dremio.
+
+    Every session has a memory budget in Arrow buffer bytes; its least recently used working
+    sets are evicted to stay within it. Sessions idle for `ttl` seconds are dropped, as are the
+    least recently used sessions beyond `max_sessions`.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_sessions: int = 32, ttl: float = 600):
+        """
+        Args:
+            max_bytes (int): Memory budget of each session, in Arrow buffer bytes.
+            max_sessions (int): Sessions kept at the same time.
+            ttl (float): Seconds a working set stays valid, and an idle session is kept.
+        """
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.stored = 0
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def answer(self, session_id: str, sql: str) -> Optional[pa.Table]:
+        """
+        Runs the final SQL locally when one of the session's working sets holds every row and column it needs.
+
+        Returns:
+            Optional[pa.Table]: The result, or None when the query has to go to Dremio.
+        """
+        with self._lock:
+            self._prune(time.time())
+            session = self._sessions.get(session_id)
+        if session is None or not session.sets:
+            return None
+
+        # ✅ Dremio's integer division differs from DuckDB's, so queries dividing (`/`) are never run locally
+        query = analyze(sql) if ResultCache.cacheable(sql) and "/" not in sql else None
+        keys = {reference["key"] for reference in query["references"]} if query else set()
+        if len(keys) != 1:
+            self.misses += 1
+            return None
+        key = keys.pop()
+
+        with session.lock:
+            if session.closed:
+                return None
+            session.used = time.time()
+            candidates = sorted(
+                (entry for entry in session.sets.values() if entry["key"] == key and entry["expires"] > session.used and self._covers(entry, query)),
+                key=lambda entry: entry["rows"],
+            )
+            if not candidates:
+                self.misses += 1
+                return None
+
+            for entry in candidates:
+                try:
+                    table = session.connection.execute(self._local_sql(sql, query, entry)).fetch_record_batch().read_all()
+                except Exception as e:
+                    log.debug("⚠️ Working set %s cannot answer the query: %s", entry["view"], e)
+                    continue
+                session.sets.move_to_end(entry["sql"])
+                self.hits += 1
+                return table
+
+        self.fallbacks += 1
+        return None
+
+    @staticmethod
+    def _covers(entry: Dict[str, Any], query: Dict[str, Any]) -> bool:
+        """True when the working set holds every row the query can read (its columns are checked by DuckDB)."""
+        if not entry["conditions"]:
+            return True
+        # ✅ A filtered working set only answers single-scan queries that keep its filter
+        return len(query["references"]) == 1 and not query["subqueries"] and set(entry["conditions"]) <= set(query["conditions"])
+
+    @staticmethod
+    def _local_sql(sql: str, query: Dict[str, Any], entry: Dict[str, Any]) -> str:
+        """
+        Points every table reference of the query at the working set's view, keeping its alias, and
+        drops the working set's own conditions, which all its rows meet (their columns may not be kept).
+        """
+        edits = []
+        for reference in query["references"]:
+            name = entry["view"] if reference["alias"] else f'{entry["view"]} AS "{reference["key"].rsplit(".", 1)[-1]}"'
+            edits.append((reference["start"], reference["end"], name))
+        if entry["conditions"]:
+            kept = [sql[part["start"]:part["end"]] for part in query["where"]["parts"] if part["text"] not in entry["conditions"]]
+            edits.append((query["where"]["start"], query["where"]["end"], f"WHERE {' AND '.join(kept)}" if kept else ""))
+
+        for start, end, text in sorted(edits, reverse=True):
+            sql = sql[:start] + text + sql[end:]
+        return sql
+
+    def offer(self, session_id: str, sql: str, table: pa.Table) -> bool:
+        """
+        Keeps a complete Dremio result as a working set of the session when it is the rows of one table.
+
+        Returns:
+            bool: Whether the result was kept.
+        """
+        if table.nbytes > self.max_bytes or not ResultCache.cacheable(sql):
+            return False
+        query = analyze(sql)
+        if query is None or not query["plain"] or query["subqueries"] or len(query["references"]) != 1:
+            return False
+        if not query["star"] and query["select"] is None:
+            return False
+        if query["limit"] is not None and table.num_rows >= query["limit"]:
+            return False  # ✅ The LIMIT may have cut rows, so the result does not hold the whole working set
+
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_bytes)
+                while len(self._sessions) > self.max_sessions:
+                    _, oldest = self._sessions.popitem(last=False)
+                    with oldest.lock:
+                        self.evicted += len(oldest.sets)
+                        oldest.close()
+            self._sessions.move_to_end(session_id)
+
+        with session.lock:
+            if session.closed:
+                return False  # ✅ Evicted by another thread in the meantime
+            session.used = now
+            old = session.sets.pop(sql, None)
+            if old is not None:
+                self._unregister(session, old)
+            while session.sets and session.bytes + table.nbytes > self.max_bytes:
+                _, evicted = session.sets.popitem(last=False)
+                self._unregister(session, evicted)
+                self.evicted += 1
+
+            session.views += 1
+            view = f"working_set_{session.views}"
+            session.connection.register(view, table)
+            session.sets[sql] = {
+                "sql": sql,
+                "view": view,
+                "key": query["references"][0]["key"],
+                "conditions": query["conditions"],
+                "rows": table.num_rows,
+                "bytes": table.nbytes,
+                "expires": now + self.ttl,
+            }
+            session.bytes += table.nbytes
+            self.stored += 1
+        log.debug("📦 Working set %s kept for session %s: %d rows, %d bytes", view, session_id, table.num_rows, table.nbytes)
+        return True
+
+    @staticmethod
+    def _unregister(session: _Session, entry: Dict[str, Any]) -> None:
+        session.connection.unregister(entry["view"])
+        session.bytes -= entry["bytes"]
+
+    def drop(self, session_id: str) -> None:
+        """Forgets a session and its working sets."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            with session.lock:
+                session.close()
+
+    def clear(self) -> None:
+        """Forgets every session, e.g. after the catalog changed."""
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), OrderedDict()
+        for session in sessions:
+            with session.lock:
+                session.close()
+
+    def _prune(self, now: float) -> None:
+        """Drops sessions idle for longer than the TTL (called with the lock held)."""
+        for session_id in [session_id for session_id, session in self._sessions.items() if now - session.used > self.ttl]:
+            session = self._sessions.pop(session_id)
+            with session.lock:
+                session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: `hits`, `misses`, `fallbacks` (a working set matched but DuckDB could not
+            run the query), `stored`, `evicted`, `sessions`, `working_sets` and `bytes`.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "sessions": len(sessions),
+            "working_sets": sum(len(session.sets) for session in sessions),
+            "bytes": sum(session.bytes for session in sessions),
+        }
@@ -1,67 +1,277 @@
+import asyncio
+import difflib
 import re
-from typing import Union, Optional, Dict, Any, Sequence, List
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Union, Optional, Dict, Any, Sequence, List, Tuple
 from sqlalchemy.engine.default import DefaultDialect
-from dremio_simple_query.connect import DremioConnection
 from langchain_community.utilities.sql_database import SQLDatabase
-import pandas as pd
+import pyarrow as pa
+from schema_loader import SchemaLoader
+from catalog_index import CatalogIndex
+from schema_retriever import SchemaRetriever
+from sql_validator import SQLValidator, QueryValidationError
+from query_shaper import QueryShaper, QueryCostError, CostTracker
+from sql_rewriter import SQLRewriter, TableQualificationRule, KeywordQuotingRule, ParameterBindingRule
+from rewrite_cache import RewriteCache
+from result_cache import ResultCache
+from working_set import WorkingSetCache, analyze
+from query_log import QueryLog
+from reflections import ReflectionCatalog, analyze_shape, covering_reflection, dataset_key, recommend
+from arrow_cursor import ArrowCursor, table_rows
+from stream_reader import QueryCancelledError, read_with_budget, with_report
+from result_renderer import render_result
+from async_executor import AsyncQueryExecutor, QueryHandle, QueryTimeoutError, request_cancelled
+from telemetry import Span, get_logger, metrics, span
+
+if TYPE_CHECKING:
+    # Only for annotations: dremio_simple_query imports duckdb and polars, which slows down startup
+    from dremio_simple_query.connect import DremioConnection
+
+log = get_logger("DremioSQLDatabase")
+
+# 🔹 Tables the current question is limited to, as (database, table names); set by `DremioSQLDatabase.focus`
+_focused_tables: ContextVar[Optional[Tuple[Any, List[str]]]] = ContextVar("focused_tables", default=None)
+
+# 🔹 Question the current queries answer, used to narrow `SELECT *`; set by `DremioSQLDatabase.answering`
+_current_question: ContextVar[Optional[str]] = ContextVar("current_question", default=None)
+
+# 🔹 Conversation the current queries belong to, whose working sets may answer them; set by `DremioSQLDatabase.session`
+_current_session: ContextVar[Optional[str]] = ContextVar("current_session", default=None)
 
 
 class DremioSQLDatabase(SQLDatabase):
-    def __init__(self, dremio_connection: DremioConnection, include_tables: Optional[List[str]] = None, exclude_tables: Optional[List[str]] = None):
+    # 🔹 Column names that collide with Dremio keywords and must be quoted
+    DREMIO_KEYWORDS = {"date"}
+
+    def __init__(self, dremio_connection: "DremioConnection", include_tables: Optional[List[str]] = None, exclude_tables: Optional[List[str]] = None, schema_snapshot_path: Optional[str] = None, lazy: bool = False, rewrite_cache_size: int = 256, result_cache: Optional[ResultCache] = None, max_rows: Optional[int] = None, row_budget: Optional[int] = 10000, byte_budget: Optional[int] = 64 * 1024 * 1024, token_budget: Optional[int] = None, executor: Optional[AsyncQueryExecutor] = None, refresh_snapshot: bool = True, table_descriptions: Optional[Dict[str, str]] = None, validate_queries: bool = True, query_limit: Optional[int] = 1000, max_scan_rows: Optional[int] = None, prune_projections: bool = True, working_sets: Optional[WorkingSetCache] = None, query_log: Optional[QueryLog] = None, reflection_routing: bool = True, reflection_ttl: float = 300):
         """
-        Initializes the Dremio SQLDatabase wrapper, preloads schema, and ensures compatibility with LangChain.
+        Initializes the Dremio SQLDatabase wrapper, preloads schema (unless `lazy`), and ensures compatibility with LangChain.
         
         Args:
             dremio_connection (DremioConnection): Connection to Dremio.
             include_tables (Optional[List[str]]): List of specific tables to include.
             exclude_tables (Optional[List[str]]): List of tables to exclude.
+            schema_snapshot_path (Optional[str]): Arrow IPC file used to cache the schema between runs.
+            lazy (bool): Skip the full catalog scan. Tables are listed on first use and each
+                table's columns are fetched the first time they are needed.
+            rewrite_cache_size (int): Number of rewritten queries kept in the LRU cache (0 disables it).
+            result_cache (Optional[ResultCache]): Cache of query results keyed by the final SQL.
+                Defaults to an in-memory cache with a 60 second TTL.
+            max_rows (Optional[int]): Most rows converted to Python by `run(fetch="all")`. The full
+                result stays available in Arrow through `run_arrow`.
+            row_budget (Optional[int]): Most rows `run` reads from Dremio before cancelling the query (None for no limit).
+            byte_budget (Optional[int]): Most Arrow bytes `run` reads from Dremio before cancelling the query (None for no limit).
+            token_budget (Optional[int]): When set, `run(fetch="all")` returns the result rendered for the LLM
+                (compact CSV, column statistics and sampled rows) within about this many tokens.
+            executor (Optional[AsyncQueryExecutor]): Bounded thread pool behind `arun`/`arun_arrow`.
+                Created on first use when not given.
+            refresh_snapshot (bool): Check an existing schema snapshot against Dremio while loading it.
+                When False the snapshot is used as is (no query at startup) and
+                `refresh_schema_information` is left to the caller, e.g. a background thread.
+            table_descriptions (Optional[Dict[str, str]]): Descriptions of tables (keyed by table name,
+                `schema.table` or fully qualified name) that `relevant_tables` searches along with the names.
+            validate_queries (bool): Check tables and columns against the catalog before a query is sent,
+                answering with a correction hint instead of a Dremio round trip.
+            query_limit (Optional[int]): LIMIT added to `run` queries that return rows without one, and
+                the most a larger LIMIT is clamped to (None or 0 leaves LIMITs alone).
+            max_scan_rows (Optional[int]): When set, `run` estimates each query with `EXPLAIN PLAN FOR`
+                and rejects it when the scans are estimated to read more rows.
+            prune_projections (bool): Narrow `SELECT * FROM table` to the columns the question mentions
+                when the question asks for an aggregate (see `answering`).
+            working_sets (Optional[WorkingSetCache]): Per-session local cache of row-level results that
+                answers follow-up queries in DuckDB (see `session`). None disables it.
+            query_log (Optional[QueryLog]): Per-shape statistics of the queries run, for `reflection_report`.
+                Defaults to an in-memory log.
+            reflection_routing (bool): Read Dremio's reflections from its system tables and prefer
+                tables and views covered by one when resolving names and picking tables.
+            reflection_ttl (float): Seconds before the reflections are read again.
         """
         self.dremio_connection = dremio_connection
+        self._schema_loader = SchemaLoader(dremio_connection, snapshot_path=schema_snapshot_path)
+        self._schema_snapshot = None
         self._mock_dialect = DefaultDialect()  # ✅ Fix: Use SQLAlchemy's DefaultDialect for compatibility
 
         # ✅ Properties for LangChain compatibility
         self._include_tables = include_tables
         self._exclude_tables = exclude_tables
 
-        # ✅ Dictionary to store table metadata (fully qualified names + columns)
-        self._schema_info = self._load_schema_information()
-
-    def _load_schema_information(self) -> Dict[str, Dict[str, Any]]:
+        # ✅ Rewritten queries keyed by normalized SQL, parameters and schema version
+        self._rewrite_cache = RewriteCache(maxsize=rewrite_cache_size)
+        self._schema_version = 0
+        self._result_cache = result_cache if result_cache is not None else ResultCache()
+        self._max_rows = max_rows
+        self._row_budget = row_budget
+        self._byte_budget = byte_budget
+        self._token_budget = token_budget
+        self._executor = executor
+        self._refresh_snapshot = refresh_snapshot
+        self._working_sets = working_sets
+        self._query_log = query_log if query_log is not None else QueryLog()
+        self._reflections = ReflectionCatalog(self._fetch_reflections, ttl=reflection_ttl) if reflection_routing else None
+        self._reflection_version = 0
+
+        # ✅ Catalog index of table metadata keyed by (catalog, schema, table)
+        self._lazy = lazy
+        self._lazy_lock = threading.Lock()
+        self._tables_listed = False
+        self._schema_info = CatalogIndex() if lazy else self._load_schema_information()
+
+        # ✅ BM25 index of the catalog for `relevant_tables`, re-synced when the schema version changes
+        self._retriever = SchemaRetriever(table_descriptions)
+        self._retriever_version = -1
+        self._validator = SQLValidator(self._resolve_for_validation, self._suggest_tables) if validate_queries else None
+
+        # ✅ Query shaping (LIMIT injection, projection pruning, EXPLAIN cost check) and per-query cost tracking
+        self._shaper = QueryShaper(
+            limit=query_limit,
+            resolve=self._resolve_for_validation if prune_projections else None,
+            explain=self._explain,
+            max_scan_rows=max_scan_rows,
+        )
+        self._costs = CostTracker()
+
+        # ✅ Single-pass rewrite pipeline: table qualification, keyword quoting, parameter binding
+        self._rewriter = SQLRewriter([
+            TableQualificationRule(self._qualify_table_name),
+            KeywordQuotingRule(self.DREMIO_KEYWORDS),
+            ParameterBindingRule(),
+        ])
+
+    def _load_schema_information(self) -> CatalogIndex:
         """
         Queries Dremio's INFORMATION_SCHEMA to get all tables, their fully qualified names, and their columns.
+        The table→columns grouping runs in Arrow, and when a snapshot path is configured only the
+        schemas that changed since the last snapshot are re-read.
 
         Returns:
-            Dict[str, Dict[str, Any]]: A dictionary where each table maps to its fully qualified name and column list.
+            CatalogIndex: Every table keyed by (catalog, schema, table) with its fully qualified name and column list.
         """
-        schema_info = {}
+        schema_info = CatalogIndex()
 
         try:
-            query = """
-                SELECT TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME
-                FROM INFORMATION_SCHEMA.COLUMNS
-                ORDER BY TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME
-            """
-            df = self.dremio_connection.toPandas(query)
+            with span("schema_load", refresh=self._refresh_snapshot):
+                self._schema_snapshot = self._schema_loader.load(refresh=self._refresh_snapshot)
 
-            if df.empty:
-                print("⚠️ No schema information found in INFORMATION_SCHEMA.")
-                return {}
+            if self._schema_snapshot.num_tables == 0:
+                log.warning("⚠️ No schema information found in INFORMATION_SCHEMA.")
+                return schema_info
 
-            for _, row in df.iterrows():
-                schema, table, column = row["TABLE_SCHEMA"], row["TABLE_NAME"], row["COLUMN_NAME"]
-                fully_qualified_name = f'"{schema}"."{table}"'
+            schema_info = self._schema_snapshot.to_catalog_index()
+            log.info("✅ Loaded schema for %d tables from Dremio.", len(schema_info))
 
-                if table not in schema_info:
-                    schema_info[table] = {"fully_qualified_name": fully_qualified_name, "columns": []}
+        except Exception as e:
+            log.error("❌ Error loading schema information: %s", e)
 
-                schema_info[table]["columns"].append(column)
+        return schema_info
 
-            print(f"✅ Loaded schema for {len(schema_info)} tables from Dremio.")
+    def _ensure_table_listing(self) -> None:
+        """
+        In lazy mode, lists the catalog's tables once through INFORMATION_SCHEMA."TABLES".
+        Column lists stay empty (None) until `_ensure_columns` is called for a table.
+        """
+        if not self._lazy or self._tables_listed:
+            return
+
+        with self._lazy_lock:
+            if self._tables_listed:
+                return
+            try:
+                for catalog, schema, table in self._schema_loader.fetch_tables():
+                    self._schema_info.add(catalog, schema, table)
+                self._tables_listed = True
+                self._schema_changed()
+                log.info("✅ Listed %d tables from Dremio (columns load on demand).", len(self._schema_info))
+            except Exception as e:
+                log.error("❌ Error listing tables: %s", e)
+
+    def _ensure_columns(self, table_name: str) -> None:
+        """In lazy mode, fetches and memoizes a table's columns the first time they are needed."""
+        self._ensure_table_listing()
+        info = self._schema_info.resolve(table_name)
+        if info is None or info["columns"] is not None:
+            return
+
+        with self._lazy_lock:
+            if info["columns"] is not None:
+                return
+            try:
+                info["columns"] = self._schema_loader.fetch_table_columns(info["schema"], info["table"])
+                self._retriever.update(info)
+            except Exception as e:
+                log.error("❌ Error loading columns for %s: %s", table_name, e)
+
+    def refresh_schema_information(self) -> List[str]:
+        """
+        Re-reads the schemas that changed since the last load and updates the table metadata.
+        In lazy mode the table listing and memoized columns are dropped and re-read on demand.
 
-        except Exception as e:
-            print(f"❌ Error loading schema information: {e}")
+        Returns:
+            List[str]: The schemas that were refreshed.
+        """
+        if self._lazy:
+            with self._lazy_lock:
+                self._schema_info = CatalogIndex()
+                self._tables_listed = False
+            self._schema_changed()
+            return []
+
+        if self._schema_snapshot is None:
+            self._schema_info = self._load_schema_information()
+            self._schema_changed()
+            return []
+
+        self._schema_snapshot, changed = self._schema_loader.refresh(self._schema_snapshot)
+        if changed:
+            if self._schema_loader.snapshot_path:
+                self._schema_snapshot.save(self._schema_loader.snapshot_path)
+            self._schema_info = self._schema_snapshot.to_catalog_index()
+            self._schema_changed()
+            log.info("🔄 Refreshed schema for %d changed schema(s).", len(changed))
+
+        return changed
+
+    def _schema_changed(self) -> None:
+        """Bumps the schema version so rewrites made against the old catalog are never reused."""
+        self._schema_version += 1
+        self._rewrite_cache.clear()
+        self._result_cache.clear()
+        if self._working_sets is not None:
+            self._working_sets.clear()
 
-        return schema_info
+    @property
+    def schema_version(self) -> int:
+        """Bumped whenever the catalog changes; caches keyed by it never serve answers for an old catalog."""
+        return self._schema_version
+
+    def rewrite_cache_stats(self) -> Dict[str, Any]:
+        """Returns the hit/miss counters and size of the rewritten-query cache."""
+        return self._rewrite_cache.stats()
+
+    def result_cache_stats(self) -> Dict[str, Any]:
+        """Returns the hit/miss/bypass counters and memory/disk usage of the result cache."""
+        return self._result_cache.stats()
+
+    def working_set_stats(self) -> Dict[str, Any]:
+        """Returns the hit/miss/fallback counters and memory usage of the session working sets."""
+        return self._working_sets.stats() if self._working_sets is not None else {}
+
+    def query_log_stats(self) -> Dict[str, Any]:
+        """Returns the number of query shapes and queries logged, per source, and the usable reflections."""
+        stats = self._query_log.stats()
+        if self._reflections is not None:
+            stats["reflections"] = self._reflections.stats()["reflections"]
+        return stats
+
+    def query_costs(self) -> List[Dict[str, Any]]:
+        """Returns the estimated and actual cost of the most recent `run` queries, oldest first."""
+        return self._costs.recent()
+
+    def cost_stats(self) -> Dict[str, Any]:
+        """Returns the number of queries run, limited, pruned and rejected, and the rows, bytes and time they took."""
+        return self._costs.stats()
 
     def run(
         self,
@@ -73,114 +283,585 @@ class DremioSQLDatabase(SQLDatabase):
         execution_options: Optional[Dict[str, Any]] = None
     ) -> Union[str, Sequence[Dict[str, Any]], Any]:
         """
-        Executes a SQL query, ensuring:
+        Executes a SQL query, ensuring (in one tokenized pass that leaves literals and comments intact):
         - Fully qualified table names
         - Sanitized column names
         - Safe parameter injection
+
+        The Flight stream is read batch by batch and the query is cancelled once `row_budget` rows or
+        `byte_budget` bytes were read; a truncated `fetch="all"` result says so when printed.
+        The result stays in Arrow and only the rows the caller asks for become Python objects:
+        `fetch="one"` converts a single row, `fetch="all"` at most `max_rows` rows, and
+        `fetch="cursor"` returns a lazy `ArrowCursor` that reads the Flight stream on demand.
+        With a `token_budget`, `fetch="all"` returns the text from `render_result` instead of rows,
+        followed by the validator's notes about the query's cost.
+
+        Queries are checked against the catalog first: unknown tables or columns return a
+        `Query Validation Error` naming the closest existing ones, without a Dremio round trip.
+
+        Except with `fetch="cursor"`, queries are then shaped: a LIMIT of `query_limit` is added to
+        queries that return rows without one (larger LIMITs are clamped), and `SELECT * FROM table`
+        is narrowed to the columns an aggregate question mentions. With `max_scan_rows`, a query
+        estimated to scan more rows returns a `Query Cost Error` instead of running.
+
+        Inside `session`, a query that one of the session's working sets can answer runs locally in
+        DuckDB instead, and complete row-level results from Dremio are kept as working sets.
         """
-        print("\n🔍 Received Query:", command)
-        print("🔢 Parameters:", parameters)
+        return self._run(command, fetch, parameters)
 
-        if isinstance(command, str):
-            query = command
-        else:
-            query = str(command)
+    async def arun(
+        self,
+        command: Union[str, Any],
+        fetch: str = "all",
+        include_columns: bool = False,
+        *,
+        parameters: Optional[Dict[str, Any]] = None,
+        execution_options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Union[str, Sequence[Dict[str, Any]], Any]:
+        """
+        Async version of `run`. The query runs on the bounded executor so the event loop is never
+        blocked; on timeout or when the awaiting task is cancelled, the Flight stream is cancelled.
+
+        Args:
+            timeout (Optional[float]): Seconds before the query is cancelled (defaults to the executor's timeout).
 
-        # 🔹 Step 1: Replace Table Names with Fully Qualified Names
-        query = self._replace_table_names_with_fully_qualified(query)
+        Raises:
+            QueryTimeoutError: The query did not finish within the timeout.
+        """
+        return await self._get_executor().run(self._run, command, fetch, parameters, timeout=timeout)
 
-        # 🔹 Step 2: Sanitize Column Names
-        query = self._sanitize_query_columns(query)
+    async def arun_arrow(self, command: Union[str, Any], parameters: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> pa.Table:
+        """Async version of `run_arrow`, with the same cancellation and timeout as `arun`."""
+        return await self._get_executor().run(self._run_arrow, command, parameters, timeout=timeout)
 
-        # 🔹 Step 3: Inject Parameters Safely
-        if parameters:
-            query = self._inject_parameters(query, parameters)
+    def run_many(
+        self,
+        commands: Sequence[Union[str, Any]],
+        fetch: str = "all",
+        *,
+        parameters: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Union[str, Sequence[Dict[str, Any]], Any]]:
+        """
+        Runs independent queries concurrently on the query executor and returns their results in
+        the order of `commands`. Each query goes through `run` (validation, rewriting, shaping, the
+        result cache and the budgets), checks out its own pooled Flight client, and fails alone:
+        its error message takes its place like `run` returns it. The wall time is about that of
+        the slowest query instead of the sum of all of them.
 
-        print("✅ Final Query Sent to Dremio:", query)
+        Args:
+            commands (Sequence[Union[str, Any]]): The queries.
+            fetch (str): As for `run`, applied to every query.
+            parameters (Optional[Sequence[Optional[Dict[str, Any]]]]): Parameters of each query, in the same order.
+            max_concurrency (Optional[int]): Most of these queries running at once (defaults to the executor's workers).
+            timeout (Optional[float]): Seconds for the whole batch; queries still running then are cancelled.
+        """
+        parameters = list(parameters) if parameters is not None else [None] * len(commands)
+        calls = [(command, fetch, params) for command, params in zip(commands, parameters)]
+        results = self._get_executor().run_batch(self._run, calls, max_concurrency=max_concurrency, timeout=timeout)
+        return [f"Query Execution Error: {result}" if isinstance(result, Exception) else result for result in results]
 
+    async def arun_many(
+        self,
+        commands: Sequence[Union[str, Any]],
+        fetch: str = "all",
+        *,
+        parameters: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Union[str, Sequence[Dict[str, Any]], Any]]:
+        """Async version of `run_many`; `timeout` applies to each query like in `arun`."""
+        parameters = list(parameters) if parameters is not None else [None] * len(commands)
+        executor = self._get_executor()
+        slots = asyncio.Semaphore(max(1, max_concurrency or executor.max_workers))
+
+        async def run_one(command: Union[str, Any], params: Optional[Dict[str, Any]]):
+            async with slots:
+                try:
+                    return await executor.run(self._run, command, fetch, params, timeout=timeout)
+                except QueryTimeoutError as e:
+                    return f"Query Execution Error: {e}"
+
+        return list(await asyncio.gather(*(run_one(command, params) for command, params in zip(commands, parameters))))
+
+    def _get_executor(self) -> AsyncQueryExecutor:
+        with self._lazy_lock:
+            if self._executor is None:
+                self._executor = AsyncQueryExecutor()
+            return self._executor
+
+    def _run(self, command: Union[str, Any], fetch: str, parameters: Optional[Dict[str, Any]], handle: Optional[QueryHandle] = None):
+        """Shared body of `run` and `arun`; `handle` lets the event loop cancel the query."""
+        with span("sql_query", fetch=fetch) as query_span:
+            return self._run_query(command, fetch, parameters, handle, query_span)
+
+    def _run_query(self, command: Union[str, Any], fetch: str, parameters: Optional[Dict[str, Any]], handle: Optional[QueryHandle], query_span: Span):
+        try:
+            query, warnings = self._prepare_query(command, parameters)
+        except QueryValidationError as e:
+            log.warning("🛑 Query rejected before reaching Dremio: %s", e)
+            query_span.set(outcome="validation_error")
+            metrics.incr("query_validation_errors")
+            return f"Query Validation Error: {e}"
+
+        shaped = {"sql": query, "limit": None, "columns": None}
+        if fetch != "cursor":
+            with span("sql_shape"):
+                shaped = self._shaper.shape(query, _current_question.get())
+            if shaped["sql"] != query:
+                query = shaped["sql"]
+                log.debug("✂️ Shaped Query: %s", query)
+
+        start = time.perf_counter()
+        local = self._answer_from_working_set(query) if fetch != "cursor" else None
         try:
-            df: pd.DataFrame = self.dremio_connection.toPandas(query)
-            print("✅ Query Successful! Rows Returned:", len(df))
+            estimate = self._shaper.check_cost(query) if local is None else None
+        except QueryCostError as e:
+            self._costs.record(query, shaped, e.estimate, None, time.perf_counter() - start, rejected=True)
+            log.warning("🛑 Query rejected, estimated cost too high: %s", e)
+            query_span.set(outcome="cost_error")
+            metrics.incr("query_cost_rejections")
+            return f"Query Cost Error: {e}"
 
+        try:
+            if fetch == "cursor":
+                self._costs.record(query, shaped, estimate, None, time.perf_counter() - start)
+                table = self._result_cache.get(query)
+                if table is not None:
+                    log.debug("⚡ Result cache hit")
+                    return ArrowCursor(table)
+                return ArrowCursor(self.dremio_connection.toArrow(query))
+
+            if local is not None:
+                table, report = read_with_budget(local.to_reader(), self._row_budget, self._byte_budget)
+                query_span.set(working_set=True)
+            else:
+                table, report = self._execute_arrow(query, self._row_budget, self._byte_budget, handle)
+                if not report["truncated"]:
+                    self._keep_working_set(query, table)
+            seconds = time.perf_counter() - start
+            self._costs.record(query, shaped, estimate, report, seconds)
+            query_span.set(outcome="ok", rows=report["rows"], bytes=report["bytes"], truncated=report["truncated"])
+            self._log_query(query, seconds, table.num_rows, "working_set" if local is not None else "cache" if report.get("cached") else "dremio")
+            if report["truncated"]:
+                log.info("✂️ Result truncated at the %s budget (%d rows, %d bytes).", report["reason"], report["rows"], report["bytes"])
+
+            # ✅ The validator's cost warnings are about missing LIMITs, which the shaper's note replaces
+            notes = (warnings if shaped["limit"] is None else []) + self._shaping_notes(shaped, table.num_rows)
             if fetch == "one":
-                return df.iloc[0].to_dict() if not df.empty else {}
-            elif fetch == "cursor":
-                return df  
+                with span("arrow_to_rows"):
+                    rows = table_rows(table, 1)
+                return rows[0] if rows else {}
+            elif self._token_budget:
+                with span("result_render", rows=table.num_rows):
+                    rendered = render_result(table, self._token_budget, report)
+                return "\n".join([rendered] + [f"Note: {note}" for note in notes])
             else:
-                return df.to_dict(orient="records")
+                for note in notes:
+                    log.info("⚠️ %s", note)
+                with span("arrow_to_rows", rows=table.num_rows):
+                    rows = table_rows(table, self._max_rows)
+                return with_report(rows, report)
         except Exception as e:
-            print("❌ Query Execution Failed:", str(e))
+            log.error("❌ Query Execution Failed: %s", e)
+            query_span.set(outcome="execution_error")
+            metrics.incr("query_execution_errors")
             return f"Query Execution Error: {e}"
 
-    def _replace_table_names_with_fully_qualified(self, query: str) -> str:
-        """
-        Identifies table names in the query and replaces them with their fully qualified versions.
-        Ensures correct formatting for Dremio.
+    def _log_query(self, query: str, seconds: float, rows: int, source: str) -> None:
+        """Counts the query under its fingerprint in the query log and logs it with its latency."""
+        found = analyze(query)
+        tables = sorted({reference["key"] for reference in found["references"]}) if found else []
+        accelerated = self._reflections is not None and any(self._reflections.for_dataset(table) for table in tables)
+        query_id = self._query_log.record(query, seconds, rows=rows, source=source, tables=tables, accelerated=accelerated)
+        log.info("✅ Query %s", source, extra={"fields": {"fingerprint": query_id, "ms": round(seconds * 1000, 1), "rows": rows, "tables": ",".join(tables), "accelerated": accelerated}})
+
+    def _answer_from_working_set(self, query: str) -> Optional[pa.Table]:
+        """Result of the final SQL computed locally from the current session's working sets, or None."""
+        session = _current_session.get()
+        if session is None or self._working_sets is None:
+            return None
+        with span("working_set_query") as local_span:
+            try:
+                table = self._working_sets.answer(session, query)
+            except Exception as e:
+                log.warning("⚠️ Working set lookup failed, asking Dremio: %s", e)
+                table = None
+            local_span.set(hit=table is not None)
+        if table is not None:
+            log.info("⚡ Answered from the session's working set (%d rows)", table.num_rows)
+        return table
+
+    def _keep_working_set(self, query: str, table: pa.Table) -> None:
+        """Offers a complete Dremio result to the current session's working sets."""
+        session = _current_session.get()
+        if session is None or self._working_sets is None:
+            return
+        try:
+            self._working_sets.offer(session, query, table)
+        except Exception as e:
+            log.warning("⚠️ Could not keep the result as a working set: %s", e)
+
+    @staticmethod
+    def _shaping_notes(shaped: Dict[str, Any], num_rows: int) -> List[str]:
+        """Tells the LLM when the automatic LIMIT cut the result or `SELECT *` was narrowed."""
+        notes = []
+        if shaped["limit"] is not None and num_rows >= shaped["limit"]:
+            notes.append(f"Only the first {shaped['limit']} rows were returned (LIMIT {shaped['limit']} was applied). Aggregate or filter in SQL for a complete answer.")
+        if shaped["columns"] is not None:
+            notes.append(f"SELECT * was narrowed to the columns the question mentions: {', '.join(shaped['columns'])}.")
+        return notes
+
+    def _fetch_reflections(self, query: str) -> pa.Table:
+        """Runs a system table query for `ReflectionCatalog`."""
+        return self.dremio_connection.toArrow(query).read_all()
+
+    def _prefer_reflections(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Orders same-named tables so those covered by a usable reflection come first."""
+        if len(candidates) < 2 or self._reflections is None:
+            return candidates
+        covered = [candidate for candidate in candidates if self._reflections.for_dataset(candidate["fully_qualified_name"])]
+        return covered + [candidate for candidate in candidates if candidate not in covered]
+
+    def reflections(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the usable reflections read from Dremio, keyed by lower-cased dataset path."""
+        return self._reflections.get() if self._reflections is not None else {}
+
+    def reflection_report(self, k: int = 10, min_count: int = 2) -> Dict[str, Any]:
         """
-        words = query.split()
+        Reports the query shapes from the query log that Dremio spent the most time on and that no
+        usable reflection covers, each with a proposed reflection (see `reflections.recommend`).
+
+        Args:
+            k (int): Most shapes listed in `candidates` and in `covered`.
+            min_count (int): Fewest runs for a shape to be reported.
 
-        for i, word in enumerate(words):
-            clean_table_name = word.strip("\"'")  # Remove potential quotes
-            
-            if clean_table_name in self._schema_info:
-                fq_table = self._schema_info[clean_table_name]["fully_qualified_name"]
-                
-                # ✅ Remove unnecessary "DREMIO." prefix if present
-                fq_table = fq_table.replace("DREMIO.", "")
+        Returns:
+            Dict[str, Any]: The query log totals, the number of usable `reflections`, `candidates`
+            (shape, runs, Dremio seconds, p50/p95, reason and `recommendation`) and `covered`
+            (hot shapes a reflection already covers).
+        """
+        reflections = self.reflections()
+        candidates, covered = [], []
+        for entry in self._query_log.shapes(min_count):
+            if not entry["dremio"] or not entry["tables"]:
+                continue
+            item = {key: entry[key] for key in ("fingerprint", "shape", "count", "dremio", "dremio_seconds", "p50_ms", "p95_ms", "tables")}
+            item["recommendation"] = None
+            if len(entry["tables"]) > 1:
+                item["reason"] = f"Joins {len(entry['tables'])} tables; a view joining them, with a reflection, could serve it."
+                candidates.append(item)
+                continue
+
+            info = self._schema_info.resolve(entry["tables"][0])
+            table = info["fully_qualified_name"] if info is not None else entry["tables"][0]
+            columns = {column.lower() for column in (info or {}).get("columns") or []}
+            shape = analyze_shape(entry["sql"], columns)
+            found = reflections.get(dataset_key(table), [])
+            reflection = covering_reflection(shape, found, columns)
+            if reflection is not None:
+                covered.append({"fingerprint": entry["fingerprint"], "count": entry["count"], "table": table, "reflection": f"{reflection['type']} reflection {reflection['name']}"})
+                continue
+
+            item["reason"] = f"No reflection on {table}." if not found else f"The reflections on {table} do not hold the columns it uses."
+            item["recommendation"] = recommend(shape, table, entry["fingerprint"])
+            candidates.append(item)
+
+        return {
+            "generated": time.time(),
+            **self._query_log.stats(),
+            "reflections": sum(len(found) for found in reflections.values()),
+            "candidates": candidates[:k],
+            "covered": covered[:k],
+        }
+
+    def _explain(self, query: str) -> str:
+        """Text of Dremio's plan for `query`, with the planner's row estimates."""
+        plan = self.dremio_connection.toArrow(f"EXPLAIN PLAN FOR {query}").read_all()
+        return "\n".join(str(line) for line in plan.column(0).to_pylist())
+
+    def run_arrow(self, command: Union[str, Any], parameters: Optional[Dict[str, Any]] = None) -> pa.Table:
+        """
+        Executes a SQL query (rewritten like `run`) and returns the complete result as an Arrow table.
 
-                # ✅ Ensure correct formatting
-                if fq_table.startswith('"') and fq_table.endswith('"'):
-                    fq_table = fq_table  # Already properly quoted
-                else:
-                    fq_table = f'"{fq_table}"'  # Enclose in double quotes
-                
-                words[i] = fq_table  # Replace table name with correct fully qualified version
+        Raises:
+            QueryValidationError: The query references unknown tables or columns (nothing was sent to Dremio).
+            Exception: Any error raised by Dremio, unlike `run` which returns it as a message.
+        """
+        return self._run_arrow(command, parameters)
 
-        return " ".join(words)
+    def _run_arrow(self, command: Union[str, Any], parameters: Optional[Dict[str, Any]], handle: Optional[QueryHandle] = None) -> pa.Table:
+        query, _ = self._prepare_query(command, parameters)
+        table, _ = self._execute_arrow(query, handle=handle)
+        return table
 
-    def _sanitize_query_columns(self, query: str) -> str:
+    def _prepare_query(self, command: Union[str, Any], parameters: Optional[Dict[str, Any]]) -> Tuple[str, List[str]]:
         """
-        Ensures that column names that are Dremio keywords are properly quoted.
+        Validates a command against the catalog and rewrites it into the final SQL sent to Dremio,
+        reusing cached rewrites.
+
+        Returns:
+            Tuple[str, List[str]]: The final SQL and the validator's warnings about its cost.
+
+        Raises:
+            QueryValidationError: The command references unknown tables or columns.
         """
-        dremio_keywords = {"date"}
+        log.debug("🔍 Received Query: %s", command, extra={"fields": {"parameters": parameters}})
 
-        words = query.split()
-        for i, word in enumerate(words):
-            clean_word = word.strip("\"'")  
-            if clean_word.lower() in dremio_keywords and not word.startswith('"'):
-                words[i] = f'"{clean_word}"' 
+        if isinstance(command, str):
+            query = command
+        else:
+            query = str(command)
 
-        return " ".join(words)
+        self._ensure_table_listing()
+        warnings = []
+        if self._validator is not None and len(self._schema_info):
+            with span("sql_validate"):
+                report = self._validator.validate(query)
+            if report["errors"]:
+                raise QueryValidationError(report["errors"])
+            warnings = report["warnings"]
+            for warning in warnings:
+                log.debug("⚠️ %s", warning)
+
+        # ✅ Rewrites resolved against another set of reflections are dropped
+        if self._reflections is not None:
+            self._reflections.get()
+            if self._reflections.version != self._reflection_version:
+                self._reflection_version = self._reflections.version
+                self._rewrite_cache.clear()
+
+        # 🔹 Qualify table names, quote keyword columns and bind parameters in a single pass
+        with span("sql_rewrite") as rewrite_span:
+            cache_key = self._rewrite_cache.key(query, parameters, self._schema_version)
+            rewritten = self._rewrite_cache.get(cache_key)
+            rewrite_span.set(cached=rewritten is not None)
+            if rewritten is None:
+                rewritten = self._rewriter.rewrite(query, parameters)
+                self._rewrite_cache.put(cache_key, rewritten)
+
+        log.debug("✅ Final Query Sent to Dremio: %s", rewritten)
+        return rewritten, warnings
+
+    def _resolve_for_validation(self, reference: str) -> Optional[Dict[str, Any]]:
+        """Catalog entry of a table referenced by a query, with its columns loaded (lazy mode)."""
+        self._ensure_columns(reference)
+        return self._schema_info.resolve(reference)
+
+    def _suggest_tables(self, name: str) -> List[str]:
+        """Existing tables close to an unknown table name: shared words first, then similar spelling."""
+        suggestions = self.relevant_tables(name, k=3)
+        if not suggestions:
+            names = {entry["table"].lower(): self._schema_info.display_name(entry) for entry in self._schema_info.entries()}
+            suggestions = [names[close] for close in difflib.get_close_matches(name.lower(), list(names), n=3)]
+        return suggestions
+
+    def _execute_arrow(self, query: str, max_rows: Optional[int] = None, max_bytes: Optional[int] = None, handle: Optional[QueryHandle] = None) -> Tuple[pa.Table, Dict[str, Any]]:
+        """
+        Fetches the result of the final SQL as an Arrow table, through the result cache, reading
+        the stream only until the row/byte budget is reached (or `handle` is cancelled). Without a
+        `handle`, the cancel event of the current request (see `request_deadline`) stops the read.
 
-    def _inject_parameters(self, query: str, parameters: Dict[str, Any]) -> str:
+        Returns:
+            Tuple[pa.Table, Dict[str, Any]]: The rows read and the budget report from `read_with_budget`.
         """
-        Safely injects parameters into the query string.
+        with span("flight_execute") as execute_span:
+            # ✅ Identical queries within the TTL are answered from the result cache
+            table = self._result_cache.get(query)
+            if table is not None:
+                log.debug("⚡ Result cache hit")
+                table, report = read_with_budget(table.to_reader(), max_rows, max_bytes)
+                report["cached"] = True
+                execute_span.set(cached=True, rows=report["rows"], bytes=report["bytes"])
+                return table, report
+
+            # ✅ A cancelled query (or a request past its deadline) is not started
+            cancelled = handle.cancelled if handle is not None else request_cancelled()
+            if cancelled is not None and cancelled.is_set():
+                raise QueryCancelledError("Query cancelled before it was started.")
+
+            reader = self.dremio_connection.toArrow(query)
+            if handle is not None:
+                handle.attach(reader)
+            table, report = read_with_budget(reader, max_rows, max_bytes, cancelled)
+            if not report["truncated"]:
+                self._result_cache.put(query, table)  # ✅ Partial results are never cached
+            execute_span.set(cached=False, rows=report["rows"], bytes=report["bytes"], truncated=report["truncated"])
+            metrics.observe("query_rows", report["rows"])
+            metrics.observe("query_bytes", report["bytes"])
+            return table, report
+
+    def _qualify_table_name(self, reference: str) -> Optional[str]:
         """
-        for key, value in parameters.items():
-            sanitized_value = self._sanitize_value(value)
-            query = query.replace(f":{key}", sanitized_value)
-        return query
+        Resolves a table reference found in a FROM/JOIN position to its fully qualified name.
+        A bare name shared by several tables resolves to one covered by a reflection, if any.
 
-    def _sanitize_value(self, value):
-        """Ensures safe and correctly formatted SQL values."""
-        if isinstance(value, str):
-            return "'{}'".format(value.replace("'", "''"))  
-        elif isinstance(value, (int, float)):
-            return str(value)  
-        else:
-            return "NULL"  
+        Args:
+            reference (str): The bare, dotted or quoted reference as written in the query.
+
+        Returns:
+            Optional[str]: The fully qualified name, or None when the table is unknown.
+        """
+        self._ensure_table_listing()
+        candidates = self._prefer_reflections(self._schema_info.candidates(reference))
+        return candidates[0]["fully_qualified_name"] if candidates else None
+
+    def _is_usable(self, entry: Dict[str, Any], name: str) -> bool:
+        if self._include_tables and entry["table"] not in self._include_tables and name not in self._include_tables:
+            return False
+        if self._exclude_tables and (entry["table"] in self._exclude_tables or name in self._exclude_tables):
+            return False
+        return True
 
     def get_usable_table_names(self) -> List[str]:
-        """Returns a list of available table names."""
-        if self._include_tables:
-            return [t for t in self._schema_info if t in self._include_tables]
-        elif self._exclude_tables:
-            return [t for t in self._schema_info if t not in self._exclude_tables]
-        return list(self._schema_info.keys())
+        """
+        Returns a list of available table names (fully qualified when a bare name is ambiguous).
+        Inside `focus`, only the tables picked for the current question are listed.
+        """
+        focused = _focused_tables.get()
+        if focused is not None and focused[0] is self:
+            return list(focused[1])
+
+        self._ensure_table_listing()
+        names = []
+        for entry in self._schema_info.entries():
+            name = self._schema_info.display_name(entry)
+            if self._is_usable(entry, name):
+                names.append(name)
+        return names
+
+    def relevant_tables(self, question: str, k: int = 8) -> List[str]:
+        """
+        Picks the tables most relevant to a question with a local BM25 search over table names,
+        schema paths, column names and descriptions (no LLM call, no Dremio query). The index is
+        brought up to date incrementally after the schema changes.
+
+        Args:
+            question (str): The user's question.
+            k (int): Most tables returned.
+
+        Returns:
+            List[str]: Table names as listed by `get_usable_table_names`, best match first (tables
+            and views covered by a reflection ahead of the others); empty when no table shares a
+            word with the question.
+        """
+        self._ensure_table_listing()
+        version = self._schema_version
+        if self._retriever_version != version:
+            indexed, removed = self._retriever.sync(self._schema_info.entries())
+            self._retriever_version = version
+            log.info("🔎 Schema index updated: %d table(s) indexed, %d removed.", indexed, removed)
+
+        entries = []
+        for entry, _ in self._retriever.search(question, k=k * 2):
+            name = self._schema_info.display_name(entry)
+            if self._is_usable(entry, name):
+                entries.append((entry, name))
+        entries = entries[:k]
+        if self._reflections is not None:
+            entries.sort(key=lambda found: not self._reflections.for_dataset(found[0]["fully_qualified_name"]))
+        return [name for _, name in entries]
+
+    def tables_in(self, query: str) -> List[str]:
+        """
+        Lists the catalog tables a query reads, as named by `get_usable_table_names`, in the order
+        they appear. Names the catalog does not know (CTEs, subquery aliases) are left out.
+        """
+        found = analyze(query)
+        if found is None:
+            return []
+        self._ensure_table_listing()
+        names = []
+        for reference in found["references"]:
+            candidates = self._prefer_reflections(self._schema_info.candidates(reference["key"]))
+            if candidates:
+                names.append(self._schema_info.display_name(candidates[0]))
+        return list(dict.fromkeys(names))
+
+    def describe_tables(self, table_names: List[str], max_columns: int = 40) -> str:
+        """
+        Lists tables with their fully qualified names, columns and reflections in a compact form
+        for the agent's input, so it does not need schema lookups for them.
+
+        Args:
+            table_names (List[str]): Tables to describe, e.g. from `relevant_tables`.
+            max_columns (int): Most columns listed per table.
+        """
+        lines = ["Tables most relevant to the question (other tables can still be looked up):"]
+        for name in table_names:
+            info = self._table_info(name)
+            columns = info["columns"] or []
+            listed = ", ".join(columns[:max_columns])
+            if len(columns) > max_columns:
+                listed += f", ... ({len(columns) - max_columns} more)"
+            line = f"- {info['fully_qualified_name']}: {listed}"
+            accelerated = self._reflections.describe(info["fully_qualified_name"]) if self._reflections is not None else None
+            if accelerated:
+                line += f" — {accelerated}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    @contextmanager
+    def focus(self, table_names: List[str]):
+        """
+        Limits `get_usable_table_names` to `table_names` for the current thread (or task) until the
+        block exits, so the agent's table listing holds only the tables picked for its question.
+        Other tables still resolve in queries and in `get_table_info`.
+        """
+        token = _focused_tables.set((self, list(table_names)))
+        try:
+            yield
+        finally:
+            _focused_tables.reset(token)
+
+    @contextmanager
+    def answering(self, question: str):
+        """
+        Marks the queries run by the current thread (or task) until the block exits as answering
+        `question`, so that `run` can narrow `SELECT *` to the columns an aggregate question mentions.
+        """
+        token = _current_question.set(question)
+        try:
+            yield
+        finally:
+            _current_question.reset(token)
+
+    @contextmanager
+    def session(self, session_id: Optional[str]):
+        """
+        Marks the queries run by the current thread (or task) until the block exits as part of the
+        conversation `session_id`: their complete row-level results are kept as the session's
+        working sets, and later queries they can answer run locally (see `WorkingSetCache`).
+        """
+        token = _current_session.set(session_id)
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+
+    def schema_index_stats(self) -> Dict[str, int]:
+        """Returns the number of tables and distinct terms in the schema search index."""
+        return self._retriever.stats()
+
+    def _table_info(self, table_name: str) -> Dict[str, Any]:
+        """Resolves one table name through the catalog index and describes it."""
+        self._ensure_columns(table_name)
+        candidates = self._prefer_reflections(self._schema_info.candidates(table_name))
+        if not candidates:
+            return {"fully_qualified_name": table_name, "columns": ["UNKNOWN_COLUMN"]}
+
+        info = {"fully_qualified_name": candidates[0]["fully_qualified_name"], "columns": candidates[0]["columns"]}
+        if len(candidates) > 1:
+            # ✅ Same-named tables in different schemas are reported instead of merged
+            info["candidates"] = [candidate["fully_qualified_name"] for candidate in candidates]
+        return info
 
     def get_table_info(self, table_names: Union[str, List[str]]) -> Dict[str, Any]:
         """
         Retrieves column information and fully qualified table names for one or multiple tables.
+        Names may be bare, `schema.table` or quoted fully qualified names and are matched case-insensitively.
 
         Args:
             table_names (Union[str, List[str]]): A table name or a list of table names.
@@ -189,13 +870,9 @@ class DremioSQLDatabase(SQLDatabase):
             Dict[str, Any]: Dictionary containing the fully qualified name and columns.
         """
         if isinstance(table_names, list):  # ✅ Handle list input
-            return {
-                table: self._schema_info.get(table, {"fully_qualified_name": table, "columns": ["UNKNOWN_COLUMN"]})
-                for table in table_names
-            }
-        
-        return self._schema_info.get(table_names, {"fully_qualified_name": table_names, "columns": ["UNKNOWN_COLUMN"]})
+            return {table: self._table_info(table) for table in table_names}
 
+        return self._table_info(table_names)
 
     @property
     def dialect(self):
@@ -1,18 +1,406 @@
-from langchain_community.agent_toolkits.sql.base import create_sql_agent
-from connection import dremio
-from DremioSQLDatabase import DremioSQLDatabase
-from langchain_community.llms import OpenAI
-
-# ✅ Initialize the Custom Database for LangChain
-db = DremioSQLDatabase(dremio)
-
-# ✅ Initialize OpenAI LLM
-llm = OpenAI(model="gpt-3.5-turbo-instruct", temperature=0)
-
-# ✅ Create SQL Agent with the Custom Database Wrapper
-sql_agent = create_sql_agent(
-    llm=llm,  # OpenAI LLM
-    db=db,  # ✅ Custom DremioSQLDatabase with optimized execution
-    verbose=True,
-    handle_parsing_errors=True  # ✅ Handle parsing issues more gracefully
-)
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 🔹 Module imports dominate a cold start, so they are timed for the startup report
+_IMPORTS_STARTED = time.perf_counter()
+from langchain_community.agent_toolkits.sql.base import create_sql_agent  # noqa: E402
+from langchain_community.llms import OpenAI  # noqa: E402
+from langchain_core.agents import AgentAction, AgentFinish  # noqa: E402
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+from connection import create_dremio_connection, DREMIO_SCHEMA_SNAPSHOT, DREMIO_LAZY_SCHEMA, DREMIO_RESULT_CACHE_TTL, DREMIO_RESULT_CACHE_MB, DREMIO_RESULT_CACHE_DIR, DREMIO_ROW_BUDGET, DREMIO_BYTE_BUDGET_MB, DREMIO_TOKEN_BUDGET, DREMIO_QUERY_WORKERS, DREMIO_QUERY_TIMEOUT, DREMIO_SCHEMA_TOP_K, DREMIO_TABLE_DESCRIPTIONS, DREMIO_VALIDATE_QUERIES, DREMIO_QUERY_LIMIT, DREMIO_MAX_SCAN_ROWS, DREMIO_PRUNE_PROJECTIONS, DREMIO_BATCH_CONCURRENCY, DREMIO_ANALYTICS_TOOL, DREMIO_WORKING_SET_MB, DREMIO_WORKING_SET_SESSIONS, DREMIO_WORKING_SET_TTL, DREMIO_REFLECTION_ROUTING, DREMIO_REFLECTION_TTL, DREMIO_QUERY_LOG, DREMIO_QUERY_LOG_SIZE, AGENT_ANSWER_CACHE_SIZE, AGENT_ANSWER_CACHE_THRESHOLD, AGENT_MEMORY_TOKENS, AGENT_MEMORY_TURNS, AGENT_MEMORY_SESSIONS, AGENT_MEMORY_TTL, AGENT_MEMORY_DB  # noqa: E402
+from DremioSQLDatabase import DremioSQLDatabase  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+from working_set import WorkingSetCache  # noqa: E402
+from query_log import QueryLog  # noqa: E402
+from async_executor import AsyncQueryExecutor  # noqa: E402
+from schema_retriever import load_descriptions  # noqa: E402
+from answer_cache import AnswerCache  # noqa: E402
+from conversation import ConversationMemory, create_store, summarize_result  # noqa: E402
+from query_many_tool import QuerySQLDatabaseManyTool, QUERY_MANY_TOOL, SQL_TOOL  # noqa: E402
+from analytics_tool import DremioAnalyticsTool, ANALYTICS_TOOL  # noqa: E402
+from analytics import AnalyticsError, compile_request, parse_request  # noqa: E402
+from sql_validator import split_statements  # noqa: E402
+from result_renderer import estimate_tokens  # noqa: E402
+from telemetry import get_logger, metrics, span  # noqa: E402
+IMPORT_SECONDS = time.perf_counter() - _IMPORTS_STARTED
+
+log = get_logger("agent")
+
+# 🔹 How the output of the SQL tool starts when the query failed
+QUERY_ERRORS = ("Query Execution Error", "Query Validation Error", "Query Cost Error", "Error:")
+FINAL_ANSWER = "Final Answer:"
+
+# 🔹 Prompt for an answer cache hit: the query already ran, the LLM only phrases the answer
+ANSWER_PROMPT = """Answer the question using the result of the SQL query that was run against Dremio for it.
+
+Question: {question}
+
+SQL query: {sql}
+
+Result:
+{result}
+
+Reply with the answer only, in the form:
+Final Answer: <the answer>"""
+
+
+class StartupTimer:
+    """Records how long each startup phase took, for the startup-time breakdown."""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: round(seconds, 4) for name, seconds in self.phases}
+
+    def report(self) -> str:
+        parts = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases)
+        return f"⏱️ Startup: {parts} → {time.perf_counter() - self.started:.2f}s"
+
+
+class FirstLLMCallTimer(BaseCallbackHandler):
+    """Reports the time from startup to the first LLM call (once per process)."""
+
+    def __init__(self, timer: StartupTimer):
+        self.timer = timer
+        self.reported = False
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        if not self.reported:
+            self.reported = True
+            elapsed = time.perf_counter() - self.timer.started
+            self.timer.add("first LLM call", elapsed)
+            log.info("⏱️ First LLM call %.2fs after startup", elapsed)
+
+
+class LLMMetrics(BaseCallbackHandler):
+    """Records the duration of every LLM call in the `llm_call_seconds` histogram, and token usage when the LLM reports it."""
+
+    def __init__(self):
+        self._started: Dict[Any, float] = {}
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: Any = None, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            metrics.observe("llm_call_seconds", time.perf_counter() - started)
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        for key in ("prompt_tokens", "completion_tokens"):
+            if key in usage:
+                metrics.incr(f"llm_{key}", usage[key])
+
+    def on_llm_error(self, error: BaseException, *, run_id: Any = None, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+        metrics.incr("llm_call_errors")
+
+
+class QueryRecorder(BaseCallbackHandler):
+    """
+    Records the data queries an agent run executed successfully (schema probes excluded). Every
+    query of a batch is recorded, so an answer built from a batch is never cached as one query.
+    `steps` pairs each tool call's queries with a summary of its output for the conversation memory.
+    """
+
+    def __init__(self):
+        self.queries: List[str] = []
+        self.steps: List[Dict[str, str]] = []
+        self._pending: List[str] = []
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        if action.tool == SQL_TOOL:
+            self._pending = [str(action.tool_input).strip()]
+        elif action.tool == QUERY_MANY_TOOL:
+            self._pending = split_statements(str(action.tool_input))
+        elif action.tool == ANALYTICS_TOOL:
+            try:
+                self._pending = [compile_request(parse_request(action.tool_input))]
+            except AnalyticsError:
+                self._pending = []
+        else:
+            self._pending = []
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        queries, self._pending = self._pending, []
+        if not str(output).startswith(QUERY_ERRORS):
+            queries = [query for query in queries if "INFORMATION_SCHEMA" not in query.upper()]
+            self.queries.extend(queries)
+            if queries:
+                self.steps.append({"sql": ";\n".join(queries), "result": summarize_result(output)})
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        self._pending = []
+
+
+def _replay(callbacks: List[BaseCallbackHandler], event: str, *args: Any) -> None:
+    """Sends an agent event to the callbacks for a step that ran outside the agent."""
+    run_id = uuid.uuid4()
+    for handler in callbacks:
+        getattr(handler, event)(*args, run_id=run_id)
+
+
+class AgentFactory:
+    """
+    Builds the Dremio connection pool, the `DremioSQLDatabase`, the LLM and the SQL agent on
+    first use, once per process, instead of as import side effects.
+
+    With a schema snapshot on disk, the database starts from the snapshot without querying
+    Dremio and checks it for changes in a background thread, so the first LLM call does not
+    wait for the catalog. `warmup` builds everything up front for pre-fork servers.
+
+    `run` answers repeated questions from the `AnswerCache`: the cached SQL runs again and the
+    LLM is asked only to phrase the answer, instead of the full agent loop. Questions of a named
+    session are answered with the `ConversationMemory` of its earlier turns.
+    """
+
+    def __init__(self):
+        self.timer = StartupTimer(_IMPORTS_STARTED)
+        self.timer.add("imports", IMPORT_SECONDS)
+        self._lock = threading.RLock()
+        self._connection = None
+        self._db: Optional[DremioSQLDatabase] = None
+        self._llm: Optional[OpenAI] = None
+        self._agent = None
+        self.answer_cache = AnswerCache(maxsize=AGENT_ANSWER_CACHE_SIZE, threshold=AGENT_ANSWER_CACHE_THRESHOLD)
+        self.memory = ConversationMemory(
+            create_store(AGENT_MEMORY_DB or None, max_sessions=AGENT_MEMORY_SESSIONS, ttl=AGENT_MEMORY_TTL),
+            token_budget=AGENT_MEMORY_TOKENS, recent_turns=AGENT_MEMORY_TURNS,
+        )
+
+    @property
+    def connection(self):
+        with self._lock:
+            if self._connection is None:
+                with self.timer.phase("connection"):
+                    self._connection = create_dremio_connection()
+            return self._connection
+
+    @property
+    def db(self) -> DremioSQLDatabase:
+        with self._lock:
+            if self._db is None:
+                self._db = self._build_db(refresh=False)
+            return self._db
+
+    @property
+    def llm(self) -> OpenAI:
+        with self._lock:
+            if self._llm is None:
+                with self.timer.phase("llm"):
+                    # ✅ Streaming lets callbacks forward answer tokens as they are generated
+                    self._llm = OpenAI(model="gpt-3.5-turbo-instruct", temperature=0, streaming=True, callbacks=[FirstLLMCallTimer(self.timer), LLMMetrics()])
+            return self._llm
+
+    @property
+    def agent(self):
+        with self._lock:
+            if self._agent is None:
+                db, llm = self.db, self.llm
+                with self.timer.phase("agent"):
+                    self._agent = create_sql_agent(
+                        llm=llm,  # OpenAI LLM
+                        db=db,  # ✅ Custom DremioSQLDatabase with optimized execution
+                        verbose=True,
+                        handle_parsing_errors=True,  # ✅ Handle parsing issues more gracefully
+                        extra_tools=self._extra_tools(db),
+                    )
+                log.info("%s", self.timer.report())
+            return self._agent
+
+    @staticmethod
+    def _extra_tools(db: DremioSQLDatabase) -> List[Any]:
+        tools: List[Any] = []
+        if DREMIO_BATCH_CONCURRENCY > 0:
+            # ✅ Independent queries of one step run concurrently over the connection pool
+            tools.append(QuerySQLDatabaseManyTool(db=db, max_concurrency=DREMIO_BATCH_CONCURRENCY))
+        if DREMIO_ANALYTICS_TOOL:
+            # ✅ Aggregates, rankings, histograms and time series computed by Dremio, not by the LLM
+            tools.append(DremioAnalyticsTool(db=db))
+        return tools
+
+    def _build_db(self, refresh: bool) -> DremioSQLDatabase:
+        """
+        Args:
+            refresh (bool): Check an existing snapshot against Dremio before returning. When False
+                the snapshot is used as is and checked in a background thread.
+        """
+        has_snapshot = bool(DREMIO_SCHEMA_SNAPSHOT) and os.path.exists(DREMIO_SCHEMA_SNAPSHOT)
+        background = has_snapshot and not refresh and not DREMIO_LAZY_SCHEMA
+        connection = self.connection
+
+        with self.timer.phase("schema (snapshot)" if has_snapshot else "schema"):
+            result_cache = ResultCache(ttl=DREMIO_RESULT_CACHE_TTL, max_bytes=DREMIO_RESULT_CACHE_MB * 1024 * 1024, spill_dir=DREMIO_RESULT_CACHE_DIR or None)
+            working_sets = WorkingSetCache(max_bytes=DREMIO_WORKING_SET_MB * 1024 * 1024, max_sessions=DREMIO_WORKING_SET_SESSIONS, ttl=DREMIO_WORKING_SET_TTL) if DREMIO_WORKING_SET_MB > 0 else None
+            db = DremioSQLDatabase(
+                connection, schema_snapshot_path=DREMIO_SCHEMA_SNAPSHOT, lazy=DREMIO_LAZY_SCHEMA, result_cache=result_cache,
+                row_budget=DREMIO_ROW_BUDGET, byte_budget=DREMIO_BYTE_BUDGET_MB * 1024 * 1024, token_budget=DREMIO_TOKEN_BUDGET,
+                executor=AsyncQueryExecutor(max_workers=DREMIO_QUERY_WORKERS, timeout=DREMIO_QUERY_TIMEOUT),
+                refresh_snapshot=not background, table_descriptions=load_descriptions(DREMIO_TABLE_DESCRIPTIONS),
+                validate_queries=DREMIO_VALIDATE_QUERIES, query_limit=DREMIO_QUERY_LIMIT, max_scan_rows=DREMIO_MAX_SCAN_ROWS,
+                prune_projections=DREMIO_PRUNE_PROJECTIONS, working_sets=working_sets,
+                query_log=QueryLog(maxsize=DREMIO_QUERY_LOG_SIZE, path=DREMIO_QUERY_LOG or None),
+                reflection_routing=DREMIO_REFLECTION_ROUTING, reflection_ttl=DREMIO_REFLECTION_TTL,
+            )
+
+        # ✅ Cache, cost and pool statistics are read by `telemetry.metrics` whenever metrics are exported
+        metrics.register("result_cache", db.result_cache_stats)
+        metrics.register("rewrite_cache", db.rewrite_cache_stats)
+        metrics.register("answer_cache", self.answer_cache.stats)
+        metrics.register("query_costs", db.cost_stats)
+        metrics.register("working_sets", db.working_set_stats)
+        metrics.register("query_log", db.query_log_stats)
+        metrics.register("conversations", self.memory.stats)
+        if hasattr(connection, "stats"):
+            metrics.register("connection_pool", connection.stats)
+
+        if background:
+            threading.Thread(target=self._refresh_schema, args=(db,), name="schema-refresh", daemon=True).start()
+        return db
+
+    @staticmethod
+    def _refresh_schema(db: DremioSQLDatabase) -> None:
+        start = time.perf_counter()
+        try:
+            db.refresh_schema_information()
+            log.info("⏱️ Background schema check took %.2fs", time.perf_counter() - start)
+        except Exception as e:
+            log.warning("⚠️ Background schema refresh failed: %s", e)
+
+    def run(self, text: str, callbacks: Optional[List[BaseCallbackHandler]] = None, session: Optional[str] = None) -> str:
+        """
+        Answers `text`. When the answer cache holds a question that means the same thing, its SQL
+        is run again and the LLM only phrases the answer. Otherwise the agent runs, and when it
+        answered with a single data query, that query is cached for the question.
+        Queries run for `text` are shaped with it (see `DremioSQLDatabase.answering`). With a
+        `session` id, follow-up queries of the same conversation are answered from its working sets
+        when they can be (see `DremioSQLDatabase.session`), and the agent gets the conversation's
+        earlier turns. A follow-up depends on them, so it skips the answer cache.
+        """
+        callbacks = list(callbacks or [])
+        db = self.db
+        version = db.schema_version
+        history = self.memory.history(session)
+        recorder = QueryRecorder()
+
+        with span("agent_run") as run_span, db.answering(text), db.session(session):
+            hit = self.answer_cache.get(text, version) if not history else None
+            answer = self._answer_from_cache(text, hit, callbacks + [recorder]) if hit is not None else None
+            if answer is not None:
+                run_span.set(answer_cache="hit")
+            else:
+                run_span.set(answer_cache="skipped" if history else "miss", history_tokens=estimate_tokens(history) if history else 0)
+                recorder = QueryRecorder()
+                answer = self._run_agent(text, callbacks + [recorder], history, self.memory.tables(session))
+                run_span.set(queries=len(recorder.queries))
+                if len(recorder.queries) == 1 and not history:
+                    self.answer_cache.put(text, recorder.queries[0], version)
+
+        if session:
+            tables = [name for query in recorder.queries for name in db.tables_in(query)]
+            self.memory.record(session, text, answer, recorder.steps, tables)
+        return answer
+
+    def _answer_from_cache(self, text: str, hit: Dict[str, Any], callbacks: List[BaseCallbackHandler]) -> Optional[str]:
+        """Runs a cached query and has the LLM phrase the answer; None when the query no longer works."""
+        log.info("⚡ Answer cache hit (%.2f), reusing the query for: %s", hit["similarity"], hit["question"].strip())
+        _replay(callbacks, "on_agent_action", AgentAction(SQL_TOOL, hit["sql"], "Thought: This question was answered before, reusing its query."))
+
+        result = str(self.db.run(hit["sql"]))
+        if result.startswith(QUERY_ERRORS):
+            log.warning("⚠️ Cached query failed, asking the agent instead.")
+            self.answer_cache.discard(hit["question"])
+            return None
+        _replay(callbacks, "on_tool_end", result)
+
+        output = self.llm.invoke(ANSWER_PROMPT.format(question=text.strip(), sql=hit["sql"], result=result), config={"callbacks": callbacks})
+        answer = output.split(FINAL_ANSWER, 1)[-1].strip()
+        _replay(callbacks, "on_agent_finish", AgentFinish({"output": answer}, output))
+        return answer
+
+    def _run_agent(self, text: str, callbacks: List[BaseCallbackHandler], history: str = "", remembered: Sequence[str] = ()) -> str:
+        """
+        Runs the agent on `text`. The `DREMIO_SCHEMA_TOP_K` tables most relevant to it are picked
+        locally first: their columns are appended to the input and the agent's table listing is
+        limited to them, which keeps the prompt small and saves the schema lookup steps.
+        The conversation's `history` is appended too, and the tables it `remembered` come first.
+        """
+        agent, db = self.agent, self.db
+        tables = db.relevant_tables(text, k=DREMIO_SCHEMA_TOP_K) if DREMIO_SCHEMA_TOP_K > 0 else []
+        tables = list(dict.fromkeys([*remembered, *tables]))[:DREMIO_SCHEMA_TOP_K] if DREMIO_SCHEMA_TOP_K > 0 else []
+        text = f"{text}\n\n{history}" if history else text
+        if not tables:
+            return agent.run(text, callbacks=callbacks)
+
+        with db.focus(tables):
+            return agent.run(f"{text}\n\n{db.describe_tables(tables)}", callbacks=callbacks)
+
+    def warmup(self):
+        """
+        Builds everything up front, with the schema checked against Dremio synchronously. Call it in
+        the parent of a pre-fork server: workers inherit the loaded schema (shared copy-on-write)
+        and start serving without a cold start. The parent's Flight clients are closed afterwards,
+        since gRPC channels must not be shared across a fork.
+        """
+        with self._lock:
+            if self._db is None:
+                self._db = self._build_db(refresh=True)
+            agent = self.agent
+            self.connection.close()
+        return agent
+
+    def _after_fork(self) -> None:
+        """Runs in a forked child: fresh locks and no inherited Flight clients."""
+        self._lock = threading.RLock()
+        if self._connection is not None:
+            self._connection.reset()
+
+
+_factory: Optional[AgentFactory] = None
+_factory_lock = threading.Lock()
+
+
+def get_factory() -> AgentFactory:
+    """Returns the process-wide `AgentFactory`, creating it on first use."""
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                _factory = AgentFactory()
+    return _factory
+
+
+def get_agent():
+    """Returns the SQL agent, building it (and everything it needs) on first use."""
+    return get_factory().agent
+
+
+def run_agent(text: str, callbacks: Optional[List[BaseCallbackHandler]] = None, session: Optional[str] = None) -> str:
+    """Runs the agent on `text`; `callbacks` receive the agent's steps (see agent_events.py), `session` names the conversation (see conversation.py)."""
+    return get_factory().run(text, callbacks=callbacks, session=session)
+
+
+def _after_fork_in_child() -> None:
+    global _factory_lock
+    _factory_lock = threading.Lock()
+    if _factory is not None:
+        _factory._after_fork()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
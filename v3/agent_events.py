@@ -0,0 +1,106 @@
+from typing import Any, Dict, List
+
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+from analytics_tool import ANALYTICS_TOOL
+from job_queue import JobCancelledError, JobEvents
+from query_many_tool import QUERY_MANY_TOOL, SQL_TOOL
+
+# 🔹 Marker after which the ReAct agent's LLM output is the answer shown to the user
+FINAL_ANSWER = "Final Answer:"
+
+# 🔹 Tools that run SQL against Dremio: one query, a batch, or an analytics request compiled to SQL
+# (their input is reported as a "sql" event)
+SQL_TOOLS = {SQL_TOOL, QUERY_MANY_TOOL, ANALYTICS_TOOL}
+
+
+class AgentEventHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that turns a running agent into `JobEvents` as they happen:
+
+    - `thinking`: an LLM call started.
+    - `token`: a streamed LLM token; `final` is true once the text is part of the final answer.
+    - `sql`: the query the agent sends to Dremio (`action` for other tools).
+    - `result`: a preview of a tool's output, e.g. the rendered query result.
+    - `tool_error`: a tool failed (the agent usually retries).
+    - `answer`: the agent's final answer.
+    """
+
+    def __init__(self, events: JobEvents, preview_chars: int = 2000):
+        """
+        Args:
+            events (JobEvents): Log the events are written to.
+            preview_chars (int): Longest tool output sent in a `result` event.
+        """
+        self.events = events
+        self.preview_chars = preview_chars
+        self._tail = ""
+        self._final = False
+        self._answer_started = False
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self._tail = ""
+        self._final = False
+        self._answer_started = False
+        self.events.append("thinking")
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if not self._final:
+            # ✅ Only the last characters before this token can start the marker, so only they are kept
+            window = self._tail + token
+            index = window.find(FINAL_ANSWER)
+            if index < 0:
+                self._tail = window[-(len(FINAL_ANSWER) - 1):]
+            else:
+                # From here on the tokens are the answer itself; start with what followed the marker
+                self._final = True
+                self._tail = ""
+                token = window[index + len(FINAL_ANSWER):]
+
+        if self._final and not self._answer_started:
+            token = token.lstrip()
+            if not token:
+                return
+            self._answer_started = True
+        self.events.append("token", text=token, final=self._final)
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        thought = action.log.split("Action:", 1)[0].strip().removeprefix("Thought:").strip()
+        kind = "sql" if action.tool in SQL_TOOLS else "action"
+        self.events.append(kind, tool=action.tool, input=str(action.tool_input), thought=thought)
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        text = str(output)
+        self.events.append("result", preview=text[:self.preview_chars], truncated=len(text) > self.preview_chars)
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.events.append("tool_error", error=str(error))
+
+    def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
+        self.events.append("answer", text=str(finish.return_values.get("output", "")))
+
+
+class DeadlineHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that stops an agent once its job's `cancelled` event is set (see
+    `JobQueue`): the next LLM call, tool call or agent step raises `JobCancelledError`.
+    """
+
+    raise_error = True  # ✅ LangChain only logs errors of other handlers
+
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+
+    def _check(self) -> None:
+        if self.cancelled.is_set():
+            raise JobCancelledError("Deadline passed, the request was stopped.")
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self._check()
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        self._check()
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self._check()
@@ -0,0 +1,294 @@
+import json
+import re
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+# 🔹 Typed operations the analytics tool compiles to SQL
+OPERATIONS = ("aggregate", "group_by", "top_k", "histogram", "time_bucket")
+
+AGGREGATE_FUNCTIONS = {"count", "count_distinct", "sum", "avg", "min", "max", "stddev", "variance", "median"}
+
+# Aggregates computed in DOUBLE, so they also work on numbers stored as text (e.g. CSV columns)
+NUMERIC_FUNCTIONS = {"sum", "avg", "stddev", "variance", "median"}
+
+TYPES = {"double", "bigint", "integer", "decimal", "date", "timestamp", "varchar"}
+TIME_UNITS = ("year", "quarter", "month", "week", "day", "hour", "minute")
+OPERATORS = {"=", "!=", "<>", "<", "<=", ">", ">=", "like", "not like", "in", "not in", "between", "is null", "is not null"}
+
+# Rows returned by group_by (time_bucket uses MAX_LIMIT) unless the request sets a limit
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+DEFAULT_BINS = 10
+MAX_BINS = 100
+
+METRIC = re.compile(r"\s*(\w+)\s*\(\s*(\*|[^()]+?)\s*\)\s*")
+NAME_PART = r'(?:"[^"]+"|[A-Za-z_][\w$-]*)'
+TABLE = re.compile(rf"{NAME_PART}(?:\s*\.\s*{NAME_PART})*")
+COLUMN = re.compile(r'"?([^".;]+)"?')
+
+TOOL_DESCRIPTION = """
+Compute aggregates inside Dremio and get back only the small result: use this instead of
+fetching rows whenever the question asks for a total, average, count, ranking, distribution
+or trend. Input is one JSON object with an "operation" and a "table", for example:
+{"operation": "aggregate", "table": "sales.orders", "metrics": ["avg(amount)", "count(*)"], "filters": [["region", "=", "west"]]}
+{"operation": "group_by", "table": "sales.orders", "group_by": ["region"], "metrics": ["sum(amount)"], "limit": 20}
+{"operation": "top_k", "table": "sales.orders", "group_by": ["product"], "by": "sum(amount)", "k": 5}
+{"operation": "histogram", "table": "sales.orders", "column": "amount", "bins": 10}
+{"operation": "time_bucket", "table": "sales.orders", "column": "order_date", "unit": "month", "metrics": ["count(*)"]}
+Metrics are count(*), count, count_distinct, sum, avg, min, max, stddev, variance or median of a column.
+Filters are [column, operator, value] with =, !=, <, <=, >, >=, like, in, not in, between, is null, is not null.
+"""
+
+
+class AnalyticsError(ValueError):
+    """An analytics request that cannot be compiled; the message says what to fix."""
+
+
+def parse_request(text: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Parses the tool input: a JSON object, possibly wrapped in backticks by the LLM."""
+    if isinstance(text, dict):
+        return text
+    text = str(text).strip().strip("`").strip()
+    if text.startswith("json"):
+        text = text[4:]
+    try:
+        request = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise AnalyticsError(f"Input must be a JSON object ({e}).")
+    if not isinstance(request, dict):
+        raise AnalyticsError("Input must be a JSON object with an \"operation\" and a \"table\".")
+    return request
+
+
+def compile_request(request: Dict[str, Any]) -> str:
+    """
+    Compiles an analytics request into a single Dremio SQL query whose result is already the
+    answer: aggregates, groups, ranks, bins or time buckets are computed by Dremio.
+
+    Args:
+        request (Dict[str, Any]): `operation`, `table` and the operation's fields (see TOOL_DESCRIPTION).
+
+    Returns:
+        str: The SQL query.
+
+    Raises:
+        AnalyticsError: Unknown operation, missing field or invalid table, column, metric or filter.
+    """
+    operation = str(request.get("operation", "")).lower()
+    compiler = _COMPILERS.get(operation)
+    if compiler is None:
+        raise AnalyticsError(f"Unknown operation {request.get('operation')!r}. Use one of: {', '.join(OPERATIONS)}.")
+    return compiler(request)
+
+
+# 🔹 Building blocks
+
+
+def quote_identifier(name: str) -> str:
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def sql_literal(value: Any) -> str:
+    """Renders a JSON value as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'{}'".format(str(value).replace("'", "''"))
+
+
+def _table(request: Dict[str, Any]) -> str:
+    table = str(request.get("table") or "").strip()
+    if not table or not TABLE.fullmatch(table):
+        raise AnalyticsError(f"\"table\" must be a table name such as space.folder.table, got {table!r}.")
+    return table
+
+
+def _column(name: Any) -> str:
+    match = COLUMN.fullmatch(str(name).strip()) if name else None
+    if match is None:
+        raise AnalyticsError(f"Invalid column {name!r}: give a single column name.")
+    return quote_identifier(match.group(1).strip())
+
+
+def _columns(request: Dict[str, Any], field: str) -> List[str]:
+    value = request.get(field) or []
+    return [_column(name) for name in ([value] if isinstance(value, str) else value)]
+
+
+def _cast(expression: str, type_name: Any) -> str:
+    if str(type_name).lower() not in TYPES:
+        raise AnalyticsError(f"Unknown type {type_name!r}. Use one of: {', '.join(sorted(TYPES))}.")
+    return f"CAST({expression} AS {str(type_name).upper()})"
+
+
+def _metric(spec: Union[str, Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Compiles a metric, "fn(column)" or {"fn", "column", "type", "as"}, into an expression and its
+    output name, e.g. "avg(amount)" into ('AVG(CAST("amount" AS DOUBLE))', '"avg_amount"').
+    """
+    if isinstance(spec, str):
+        match = METRIC.fullmatch(spec)
+        if match is None:
+            raise AnalyticsError(f"Invalid metric {spec!r}: write it as fn(column), e.g. avg(amount) or count(*).")
+        spec = {"fn": match.group(1), "column": match.group(2)}
+    if not isinstance(spec, dict):
+        raise AnalyticsError(f"Invalid metric {spec!r}.")
+
+    function = str(spec.get("fn", "")).lower()
+    if function not in AGGREGATE_FUNCTIONS:
+        raise AnalyticsError(f"Unknown aggregate {spec.get('fn')!r}. Use one of: {', '.join(sorted(AGGREGATE_FUNCTIONS))}.")
+    column = str(spec.get("column") or "*").strip()
+
+    if column == "*":
+        if function != "count":
+            raise AnalyticsError(f"{function}(*) is not allowed, give a column.")
+        expression, name = "COUNT(*)", "row_count"
+    else:
+        argument = _column(column)
+        if spec.get("type"):
+            argument = _cast(argument, spec["type"])
+        elif function in NUMERIC_FUNCTIONS:
+            argument = f"CAST({argument} AS DOUBLE)"
+        expression = f"COUNT(DISTINCT {argument})" if function == "count_distinct" else f"{function.upper()}({argument})"
+        label = re.sub(r"[^0-9A-Za-z]+", "_", column.strip('"')).strip("_").lower()
+        name = f"{function}_{label}"
+    return expression, quote_identifier(str(spec.get("as") or name))
+
+
+def _metrics(request: Dict[str, Any], default: str = "count(*)") -> List[Tuple[str, str]]:
+    value = request.get("metrics") or [default]
+    return [_metric(spec) for spec in ([value] if isinstance(value, (str, dict)) else value)]
+
+
+def _condition(spec: Union[List[Any], Dict[str, Any]]) -> str:
+    if isinstance(spec, dict):
+        spec = [spec.get("column"), spec.get("op", "="), spec.get("value")]
+    if not isinstance(spec, (list, tuple)) or len(spec) not in (2, 3):
+        raise AnalyticsError(f"Invalid filter {spec!r}: write it as [column, operator, value].")
+
+    column, operator = _column(spec[0]), str(spec[1]).lower().strip()
+    value = spec[2] if len(spec) == 3 else None
+    if operator not in OPERATORS:
+        raise AnalyticsError(f"Unknown operator {spec[1]!r}. Use one of: {', '.join(sorted(OPERATORS))}.")
+    if operator in ("is null", "is not null"):
+        return f"{column} {operator.upper()}"
+    if operator in ("in", "not in"):
+        if not isinstance(value, list) or not value:
+            raise AnalyticsError(f"{operator} needs a non-empty list of values.")
+        return f"{column} {operator.upper()} ({', '.join(sql_literal(item) for item in value)})"
+    if operator == "between":
+        if not isinstance(value, list) or len(value) != 2:
+            raise AnalyticsError("between needs a list of two values.")
+        return f"{column} BETWEEN {sql_literal(value[0])} AND {sql_literal(value[1])}"
+    return f"{column} {operator.upper()} {sql_literal(value)}"
+
+
+def _order(spec: Union[str, Dict[str, Any]]) -> str:
+    """ORDER BY target: the output name of a metric, or a column."""
+    return _metric(spec)[1] if isinstance(spec, dict) or METRIC.fullmatch(spec) else _column(spec)
+
+
+def _where(request: Dict[str, Any], *extra: str) -> str:
+    filters = request.get("filters") or []
+    if isinstance(filters, dict):
+        filters = [[column, "=", value] for column, value in filters.items()]
+    conditions = [_condition(spec) for spec in filters] + list(extra)
+    return f"\nWHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def _limit(request: Dict[str, Any], field: str = "limit", default: int = DEFAULT_LIMIT) -> int:
+    try:
+        limit = int(request.get(field) or default)
+    except (TypeError, ValueError):
+        raise AnalyticsError(f"\"{field}\" must be a number.")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+# 🔹 Operations
+
+
+def _aggregate(request: Dict[str, Any]) -> str:
+    if request.get("group_by"):
+        return _group_by(request)
+    select = ", ".join(f"{expression} AS {name}" for expression, name in _metrics(request))
+    return f"SELECT {select}\nFROM {_table(request)}{_where(request)}"
+
+
+def _group_by(request: Dict[str, Any]) -> str:
+    groups = _columns(request, "group_by")
+    if not groups:
+        raise AnalyticsError("group_by needs \"group_by\": the columns to group on.")
+    metrics = _metrics(request)
+    order = _order(request["order_by"]) if request.get("order_by") else metrics[0][1]
+    direction = "ASC" if request.get("ascending") else "DESC"
+    select = ", ".join(groups + [f"{expression} AS {name}" for expression, name in metrics])
+    return (
+        f"SELECT {select}\nFROM {_table(request)}{_where(request)}\n"
+        f"GROUP BY {', '.join(groups)}\nORDER BY {order} {direction}\nLIMIT {_limit(request)}"
+    )
+
+
+def _top_k(request: Dict[str, Any]) -> str:
+    by = request.get("by")
+    if not by:
+        raise AnalyticsError("top_k needs \"by\": a metric such as sum(amount) with \"group_by\", or a column.")
+    k = _limit(request, "k", 10)
+    direction = "ASC" if request.get("ascending") else "DESC"
+
+    if request.get("group_by"):
+        return _group_by({**request, "metrics": [by] + [m for m in request.get("metrics") or [] if m != by], "order_by": by, "limit": k})
+
+    # ✅ Without groups, the k rows with the highest value of a column
+    column = _column(by)
+    select = ", ".join(_columns(request, "columns")) or "*"
+    return f"SELECT {select}\nFROM {_table(request)}{_where(request, f'{column} IS NOT NULL')}\nORDER BY {column} {direction}\nLIMIT {k}"
+
+
+def _histogram(request: Dict[str, Any]) -> str:
+    if not request.get("column"):
+        raise AnalyticsError("histogram needs \"column\": the numeric column to bin.")
+    column = _column(request["column"])
+    bins = max(1, min(_limit(request, "bins", DEFAULT_BINS), MAX_BINS))
+    where = _where(request, f"{column} IS NOT NULL").replace("\n", "\n    ")
+    return (
+        f"WITH analytics_values AS (\n"
+        f"    SELECT CAST({column} AS DOUBLE) AS v\n"
+        f"    FROM {_table(request)}{where}\n"
+        f"), analytics_bounds AS (\n"
+        f"    SELECT MIN(v) AS lo, CASE WHEN MAX(v) > MIN(v) THEN (MAX(v) - MIN(v)) / {bins} ELSE 1 END AS width\n"
+        f"    FROM analytics_values\n"
+        f")\n"
+        f"SELECT bucket, lo + bucket * width AS bucket_start, lo + (bucket + 1) * width AS bucket_end, COUNT(*) AS row_count\n"
+        f"FROM (\n"
+        f"    SELECT LEAST(CAST(FLOOR((v - lo) / width) AS INTEGER), {bins - 1}) AS bucket, lo, width\n"
+        f"    FROM analytics_values CROSS JOIN analytics_bounds\n"
+        f") binned\n"
+        f"GROUP BY bucket, lo, width\nORDER BY bucket"
+    )
+
+
+def _time_bucket(request: Dict[str, Any]) -> str:
+    if not request.get("column"):
+        raise AnalyticsError("time_bucket needs \"column\": the date or timestamp column.")
+    column = _column(request["column"])
+    unit = str(request.get("unit") or "day").lower()
+    if unit not in TIME_UNITS:
+        raise AnalyticsError(f"Unknown unit {request.get('unit')!r}. Use one of: {', '.join(TIME_UNITS)}.")
+    bucket = f"DATE_TRUNC('{unit}', CAST({column} AS TIMESTAMP))"
+    groups = _columns(request, "group_by")
+    select = ", ".join([f"{bucket} AS bucket"] + groups + [f"{expression} AS {name}" for expression, name in _metrics(request)])
+    return (
+        f"SELECT {select}\nFROM {_table(request)}{_where(request, f'{column} IS NOT NULL')}\n"
+        f"GROUP BY {', '.join([bucket] + groups)}\nORDER BY bucket\nLIMIT {_limit(request, default=MAX_LIMIT)}"
+    )
+
+
+_COMPILERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "aggregate": _aggregate,
+    "group_by": _group_by,
+    "top_k": _top_k,
+    "histogram": _histogram,
+    "time_bucket": _time_bucket,
+}
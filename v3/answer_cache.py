@@ -0,0 +1,186 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from schema_retriever import STOPWORDS, WORD, stem, tokenize
+
+# 🔹 Common abbreviations and synonyms mapped to one word, so "avg NYC temp" and
+# "what is the average temperature in NYC?" reduce to the same terms
+SYNONYMS = {
+    "avg": "average", "mean": "average", "temp": "temperature", "qty": "quantity", "amt": "amount",
+    "num": "number", "cnt": "count", "max": "maximum", "highest": "maximum", "largest": "maximum",
+    "biggest": "maximum", "min": "minimum", "lowest": "minimum", "smallest": "minimum", "sum": "total",
+    "yr": "year", "mo": "month", "dept": "department", "pct": "percent", "percentage": "percent",
+}
+
+# Words of the web app's input template that carry no meaning of their own
+IGNORED = {"data", "query"}
+
+# 🔹 Values that change what a question asks for: numbers, quoted strings and capitalized names
+# (not at the start of a sentence). Two questions only match when these are the same.
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+QUOTED = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+NAME = re.compile(r"(?<![.?!]\s)(?<!^)\b[A-Z][A-Za-z0-9]*\b")
+NOT_NAMES = STOPWORDS | IGNORED
+
+# 🔹 Words that relate the terms around them in one direction: "orders per customer" is not
+# "customers per order", and "from Boston to Denver" is not "from Denver to Boston"
+RELATIONS = {"per", "by", "of", "from", "to", "into", "than", "vs", "versus", "before", "after"}
+
+# Questions with up to this many terms and relations are matched with the plain threshold. Longer
+# ones may not differ by more terms than such a question, so one extra or changed word in a long
+# question still makes it a different question.
+SHORT_QUESTION = 8
+
+QuestionKey = Tuple[FrozenSet[str], FrozenSet[str]]
+
+
+def _relations(text: str) -> FrozenSet[str]:
+    """Each relation word with the terms just before and after it, in question order ("order per customer")."""
+    sequence = []
+    for word in (word.lower() for word in WORD.findall(text)):
+        if word in RELATIONS:
+            sequence.append(word)
+        elif word not in STOPWORDS and word not in IGNORED and (len(word) > 1 or word.isdigit()):
+            word = stem(word)
+            sequence.append(SYNONYMS.get(word, word))
+    found = set()
+    for i, word in enumerate(sequence):
+        if word in RELATIONS:
+            before = sequence[i - 1] if i > 0 and sequence[i - 1] not in RELATIONS else ""
+            after = sequence[i + 1] if i + 1 < len(sequence) and sequence[i + 1] not in RELATIONS else ""
+            found.add(f"{before} {word} {after}".strip())
+    return frozenset(found)
+
+
+def question_key(question: str) -> QuestionKey:
+    """
+    Reduces a question to its meaningful terms and its literal values.
+
+    Returns:
+        QuestionKey: (canonical terms and relations, literals). Terms are lower-cased, stemmed
+        and mapped through `SYNONYMS`, without stopwords. Relations keep the order of the terms
+        around words such as "per", "from" and "to" (see `RELATIONS`).
+    """
+    text = question.strip()
+    # ✅ Single letters are contraction leftovers ("what's" -> "s"), numbers are kept
+    terms = frozenset(SYNONYMS.get(term, term) for term in tokenize(text) if term not in IGNORED and (len(term) > 1 or term.isdigit()))
+    literals = set(NUMBER.findall(text))
+    literals.update((single or double).lower() for single, double in QUOTED.findall(text))
+    literals.update(name.lower() for name in NAME.findall(text) if name.lower() not in NOT_NAMES)
+    return terms | _relations(text), frozenset(literals)
+
+
+def similarity(a: QuestionKey, b: QuestionKey) -> float:
+    """Jaccard similarity of the terms and relations, or 0 when the literals differ."""
+    if a[1] != b[1] or not a[0] or not b[0]:
+        return 0.0
+    return len(a[0] & b[0]) / len(a[0] | b[0])
+
+
+def required_similarity(threshold: float, a: QuestionKey, b: QuestionKey) -> float:
+    """
+    The similarity two questions need to match: `threshold` up to `SHORT_QUESTION` terms, then
+    higher, so that longer questions may differ by no more terms than a short one.
+    """
+    size = len(a[0] | b[0])
+    if size <= SHORT_QUESTION:
+        return threshold
+    return 1 - (1 - threshold) * SHORT_QUESTION / size
+
+
+class AnswerCache:
+    """
+    Bounded LRU cache from questions to the SQL query that answered them.
+
+    A lookup matches a cached question that means the same thing: the same terms once
+    abbreviations, synonyms, plurals and filler words are normalized, in the same order around
+    relation words such as "per" or "from" (Jaccard similarity of at least `threshold`, raised for
+    long questions by `required_similarity`), and exactly the same numbers, quoted strings and
+    names. Entries belong to a schema version and are all dropped when it changes.
+    """
+
+    def __init__(self, maxsize: int = 256, threshold: float = 0.9):
+        """
+        Args:
+            maxsize (int): Maximum number of questions kept. 0 disables the cache.
+            threshold (float): Lowest similarity accepted as a match between short questions (1.0
+                for the same terms only).
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._version: Optional[int] = None
+        self._entries: "OrderedDict[QuestionKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, schema_version: int) -> None:
+        if schema_version != self._version:
+            self._entries.clear()
+            self._version = schema_version
+
+    def get(self, question: str, schema_version: int) -> Optional[Dict[str, Any]]:
+        """
+        Finds the cached question closest to `question`.
+
+        Returns:
+            Optional[Dict[str, Any]]: `question` (as cached), `sql` and `similarity`, or None.
+        """
+        if self.maxsize <= 0:
+            return None
+        key = question_key(question)
+        with self._lock:
+            self._check_version(schema_version)
+            best, best_score = None, 0.0
+            for cached_key in self._entries:
+                score = similarity(key, cached_key)
+                if score > best_score and score >= required_similarity(self.threshold, key, cached_key) - 1e-9:
+                    best, best_score = cached_key, score
+
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return dict(self._entries[best], similarity=best_score)
+
+    def put(self, question: str, sql: str, schema_version: int) -> None:
+        """Caches the SQL query that answered `question` against the given schema version."""
+        if self.maxsize <= 0:
+            return
+        key = question_key(question)
+        if not key[0]:
+            return
+        with self._lock:
+            self._check_version(schema_version)
+            self._entries[key] = {"question": question, "sql": sql}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, question: str) -> None:
+        """Drops the entry for `question`, e.g. when its SQL stopped working."""
+        with self._lock:
+            self._entries.pop(question_key(question), None)
+
+    def clear(self) -> None:
+        """Drops every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: hits, misses, hit_rate, size and maxsize.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
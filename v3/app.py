@@ -1,27 +1,19 @@
-from flask import Flask, render_template, request, jsonify
-from agent import sql_agent
+from agent import get_factory, run_agent
+from connection import AGENT_WORKERS, AGENT_QUEUE_SIZE, AGENT_REQUEST_DEADLINE, AGENT_LOG_LEVEL, AGENT_LOG_FORMAT, WEB_DEBUG
+from serving import create_app
+from telemetry import configure_logging
 
-app = Flask(__name__)
+# ✅ Log records are written by a background thread, never by the request or query threads
+configure_logging(AGENT_LOG_LEVEL, AGENT_LOG_FORMAT)
 
-@app.route("/", methods=["GET", "POST"])
-def index():
-    if request.method == "POST":
-        query = request.form.get("query", "").strip()
-        question = request.form.get("question", "").strip()
-
-        if not query and not question:
-            return jsonify({"error": "Please provide either a SQL query or a natural language question."})
-
-        input_text = f"""
-        Run the following query: {query}
-        Using the Data Answer the following question: {question}
-        """
-        
-        response = sql_agent.run(input_text)
-
-        return jsonify({"response": response})
-
-    return render_template("index.html")
+# ✅ Agent requests run on a bounded worker pool; the web threads only queue and wait.
+# The agent itself is built on the first request, or up front by `warmup` (see gunicorn.conf.py).
+app = create_app(
+    run_agent, workers=AGENT_WORKERS, max_pending=AGENT_QUEUE_SIZE, deadline=AGENT_REQUEST_DEADLINE,
+    reflection_report=lambda **options: get_factory().db.reflection_report(**options),
+)
 
+# 🔹 Development server; in production serve with gunicorn -c gunicorn.conf.py app:app
 if __name__ == "__main__":
-    app.run(debug=True)
+    get_factory().warmup()  # ✅ Pay the startup cost before the first request instead of during it
+    app.run(debug=WEB_DEBUG, threaded=True, use_reloader=False)  # ✅ Requests share the Dremio connection pool
@@ -0,0 +1,115 @@
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import pyarrow as pa
+
+from stream_reader import batch_reader, cancel_reader
+from telemetry import span
+
+
+def table_rows(table: pa.Table, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Converts (at most `limit`) rows of an Arrow table to Python dictionaries.
+    The slice is zero-copy, so only the rows that are returned are materialized.
+    """
+    if limit is not None:
+        table = table.slice(0, limit)
+    return table.to_pylist()
+
+
+class ArrowCursor:
+    """
+    Lazy, DB-API style cursor over an Arrow result.
+
+    Nothing is read from the underlying RecordBatch stream until rows are requested, and rows are
+    converted to Python one batch at a time, so `fetchone`/`fetchmany` on a large result only
+    materialize what they return.
+    """
+
+    def __init__(self, source: Union[pa.Table, pa.RecordBatchReader]):
+        """
+        Args:
+            source (Union[pa.Table, pa.RecordBatchReader]): A complete table, an IPC stream or the
+                FlightStreamReader returned by `DremioConnection.toArrow`.
+        """
+        self._reader = source.to_reader() if isinstance(source, pa.Table) else source
+        self._read_batch = batch_reader(self._reader)
+        self._batch: Optional[pa.RecordBatch] = None
+        self._offset = 0
+        self._exhausted = False
+        self.rowcount = -1
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self._reader.schema
+
+    def keys(self) -> List[str]:
+        """Column names, like SQLAlchemy's `Result.keys()`."""
+        return self._reader.schema.names
+
+    def _next_batch(self) -> bool:
+        """Moves to the next non-empty batch. Returns False once the stream is exhausted."""
+        while not self._exhausted:
+            try:
+                self._batch = self._read_batch()
+            except StopIteration:
+                self._exhausted = True
+                self._batch = None
+                return False
+            self._offset = 0
+            if self._batch.num_rows:
+                return True
+        return False
+
+    def fetch_arrow(self, size: Optional[int] = None) -> pa.Table:
+        """
+        Returns the next `size` rows (all remaining rows when None) as an Arrow table.
+        """
+        batches = []
+        remaining = size
+        while remaining is None or remaining > 0:
+            if self._batch is None or self._offset >= self._batch.num_rows:
+                if not self._next_batch():
+                    break
+            available = self._batch.num_rows - self._offset
+            take = available if remaining is None else min(available, remaining)
+            batches.append(self._batch.slice(self._offset, take))
+            self._offset += take
+            if remaining is not None:
+                remaining -= take
+        return pa.Table.from_batches(batches, schema=self._reader.schema)
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        rows = self.fetch_arrow(1).to_pylist()
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: int = 1) -> List[Dict[str, Any]]:
+        return self.fetch_arrow(size).to_pylist()
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self.fetch_arrow().to_pylist()
+
+    def to_pandas(self):
+        """Reads the remaining rows into a Pandas DataFrame."""
+        table = self.fetch_arrow()
+        with span("arrow_to_pandas", rows=table.num_rows):
+            return table.to_pandas()
+
+    def close(self) -> None:
+        """Stops reading and releases the stream (cancelling the query on Flight readers)."""
+        if not self._exhausted:
+            cancel_reader(self._reader)
+        self._exhausted = True
+        self._batch = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            table = self.fetch_arrow(1024)
+            if table.num_rows == 0:
+                return
+            yield from table.to_pylist()
+
+    def __enter__(self) -> "ArrowCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
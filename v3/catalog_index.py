@@ -0,0 +1,127 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TableKey = Tuple[str, str, str]  # (catalog, schema, table)
+
+
+def split_identifier(name: str) -> List[str]:
+    """
+    Splits a possibly quoted, dotted SQL identifier into its parts.
+
+    Example:
+        'Samples."samples.dremio.com"."NYC-weather.csv"' -> ['Samples', 'samples.dremio.com', 'NYC-weather.csv']
+    """
+    parts, current, quoted, i = [], [], False, 0
+    while i < len(name):
+        char = name[i]
+        if char == '"':
+            if quoted and i + 1 < len(name) and name[i + 1] == '"':
+                current.append('"')  # ✅ Escaped quote inside a quoted identifier
+                i += 1
+            else:
+                quoted = not quoted
+        elif char == "." and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    parts.append("".join(current))
+    return [part.strip("'") for part in parts]
+
+
+class CatalogIndex:
+    """
+    Table metadata keyed by (catalog, schema, table) with constant-time name resolution.
+
+    Secondary indexes map bare table names to their candidates (exact and case-insensitive)
+    and `schema.table` / `catalog.schema.table` paths to a single table, so resolving a name
+    never scans the catalog.
+    """
+
+    def __init__(self):
+        self._tables: Dict[TableKey, Dict[str, Any]] = {}
+        self._by_name: Dict[str, List[TableKey]] = {}
+        self._by_lower_name: Dict[str, List[TableKey]] = {}
+        self._by_path: Dict[str, TableKey] = {}
+
+    def add(self, catalog: str, schema: str, table: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Adds (or replaces) a table.
+
+        Args:
+            catalog (str): TABLE_CATALOG, usually "DREMIO".
+            schema (str): TABLE_SCHEMA, the dotted space/folder path.
+            table (str): TABLE_NAME.
+            columns (Optional[List[str]]): Column names, or None when not loaded yet.
+
+        Returns:
+            Dict[str, Any]: The stored table entry.
+        """
+        key = (catalog, schema, table)
+        entry = {
+            "catalog": catalog,
+            "schema": schema,
+            "table": table,
+            "fully_qualified_name": f'"{schema}"."{table}"',
+            "columns": columns,
+        }
+
+        if key not in self._tables:
+            self._by_name.setdefault(table, []).append(key)
+            self._by_lower_name.setdefault(table.lower(), []).append(key)
+            self._by_path.setdefault(f"{schema}.{table}".lower(), key)
+            self._by_path.setdefault(f"{catalog}.{schema}.{table}".lower(), key)
+
+        self._tables[key] = entry
+        return entry
+
+    def candidates(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Returns every table a (possibly qualified) name can refer to, exact-case matches first.
+        """
+        parts = split_identifier(name)
+
+        if len(parts) > 1:
+            path = ".".join(parts).lower()
+            key = self._by_path.get(path)
+            return [self._tables[key]] if key else []
+
+        keys = self._by_name.get(parts[0]) or self._by_lower_name.get(parts[0].lower(), [])
+        return [self._tables[key] for key in keys]
+
+    def resolve(self, name: str, case_sensitive: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Resolves a table reference to a single entry.
+
+        Args:
+            name (str): A bare, dotted or quoted table reference.
+            case_sensitive (bool): Only accept bare names whose case matches exactly.
+
+        Returns:
+            Optional[Dict[str, Any]]: The matching entry (the first candidate when a bare name is ambiguous), or None.
+        """
+        if case_sensitive and "." not in name:
+            keys = self._by_name.get(name.strip("\"'"))
+            return self._tables[keys[0]] if keys else None
+
+        candidates = self.candidates(name)
+        return candidates[0] if candidates else None
+
+    def display_name(self, entry: Dict[str, Any]) -> str:
+        """Bare name when unique in the catalog, otherwise the fully qualified name."""
+        if len(self._by_name.get(entry["table"], [])) > 1:
+            return entry["fully_qualified_name"]
+        return entry["table"]
+
+    def table_names(self) -> List[str]:
+        """Unambiguous names for every table, in insertion order."""
+        return [self.display_name(entry) for entry in self._tables.values()]
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._tables.values())
+
+    def __contains__(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def __len__(self) -> int:
+        return len(self._tables)
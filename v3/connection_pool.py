@@ -0,0 +1,289 @@
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+import requests
+from pyarrow import flight
+
+from telemetry import get_logger
+
+if TYPE_CHECKING:
+    from dremio_simple_query.connect import DremioConnection
+
+log = get_logger("connection_pool")
+
+# 🔹 Statements that only read data and can safely be sent again after a transient failure
+IDEMPOTENT = re.compile(r"\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*(?:SELECT|WITH|VALUES|SHOW|DESCRIBE|EXPLAIN)\b", re.IGNORECASE | re.DOTALL)
+
+# Flight errors worth retrying (the server or network had a hiccup, the query itself is fine)
+TRANSIENT_ERRORS = (flight.FlightUnavailableError, flight.FlightTimedOutError, ConnectionError)
+
+# 🔹 Dremio also reports ordinary query failures as FlightInternalError; only these messages mean the channel broke
+CHANNEL_FAILURE = re.compile(r"connection (?:reset|refused|closed|lost)|channel|socket closed|stream removed|broken pipe|goaway|transport", re.IGNORECASE)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Tells whether a failed call is worth retrying on a fresh client."""
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    return isinstance(error, flight.FlightInternalError) and CHANNEL_FAILURE.search(str(error)) is not None
+
+
+class TokenManager:
+    """
+    Owns the Dremio auth token.
+
+    Cloud personal access tokens are used as given. Software tokens come from the login endpoint
+    and are fetched again shortly before they expire (or right away after `invalidate`), so queries
+    never fail on an expired token.
+    """
+
+    def __init__(self, environment: str = "software", token: Optional[str] = None, login_uri: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None, token_ttl: float = 30 * 3600, refresh_margin: float = 600):
+        """
+        Args:
+            environment (str): "software" or "cloud".
+            token (Optional[str]): Personal access token (cloud).
+            login_uri (Optional[str]): Login endpoint, e.g. http://localhost:9047/apiv2/login (software).
+            username (Optional[str]): Dremio Software username.
+            password (Optional[str]): Dremio Software password.
+            token_ttl (float): Assumed token lifetime in seconds when the login response has no expiry.
+            refresh_margin (float): Seconds before expiry at which the token is refreshed.
+        """
+        self.environment = environment.lower()
+        self.login_uri = login_uri
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        self.refresh_margin = refresh_margin
+        self.version = 0  # Bumped on every new token so pooled clients pick it up
+        self.refreshes = 0
+        self._token = token
+        self._expires_at = float("inf") if self.environment == "cloud" else 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        """Returns a valid token, logging in again when the current one is about to expire."""
+        if self._token and time.time() < self._expires_at - self.refresh_margin:
+            return self._token
+
+        with self._lock:
+            if not self._token or time.time() >= self._expires_at - self.refresh_margin:
+                self._refresh()
+            return self._token
+
+    def invalidate(self) -> None:
+        """Forces a refresh on the next `get` (after the server rejected the token)."""
+        if self.environment == "software":
+            with self._lock:
+                self._expires_at = 0.0
+
+    def _refresh(self) -> None:
+        if self.environment == "cloud":
+            if not self._token:
+                raise ValueError("DREMIO_TOKEN must be set for Dremio Cloud.")
+            return
+
+        log.info("🔄 Fetching Dremio Software Token...")
+        response = requests.post(self.login_uri, json={"userName": self.username, "password": self.password}, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+
+        self._token = data.get("token", "")
+        expires = data.get("expires")  # ✅ Dremio returns the expiry as epoch milliseconds
+        self._expires_at = expires / 1000 if expires else time.time() + self.token_ttl
+        self.version += 1
+        self.refreshes += 1
+
+
+class DremioConnectionPool:
+    """
+    Pool of Flight clients with the same query API as `DremioConnection` (`toArrow`, `toPandas`,
+    `toPolars`, `toDuckDB`), so it can be passed anywhere a connection is expected.
+
+    Clients idle for longer than `health_check_interval` are checked with a trivial query before
+    reuse and replaced when broken. Reads are retried with exponential backoff on transient
+    Flight errors, and once with a fresh token when the server rejects the current one.
+
+    A client is held while a call opens its stream. The returned FlightStreamReader may still be
+    read after the client went back to the pool, which is safe because a Flight client multiplexes
+    concurrent streams.
+    """
+
+    def __init__(self, location: str, token_manager: TokenManager, size: int = 4, health_check_interval: float = 60, retries: int = 3, backoff: float = 0.5):
+        """
+        Args:
+            location (str): Arrow Flight URI, e.g. grpc://localhost:32010.
+            token_manager (TokenManager): Source of valid auth tokens.
+            size (int): Most Flight clients checked out at the same time.
+            health_check_interval (float): Seconds a client may sit idle before it is checked again.
+            retries (int): Extra attempts for idempotent reads after a transient failure.
+            backoff (float): First retry delay in seconds, doubled on every attempt.
+        """
+        self.location = location
+        self.token_manager = token_manager
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.retries = retries
+        self.backoff = backoff
+        self._idle: "queue.LifoQueue[Dict[str, Any]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "discarded": 0, "retries": 0, "health_checks": 0}
+
+    # 🔹 DremioConnection-compatible API
+
+    def toArrow(self, query: str):
+        return self._call("toArrow", query)
+
+    def toPandas(self, query: str):
+        return self._call("toPandas", query)
+
+    def toPolars(self, query: str):
+        return self._call("toPolars", query)
+
+    def toDuckDB(self, query: str):
+        return self._call("toDuckDB", query)
+
+    # 🔹 Pooling
+
+    @contextmanager
+    def connection(self) -> Iterator["DremioConnection"]:
+        """Checks a healthy client with a current token out of the pool for the duration of the block."""
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry["connection"]
+        except Exception as e:
+            if entry is not None and is_transient(e):
+                self._discard(entry)  # ✅ A client whose channel failed is not trusted again
+                entry = None
+            raise
+        finally:
+            if entry is not None:
+                entry["last_used"] = time.monotonic()
+                self._idle.put(entry)
+            self._slots.release()
+
+    def _checkout(self) -> Dict[str, Any]:
+        token = self.token_manager.get()
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create(token)
+
+            if entry["token_version"] != self.token_manager.version:
+                self._set_token(entry, token)
+            if time.monotonic() - entry["last_used"] > self.health_check_interval and not self._healthy(entry):
+                self._discard(entry)
+                continue
+            return entry
+
+    def _create(self, token: str) -> Dict[str, Any]:
+        # Imported on first use: dremio_simple_query imports duckdb and polars, which slows down startup
+        from dremio_simple_query.connect import DremioConnection
+
+        with self._lock:
+            self._stats["created"] += 1
+        return {"connection": DremioConnection(token, self.location), "token_version": self.token_manager.version, "last_used": time.monotonic()}
+
+    def _set_token(self, entry: Dict[str, Any], token: str) -> None:
+        connection = entry["connection"]
+        connection.token = token
+        connection.headers = [(b"authorization", f"bearer {token}".encode("utf-8"))]
+        entry["token_version"] = self.token_manager.version
+
+    def _healthy(self, entry: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._stats["health_checks"] += 1
+        try:
+            entry["connection"].toArrow("SELECT 1").read_all()
+            return True
+        except Exception as e:
+            log.warning("⚠️ Discarding unhealthy Dremio client: %s", e)
+            return False
+
+    def _discard(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._stats["discarded"] += 1
+        try:
+            entry["connection"].client.close()
+        except Exception:
+            pass
+
+    def _call(self, method: str, query: str) -> Any:
+        """Runs one query method on a pooled client, retrying idempotent reads."""
+        attempts = 1 + (self.retries if IDEMPOTENT.match(query) else 0)
+        reauthenticated = False
+        attempt = 0
+
+        while True:
+            try:
+                with self.connection() as connection:
+                    return getattr(connection, method)(query)
+            except flight.FlightUnauthenticatedError:
+                # ✅ Token revoked or expired early: log in again and retry once
+                if reauthenticated or self.token_manager.environment != "software":
+                    raise
+                reauthenticated = True
+                self.token_manager.invalidate()
+            except Exception as e:
+                attempt += 1
+                if not is_transient(e) or attempt >= attempts:
+                    raise
+                delay = self.backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+                log.warning("🔁 Retrying query after %s (attempt %d/%d) in %.2fs", type(e).__name__, attempt + 1, attempts, delay)
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Pool size, idle clients, clients created/discarded, retries, health checks and token refreshes.
+        """
+        with self._lock:
+            return {"size": self.size, "idle": self._idle.qsize(), **self._stats, "token_refreshes": self.token_manager.refreshes}
+
+    def close(self) -> None:
+        """Closes every idle client."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def reset(self) -> None:
+        """
+        Forgets every client without closing it. Called in a forked child process, whose copies of
+        the parent's gRPC channels must not be used (or closed); new clients are created on demand.
+        """
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+
+
+def create_connection_pool(environment: str, location: str, token: Optional[str] = None, login_uri: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None, size: int = 4, retries: int = 3) -> DremioConnectionPool:
+    """
+    Builds a `TokenManager` and a `DremioConnectionPool` from the usual environment settings.
+
+    Args:
+        environment (str): "software" or "cloud".
+        location (str): Arrow Flight URI.
+        token (Optional[str]): Personal access token (cloud).
+        login_uri (Optional[str]): Login endpoint (software).
+        username (Optional[str]): Dremio Software username.
+        password (Optional[str]): Dremio Software password.
+        size (int): Pool size.
+        retries (int): Extra attempts for idempotent reads.
+
+    Returns:
+        DremioConnectionPool: The pool, usable wherever a `DremioConnection` is.
+    """
+    tokens = TokenManager(environment, token=token, login_uri=login_uri, username=username, password=password)
+    return DremioConnectionPool(location, tokens, size=size, retries=retries)
@@ -0,0 +1,322 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from result_renderer import estimate_tokens
+from telemetry import get_logger
+
+log = get_logger("conversation")
+
+# 🔹 Longest texts kept per turn: the question, each SQL query, each result summary and the answer
+MAX_QUESTION_CHARS = 300
+MAX_SQL_CHARS = 600
+MAX_ANSWER_CHARS = 400
+RESULT_LINES = 4
+RESULT_LINE_CHARS = 120
+
+# Tables of earlier turns described to the agent again, most recently used first
+MAX_TABLES = 4
+
+WHITESPACE = re.compile(r"\s+")
+
+# First line of a result rendered with column statistics (see result_renderer.py)
+STATISTICS = re.compile(r"\d+ rows x \d+ columns")
+
+
+def _cut(text: str, limit: int) -> str:
+    """Collapses whitespace and cuts `text` to `limit` characters."""
+    text = WHITESPACE.sub(" ", str(text)).strip()
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def summarize_result(output: Any, lines: int = RESULT_LINES) -> str:
+    """
+    Summarizes a query tool's output for the conversation history without its raw rows. A
+    rendered result keeps its row count and up to `lines` lines of column statistics. A CSV result
+    keeps its row count and columns, and its rows only when there are at most `lines` - 1 of them
+    (a total or a short ranking). Other outputs keep their first lines. Lines are cut to
+    `RESULT_LINE_CHARS`.
+    """
+    found = [line.strip() for line in str(output).splitlines() if line.strip()]
+    if not found:
+        return ""
+    if STATISTICS.match(found[0]):
+        kept = found[:next((i for i, line in enumerate(found) if line.startswith("Sample of")), len(found))]
+        kept = kept[:lines + 1] + ([f"(+{len(kept) - lines - 1} more columns)"] if len(kept) > lines + 1 else [])
+    elif "," in found[0] and not found[0].startswith(("Query ", "(")):
+        rows = found[1:]
+        kept = [f"{len(rows)} rows ({found[0]})"] + (rows if len(rows) < lines else [])
+    else:
+        kept = found[:lines] + ([f"(+{len(found) - lines} more lines)"] if len(found) > lines else [])
+    return " | ".join(_cut(line, RESULT_LINE_CHARS) for line in kept)
+
+
+class MemoryStore:
+    """In-process conversation store: JSON states in an LRU of at most `max_sessions` sessions, each kept `ttl` seconds after its last use."""
+
+    def __init__(self, max_sessions: int = 256, ttl: float = 3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._states: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            found = self._states.get(session)
+            if found is None:
+                return None
+            if time.time() - found[1] > self.ttl:
+                del self._states[session]
+                return None
+            self._states[session] = (found[0], time.time())
+            self._states.move_to_end(session)
+            return json.loads(found[0])
+
+    def put(self, session: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._put(session, state)
+
+    def update(self, session: str, change: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]) -> None:
+        """Replaces the session's state (None for a new or expired session) with `change(state)`, atomically."""
+        with self._lock:
+            found = self._states.get(session)
+            state = json.loads(found[0]) if found is not None and time.time() - found[1] <= self.ttl else None
+            self._put(session, change(state))
+
+    def _put(self, session: str, state: Dict[str, Any]) -> None:
+        self._states[session] = (json.dumps(state), time.time())
+        self._states.move_to_end(session)
+        while len(self._states) > self.max_sessions:
+            self._states.popitem(last=False)
+
+    def drop(self, session: str) -> None:
+        with self._lock:
+            self._states.pop(session, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._states), "bytes": sum(len(state) for state, _ in self._states.values())}
+
+
+class SQLiteStore:
+    """
+    Conversation store in a local SQLite file, shared by the processes of a server and kept across
+    restarts. Beyond `max_sessions`, the least recently updated sessions are deleted, and sessions
+    idle for `ttl` seconds are ignored and then deleted. Every call opens its own connection, so
+    the store is safe across threads and forks.
+    """
+
+    def __init__(self, path: str, max_sessions: int = 256, ttl: float = 3600):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")  # ✅ Readers do not wait for the writer
+            db.execute("CREATE TABLE IF NOT EXISTS conversations (session TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)")
+        log.info("✅ Conversations are stored in %s", path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, session: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as db:
+            row = db.execute("SELECT state FROM conversations WHERE session = ? AND updated >= ?", (session, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session: str, state: Dict[str, Any]) -> None:
+        with self._connect() as db:
+            self._write(db, session, state, time.time())
+
+    def update(self, session: str, change: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]) -> None:
+        """
+        Replaces the session's state (None for a new or expired session) with `change(state)` in one
+        transaction. `BEGIN IMMEDIATE` takes the write lock before the read, so an update from
+        another process waits for this one instead of overwriting it with an older state.
+        """
+        db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = db.execute("SELECT state FROM conversations WHERE session = ? AND updated >= ?", (session, now - self.ttl)).fetchone()
+            self._write(db, session, change(json.loads(row[0]) if row else None), now)
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _write(self, db: sqlite3.Connection, session: str, state: Dict[str, Any], now: float) -> None:
+        db.execute("INSERT OR REPLACE INTO conversations (session, state, updated) VALUES (?, ?, ?)", (session, json.dumps(state), now))
+        db.execute("DELETE FROM conversations WHERE updated < ?", (now - self.ttl,))
+        db.execute("DELETE FROM conversations WHERE session NOT IN (SELECT session FROM conversations ORDER BY updated DESC LIMIT ?)", (self.max_sessions,))
+
+    def drop(self, session: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM conversations WHERE session = ?", (session,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as db:
+            sessions, size = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM conversations").fetchone()
+        return {"backend": "sqlite", "sessions": sessions, "bytes": size}
+
+
+def create_store(path: Optional[str] = None, max_sessions: int = 256, ttl: float = 3600):
+    """A `SQLiteStore` at `path`, or a `MemoryStore` without one."""
+    if path:
+        return SQLiteStore(path, max_sessions=max_sessions, ttl=ttl)
+    return MemoryStore(max_sessions=max_sessions, ttl=ttl)
+
+
+class ConversationMemory:
+    """
+    Bounded history of each conversation (session), given to the agent with follow-up questions.
+
+    A turn keeps the question, the tables its queries read, the SQL that ran with a summary of
+    each result (see `summarize_result`, never the raw rows) and the answer. The last
+    `recent_turns` turns are kept in full. Older turns are compressed to one line each (question,
+    answer and last query). While the history would exceed `token_budget` tokens, the recent
+    turns but the last are compressed as well, then the oldest lines are dropped. The tables of
+    recent turns are remembered, so the agent is shown them again instead of looking up their
+    schemas.
+
+    States are kept in a pluggable store: `MemoryStore` (per process) or `SQLiteStore` (shared,
+    persistent). A `token_budget` of 0 disables the memory.
+    """
+
+    def __init__(self, store: Any = None, token_budget: int = 800, recent_turns: int = 2):
+        """
+        Args:
+            store (Any): `MemoryStore`, `SQLiteStore` or any object with `get`, `put`, `drop` and `stats`,
+                and optionally an atomic `update` (see `record`). Defaults to a `MemoryStore`.
+            token_budget (int): Most tokens of history given to the agent per question.
+            recent_turns (int): Turns kept in full before they are compressed.
+        """
+        self.store = store if store is not None else MemoryStore()
+        self.token_budget = token_budget
+        self.recent_turns = max(recent_turns, 1)
+        self.recorded = 0
+        self.compressed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def enabled(self, session: Optional[str]) -> bool:
+        return bool(session) and self.token_budget > 0
+
+    def history(self, session: Optional[str]) -> str:
+        """The session's history for the agent's input, or "" for a new or unnamed session."""
+        if not self.enabled(session):
+            return ""
+        state = self.store.get(session)
+        return self._render(state) if state else ""
+
+    def tables(self, session: Optional[str]) -> List[str]:
+        """Tables the session's recent turns read, most recently used first."""
+        if not self.enabled(session):
+            return []
+        state = self.store.get(session)
+        return list(state["tables"]) if state else []
+
+    def record(self, session: Optional[str], question: str, answer: str, steps: Sequence[Dict[str, str]] = (), tables: Sequence[str] = ()) -> None:
+        """
+        Adds a turn to the session's history and compresses it back within the token budget.
+        With a store that has `update`, the read and the write are one atomic step in the store, so
+        processes sharing a `SQLiteStore` never lose each other's turns. With a store that only
+        has `get` and `put`, turns are only safe from being lost within one process.
+
+        Args:
+            session (Optional[str]): The conversation; nothing is kept without one.
+            question (str): The question (agent input) of the turn.
+            answer (str): The agent's answer.
+            steps (Sequence[Dict[str, str]]): The queries that ran, each with `sql` and a `result` summary.
+            tables (Sequence[str]): Tables the queries read.
+        """
+        if not self.enabled(session):
+            return
+        turn = {
+            "question": _cut(question, MAX_QUESTION_CHARS),
+            "tables": list(dict.fromkeys(tables)),
+            "steps": [{"sql": _cut(step["sql"], MAX_SQL_CHARS), "result": step.get("result", "")} for step in steps],
+            "answer": _cut(answer, MAX_ANSWER_CHARS),
+        }
+
+        def add_turn(state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            state = state or {"turns": [], "compressed": [], "omitted": 0, "tables": []}
+            state["turns"].append(turn)
+            state["tables"] = list(dict.fromkeys(turn["tables"] + state["tables"]))[:MAX_TABLES]
+            self._compress(state)
+            return state
+
+        with self._lock:
+            if hasattr(self.store, "update"):
+                self.store.update(session, add_turn)
+            else:
+                self.store.put(session, add_turn(self.store.get(session)))
+            self.recorded += 1
+
+    def _compress(self, state: Dict[str, Any]) -> None:
+        """Folds old turns into one-line summaries and drops the oldest until the history fits."""
+        while len(state["turns"]) > self.recent_turns:
+            state["compressed"].append(self._summarize(state["turns"].pop(0)))
+            self.compressed += 1
+
+        while estimate_tokens(self._render(state)) > self.token_budget:
+            if len(state["turns"]) > 1:
+                state["compressed"].append(self._summarize(state["turns"].pop(0)))
+                self.compressed += 1
+            elif state["compressed"]:
+                state["compressed"].pop(0)
+                state["omitted"] += 1
+                self.dropped += 1
+            elif any(step["result"] for step in state["turns"][0]["steps"]):
+                # ✅ A single turn over the budget keeps its SQL but not its results
+                for step in state["turns"][0]["steps"]:
+                    step["result"] = ""
+            elif len(state["turns"][0]["steps"]) > 1:
+                state["turns"][0]["steps"].pop(0)
+            else:
+                break
+
+    @staticmethod
+    def _summarize(turn: Dict[str, Any]) -> str:
+        line = f"{_cut(turn['question'], 160)} → {_cut(turn['answer'], 160)}"
+        if turn["steps"]:
+            line += f" [SQL: {_cut(turn['steps'][-1]['sql'], 240)}]"
+        return line
+
+    @staticmethod
+    def _render(state: Dict[str, Any]) -> str:
+        lines = ["Earlier in this conversation (reuse these tables and queries for follow-up questions):"]
+        if state["omitted"]:
+            lines.append(f"- ({state['omitted']} earlier question(s) left out)")
+        lines += [f"- {line}" for line in state["compressed"]]
+        for turn in state["turns"]:
+            lines.append(f"Q: {turn['question']}")
+            if turn["tables"]:
+                lines.append(f"Tables: {', '.join(turn['tables'])}")
+            for step in turn["steps"]:
+                lines.append(f"SQL: {step['sql']}")
+                if step["result"]:
+                    lines.append(f"Result: {step['result']}")
+            lines.append(f"A: {turn['answer']}")
+        return "\n".join(lines)
+
+    def drop(self, session: str) -> None:
+        """Forgets a conversation."""
+        self.store.drop(session)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: The store's backend, sessions and bytes, and the turns recorded,
+            compressed and dropped.
+        """
+        return {**self.store.stats(), "turns": self.recorded, "compressed": self.compressed, "dropped": self.dropped}
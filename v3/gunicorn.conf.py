@@ -0,0 +1,18 @@
+# 🔹 Pre-fork serving: gunicorn -c gunicorn.conf.py app:app
+#
+# The app and the agent are built once in the parent (schema loaded, snapshot checked against
+# Dremio) and the worker processes inherit them copy-on-write, so no worker pays the cold start.
+# Jobs live in process memory: with more than one process, use `POST /` or a sticky load balancer
+# so that polling and event streams reach the process that owns the job.
+from os import getenv
+
+bind = getenv("WEB_BIND", "0.0.0.0:8000")
+workers = int(getenv("WEB_PROCESSES", "1"))
+threads = int(getenv("WEB_THREADS", "32"))
+timeout = 0  # ✅ Long-polls and event streams stay open; request deadlines are enforced by the job queue
+preload_app = True
+
+
+def on_starting(server):
+    from agent import get_factory
+    get_factory().warmup()
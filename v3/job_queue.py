@@ -0,0 +1,269 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the admission queue is full."""
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running job to stop it once its deadline passed."""
+
+
+class JobEvents:
+    """
+    Append-only log of one job's progress events (agent steps, tokens, final status).
+
+    Any number of readers can follow it from any position, e.g. an SSE connection resuming
+    after `Last-Event-ID`; the log is closed once the job has finished.
+    """
+
+    def __init__(self):
+        self._events: List[Dict[str, Any]] = []
+        self._closed = False
+        self._changed = threading.Condition()
+
+    def append(self, kind: str, **data: Any) -> None:
+        with self._changed:
+            if not self._closed:
+                self._events.append({"type": kind, "time": time.time(), **data})
+                self._changed.notify_all()
+
+    def close(self) -> None:
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def follow(self, start: int = 0, heartbeat: float = 15) -> Iterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """
+        Yields `(index, event)` from `start` on as events arrive, and None after `heartbeat` idle
+        seconds so the caller can keep its connection alive. Stops once the log is closed and read.
+        """
+        index = start
+        while True:
+            with self._changed:
+                if index >= len(self._events) and not self._closed:
+                    self._changed.wait(heartbeat)
+                batch = self._events[index:]
+                closed = self._closed
+
+            if not batch:
+                if closed:
+                    return
+                yield None
+                continue
+
+            for event in batch:
+                yield index, event
+                index += 1
+
+
+class JobQueue:
+    """
+    Runs agent requests on a bounded pool of worker threads behind an admission queue.
+
+    At most `workers` jobs run at once and at most `max_pending` wait for a worker; further
+    submissions are rejected right away with `QueueFullError` (HTTP 429) instead of piling up.
+    Every job has a deadline: a job still waiting when it passes is never started, and a job
+    still running is reported as expired (its late result is dropped) and has its cancel event
+    set, which `fn` should check to stop and free its worker. Jobs that expired while their worker
+    is still busy are counted as `overdue` in `stats`. Each job also has a `JobEvents` log that
+    `fn` can write progress to and clients can follow while it runs.
+    """
+
+    def __init__(self, fn: Callable[[str, JobEvents, Optional[str], float, threading.Event], Any], workers: int = 4, max_pending: int = 32, deadline: float = 120, keep_results: float = 300):
+        """
+        Args:
+            fn (Callable[[str, JobEvents, Optional[str], float, threading.Event], Any]): Blocking function run for every job
+                with its input, event log, session, deadline (a `time.time()` value) and cancel event.
+            workers (int): Jobs running at the same time.
+            max_pending (int): Jobs allowed to wait for a worker.
+            deadline (float): Default seconds between submission and the end of a job.
+            keep_results (float): Seconds a finished job stays available for polling.
+        """
+        self.fn = fn
+        self.workers = workers
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self.keep_results = keep_results
+        self._pending: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_pending)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "expired": 0}
+        self._workers_pid = None
+
+    def _ensure_workers(self) -> None:
+        """
+        Starts the worker threads on first use in this process. Threads do not survive a fork, so an
+        app created in the parent of a pre-fork server gets its workers in each child.
+        """
+        if self._workers_pid == os.getpid():
+            return
+        with self._lock:
+            if self._workers_pid != os.getpid():
+                for i in range(self.workers):
+                    threading.Thread(target=self._work, name=f"agent-worker-{i}", daemon=True).start()
+                self._workers_pid = os.getpid()
+
+    def submit(self, text: str, deadline: Optional[float] = None, session: Optional[str] = None) -> str:
+        """
+        Queues a job.
+
+        Args:
+            text (str): Input passed to `fn`.
+            deadline (Optional[float]): Seconds the job may take, waiting included (defaults to the queue's deadline).
+            session (Optional[str]): Conversation the job belongs to, passed to `fn`.
+
+        Returns:
+            str: The job id.
+
+        Raises:
+            QueueFullError: `max_pending` jobs are already waiting.
+        """
+        self._ensure_workers()
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "input": text,
+            "session": session,
+            "status": "queued",
+            "submitted_at": now,
+            "deadline_at": now + (deadline or self.deadline),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "done": threading.Event(),
+            "cancelled": threading.Event(),
+            "running": False,
+            "events": JobEvents(),
+        }
+
+        job["events"].append("queued", waiting=self._pending.qsize())
+        try:
+            self._pending.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise QueueFullError(f"{self.max_pending} requests are already waiting.") from None
+
+        with self._lock:
+            self._prune(now)
+            self._jobs[job["id"]] = job
+            self._stats["submitted"] += 1
+        return job["id"]
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Returns the public state of a job, optionally waiting up to `wait` seconds for it to finish.
+
+        Returns:
+            Optional[Dict[str, Any]]: `id`, `status` ("queued", "running", "done", "failed" or
+            "expired"), timings and `response` or `error`; None for an unknown or pruned job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        if wait > 0:
+            job["done"].wait(min(wait, max(job["deadline_at"] - time.time(), 0)))
+        self._expire(job)
+        return self._public(job)
+
+    def events(self, job_id: str) -> Optional[JobEvents]:
+        """Returns the event log of a job, or None for an unknown or pruned job."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job["events"] if job is not None else None
+
+    def _work(self) -> None:
+        while True:
+            job = self._pending.get()
+            if time.time() >= job["deadline_at"]:
+                self._finish(job, "expired", error="Deadline passed before the request was started.")
+                continue
+
+            with self._lock:
+                if job["done"].is_set():
+                    continue  # ✅ Already reported as expired while it was waiting
+                job["status"] = "running"
+                job["running"] = True
+                job["started_at"] = time.time()
+            job["events"].append("started")
+
+            # ✅ Expire the job right at its deadline, which also sets its cancel event
+            timer = threading.Timer(max(job["deadline_at"] - time.time(), 0), self._finish, args=(job, "expired"), kwargs={"error": "Deadline passed while the request was running."})
+            timer.daemon = True
+            timer.start()
+            try:
+                result = self.fn(job["input"], job["events"], job["session"], job["deadline_at"], job["cancelled"])
+            except Exception as e:
+                self._finish(job, "failed", error=str(e))
+                continue
+            finally:
+                timer.cancel()
+                with self._lock:
+                    job["running"] = False
+
+            if time.time() > job["deadline_at"]:
+                self._finish(job, "expired", error="Deadline passed while the request was running.")
+            else:
+                self._finish(job, "done", result=result)
+
+    def _expire(self, job: Dict[str, Any]) -> None:
+        """Reports a job past its deadline as expired without waiting for its worker."""
+        if not job["done"].is_set() and time.time() >= job["deadline_at"]:
+            self._finish(job, "expired", error="Deadline passed.")
+
+    def _finish(self, job: Dict[str, Any], status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            if job["done"].is_set():
+                return
+            job["status"] = status
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = time.time()
+            self._stats[status] += 1
+            job["done"].set()
+            if status == "expired":
+                job["cancelled"].set()
+
+        # ✅ Final event, then close the log so streaming clients stop
+        if status == "done":
+            job["events"].append(status, response=result)
+        else:
+            job["events"].append(status, error=error)
+        job["events"].close()
+
+    def _prune(self, now: float) -> None:
+        """Forgets finished jobs older than `keep_results` whose worker is done (called with the lock held)."""
+        stale = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and not job["running"] and now - job["finished_at"] > self.keep_results
+        ]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        state = {key: job[key] for key in ("id", "status", "submitted_at", "started_at", "finished_at")}
+        if job["status"] == "done":
+            state["response"] = job["result"]
+        elif job["error"] is not None:
+            state["error"] = job["error"]
+        return state
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Workers, waiting jobs, workers still busy with an expired job (`overdue`),
+            and counts of submitted, rejected, done, failed and expired jobs.
+        """
+        with self._lock:
+            overdue = sum(1 for job in self._jobs.values() if job["running"] and job["status"] == "expired")
+            return {"workers": self.workers, "pending": self._pending.qsize(), "max_pending": self.max_pending, "overdue": overdue, **self._stats}
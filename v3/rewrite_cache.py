@@ -0,0 +1,90 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sql_rewriter import sql_literal
+
+# 🔹 String literals and quoted identifiers (captured, kept verbatim) or comments (dropped)
+LITERAL_OR_COMMENT = re.compile(r"""('(?:[^']|'')*'?|"(?:[^"]|"")*"?)|--[^\n]*|/\*.*?(?:\*/|\Z)""", re.DOTALL)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalizes a statement for cache lookups: comments are dropped, whitespace runs outside
+    literals collapse to one space and trailing semicolons are removed. Literals and quoted
+    identifiers are kept byte for byte, and the case of the text is never changed.
+    """
+    parts = LITERAL_OR_COMMENT.split(sql)
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part if part is not None else " ")
+        else:
+            normalized.append(" ".join(part.split()))
+    return "".join(normalized).strip().rstrip(";").rstrip()
+
+
+class RewriteCache:
+    """
+    Bounded LRU cache from (normalized SQL, bound parameters, schema version) to the rewritten SQL.
+
+    Entries written for an older schema version can never be hit again, and `clear` drops them as
+    soon as the owner reports a schema change.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        """
+        Args:
+            maxsize (int): Maximum number of rewritten statements kept. 0 disables the cache.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(sql: str, parameters: Optional[Dict[str, Any]], schema_version: int) -> Tuple:
+        """Builds the lookup key. Parameters are keyed by the literal they bind to."""
+        bound = tuple(sorted((name, sql_literal(value)) for name, value in (parameters or {}).items()))
+        return normalize_sql(sql), bound, schema_version
+
+    def get(self, key: Tuple) -> Optional[str]:
+        with self._lock:
+            rewritten = self._entries.get(key)
+            if rewritten is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rewritten
+
+    def put(self, key: Tuple, rewritten: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = rewritten
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drops every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: hits, misses, hit_rate, size and maxsize.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,226 @@
+import heapq
+import json
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from catalog_index import TableKey
+
+# 🔹 Words split on case changes, digits and punctuation: "NYC-weather.csv" -> nyc, weather, csv
+WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Common English words plus the boilerplate of the agent's input, which never identify a table
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "each", "for", "from", "get",
+    "give", "has", "have", "how", "i", "in", "is", "it", "its", "me", "many", "much", "my", "of", "on",
+    "or", "our", "show", "that", "the", "their", "there", "this", "to", "was", "we", "were", "what",
+    "when", "where", "which", "who", "with", "you", "run", "following", "using", "answer", "question",
+}
+
+# Minimum word length for prefix matches ("temp" ~ "temperature")
+PREFIX_LENGTH = 4
+PREFIX_WEIGHT = 0.5
+
+# Terms found in nearly every table ("id") barely change the ranking and are skipped when searching
+MIN_IDF = 0.05
+
+# Each field's words are counted this many times, so a match in the table name outweighs a column match
+FIELD_WEIGHTS = {"table": 3, "schema": 1, "columns": 1, "description": 1}
+
+
+def stem(word: str) -> str:
+    """Strips common English plural endings ("stations" -> "station", "cities" -> "city")."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def load_descriptions(path: Optional[str]) -> Dict[str, str]:
+    """Reads table descriptions from a JSON object mapping table names to text ({} without a path)."""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=65536)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lower-cased, stemmed words of a question or a schema name, without stopwords (memoized: column names repeat across tables)."""
+    words = (word.lower() for word in WORD.findall(text))
+    return tuple(stem(word) for word in words if word not in STOPWORDS)
+
+
+class SchemaRetriever:
+    """
+    BM25 index over table names, schema paths, column names and optional descriptions.
+
+    Picks the tables most relevant to a question without an LLM call or a Dremio query.
+    `sync` updates it incrementally: only tables that were added, dropped or whose columns
+    or description changed are re-indexed.
+    """
+
+    def __init__(self, descriptions: Optional[Dict[str, str]] = None, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            descriptions (Optional[Dict[str, str]]): Free-text descriptions keyed by table name,
+                `schema.table` or fully qualified name.
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 document-length normalization.
+        """
+        self.descriptions = {name.lower(): text for name, text in (descriptions or {}).items()}
+        self.k1 = k1
+        self.b = b
+        self._entries: Dict[TableKey, Dict[str, Any]] = {}
+        self._signatures: Dict[TableKey, Tuple[Any, ...]] = {}
+        self._lengths: Dict[TableKey, int] = {}
+        self._postings: Dict[str, Dict[TableKey, int]] = {}  # term -> {table: term frequency}
+        self._total_length = 0
+        self._norms: Optional[Dict[TableKey, float]] = None  # BM25 length normalization, dropped on change
+        self._lock = threading.Lock()
+
+    def _description(self, entry: Dict[str, Any]) -> str:
+        for name in (entry["fully_qualified_name"], f"{entry['schema']}.{entry['table']}", entry["table"]):
+            text = self.descriptions.get(name.lower())
+            if text:
+                return text
+        return ""
+
+    @staticmethod
+    def _terms(key: TableKey, signature: Tuple[Any, ...]) -> Dict[str, int]:
+        columns, description = signature
+        fields = {
+            "table": tokenize(key[2]),
+            "schema": tokenize(key[1]),
+            "columns": [word for column in columns for word in tokenize(column)],
+            "description": tokenize(description),
+        }
+        terms: Dict[str, int] = {}
+        for field, words in fields.items():
+            for word in words:
+                terms[word] = terms.get(word, 0) + FIELD_WEIGHTS[field]
+                if len(word) >= PREFIX_LENGTH:
+                    prefix = word[:PREFIX_LENGTH] + "*"
+                    terms[prefix] = terms.get(prefix, 0) + FIELD_WEIGHTS[field]
+        return terms
+
+    def _add(self, key: TableKey, entry: Dict[str, Any], signature: Tuple[Any, ...]) -> None:
+        terms = self._terms(key, signature)
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[key] = count
+        length = sum(terms.values())
+        self._entries[key] = entry
+        self._signatures[key] = signature
+        self._lengths[key] = length
+        self._total_length += length
+        self._norms = None
+
+    def _remove(self, key: TableKey) -> None:
+        # ✅ Terms come from the stored signature: the entry itself may have been updated in place
+        del self._entries[key]
+        for term in self._terms(key, self._signatures.pop(key)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(key)
+        self._norms = None
+
+    def _update(self, entry: Dict[str, Any]) -> bool:
+        key = (entry["catalog"], entry["schema"], entry["table"])
+        signature = (tuple(entry["columns"] or ()), self._description(entry))
+        if self._signatures.get(key) == signature:
+            self._entries[key] = entry  # ✅ Same content, keep the fresh entry object
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._add(key, entry, signature)
+        return True
+
+    def update(self, entry: Dict[str, Any]) -> bool:
+        """
+        Indexes one table, or re-indexes it when its columns changed (e.g. loaded lazily).
+
+        Returns:
+            bool: True when the table was (re-)indexed.
+        """
+        with self._lock:
+            return self._update(entry)
+
+    def sync(self, entries: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Brings the index in line with the catalog, re-indexing only what changed.
+
+        Args:
+            entries (Iterable[Dict[str, Any]]): Every table entry of the catalog index.
+
+        Returns:
+            Tuple[int, int]: Number of tables (re-)indexed and number removed.
+        """
+        with self._lock:
+            seen = set()
+            indexed = 0
+            for entry in entries:
+                seen.add((entry["catalog"], entry["schema"], entry["table"]))
+                indexed += self._update(entry)
+
+            stale = [key for key in self._entries if key not in seen]
+            for key in stale:
+                self._remove(key)
+            return indexed, len(stale)
+
+    def search(self, question: str, k: int = 8) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Ranks tables by BM25 relevance to a question.
+
+        Args:
+            question (str): The user's question (or any text).
+            k (int): Number of tables to return.
+
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: Up to `k` `(entry, score)` pairs, best first; tables
+            sharing no word with the question are never returned.
+        """
+        query: Dict[str, float] = {}
+        for word in tokenize(question):
+            query[word] = query.get(word, 0) + 1
+            if len(word) >= PREFIX_LENGTH:
+                prefix = word[:PREFIX_LENGTH] + "*"
+                query[prefix] = query.get(prefix, 0) + PREFIX_WEIGHT
+
+        with self._lock:
+            count = len(self._entries)
+            if not count or not query:
+                return []
+            if self._norms is None:
+                average_length = self._total_length / count
+                self._norms = {key: self.k1 * (1 - self.b + self.b * length / average_length) for key, length in self._lengths.items()}
+            norms = self._norms
+            scores: Dict[TableKey, float] = {}
+
+            for term, weight in query.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if idf < MIN_IDF:
+                    continue
+                boost = weight * idf * (self.k1 + 1)
+                for key, frequency in postings.items():
+                    scores[key] = scores.get(key, 0.0) + boost * frequency / (frequency + norms[key])
+
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self._entries[key], score) for key, score in best]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"tables": len(self._entries), "terms": len(self._postings)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
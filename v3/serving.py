@@ -0,0 +1,180 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context, url_for
+from agent_events import AgentEventHandler, DeadlineHandler
+from async_executor import request_deadline
+from job_queue import JobEvents, JobQueue, QueueFullError
+from reflections import format_report
+from telemetry import metrics
+
+# 🔹 Seconds a client is told to wait before retrying a rejected request
+RETRY_AFTER = 5
+
+# 🔹 Longest session id accepted from a client
+MAX_SESSION_LENGTH = 64
+
+
+def build_input(query: str, question: str) -> str:
+    """Builds the agent input from the form's SQL query and natural language question."""
+    return f"""
+        Run the following query: {query}
+        Using the Data Answer the following question: {question}
+        """
+
+
+def create_app(run_agent: Callable[..., Any], workers: int = 4, max_pending: int = 32, deadline: float = 120, reflection_report: Optional[Callable[..., Dict[str, Any]]] = None) -> Flask:
+    """
+    Builds the Flask app serving the agent through a `JobQueue`.
+
+    Routes:
+        GET  /               The web page.
+        POST /               Submits a request and waits for its answer (up to the deadline). An optional
+                             `session` field names the conversation, so follow-up questions get its
+                             history and can be answered from its working sets.
+        POST /jobs           Submits a request and returns its id right away (202).
+        GET  /jobs/<job_id>  Returns the state of a request; `?wait=<seconds>` long-polls for the answer.
+        GET  /jobs/<job_id>/events  Streams the agent's steps and answer tokens as Server-Sent Events.
+        GET  /jobs           Queue statistics.
+        GET  /metrics        Latency histograms (p50/p95/p99), counters and cache/pool/queue gauges, in the
+                             Prometheus text format, or JSON with `?format=json`.
+        GET  /reflections    Hot query shapes and the reflections that would serve them, as JSON or as text
+                             with `?format=text`; `?top=` and `?min_count=` set how many and how hot.
+
+    Args:
+        run_agent (Callable[..., Any]): Blocking agent call accepting `callbacks`, e.g. `sql_agent.run`,
+            and `session` for requests that name one (see `agent.run_agent`).
+        workers (int): Agent requests running at the same time.
+        max_pending (int): Requests allowed to wait for a worker before new ones get a 429.
+        deadline (float): Seconds a request may take, waiting included.
+        reflection_report (Optional[Callable[..., Dict[str, Any]]]): Builds the reflection report, e.g.
+            `DremioSQLDatabase.reflection_report`. None leaves out `/reflections`.
+
+    Returns:
+        Flask: The app, with the queue available as `app.config["JOB_QUEUE"]`.
+    """
+    app = Flask(__name__)
+
+    def run_job(text: str, events: JobEvents, session: Optional[str], deadline_at: float, cancelled: threading.Event) -> Any:
+        # ✅ Past the deadline the agent stops at its next step and its queries are cancelled
+        callbacks = [AgentEventHandler(events), DeadlineHandler(cancelled)]
+        with request_deadline(deadline_at, cancelled):
+            if session is None:
+                return run_agent(text, callbacks=callbacks)
+            return run_agent(text, callbacks=callbacks, session=session)
+
+    jobs = JobQueue(run_job, workers=workers, max_pending=max_pending, deadline=deadline)
+    app.config["JOB_QUEUE"] = jobs
+    metrics.register("jobs", jobs.stats)
+
+    def submit():
+        """Validates the form (or JSON body) and queues the request, returning (job_id, error_response)."""
+        data = request.get_json(silent=True) or request.form
+        if not isinstance(data, dict):
+            return None, (jsonify({"error": "The request body must be a JSON object."}), 400)
+        for field in ("query", "question", "session"):
+            if not isinstance(data.get(field, ""), str):
+                return None, (jsonify({"error": f"{field} must be a string."}), 400)
+
+        query = data.get("query", "").strip()
+        question = data.get("question", "").strip()
+        session = data.get("session", "").strip() or None
+
+        if not query and not question:
+            return None, (jsonify({"error": "Please provide either a SQL query or a natural language question."}), 400)
+
+        try:
+            timeout = float(data.get("deadline") or deadline)
+        except (TypeError, ValueError):
+            return None, (jsonify({"error": "deadline must be a number of seconds."}), 400)
+
+        if session is not None and len(session) > MAX_SESSION_LENGTH:
+            return None, (jsonify({"error": f"session must be at most {MAX_SESSION_LENGTH} characters."}), 400)
+
+        try:
+            return jobs.submit(build_input(query, question), deadline=min(timeout, deadline), session=session), None
+        except QueueFullError as e:
+            # ✅ Backpressure: reject right away instead of queueing work nobody will wait for
+            response = jsonify({"error": f"Server busy: {e} Try again later."})
+            response.headers["Retry-After"] = str(RETRY_AFTER)
+            return None, (response, 429)
+
+    @app.route("/", methods=["GET", "POST"])
+    def index():
+        if request.method == "POST":
+            job_id, error = submit()
+            if error:
+                return error
+
+            state = jobs.get(job_id, wait=deadline)
+            if state["status"] == "done":
+                return jsonify({"response": state["response"]})
+            if state["status"] == "failed":
+                return jsonify({"error": state["error"]}), 500
+            return jsonify({"error": state.get("error") or "Deadline passed."}), 504
+
+        return render_template("index.html")
+
+    @app.route("/jobs", methods=["POST"])
+    def create_job():
+        job_id, error = submit()
+        if error:
+            return error
+        return jsonify({
+            "job_id": job_id,
+            "status_url": url_for("get_job", job_id=job_id),
+            "events_url": url_for("job_events", job_id=job_id),
+        }), 202
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def get_job(job_id: str):
+        wait = min(request.args.get("wait", 0, type=float), 30)
+        state = jobs.get(job_id, wait=wait)
+        if state is None:
+            return jsonify({"error": "Unknown or expired job id."}), 404
+        return jsonify(state)
+
+    @app.route("/jobs/<job_id>/events", methods=["GET"])
+    def job_events(job_id: str):
+        events = jobs.events(job_id)
+        if events is None:
+            return jsonify({"error": "Unknown or expired job id."}), 404
+
+        # ✅ A reconnecting EventSource resumes after the last event it received
+        last_id = request.headers.get("Last-Event-ID", type=int)
+        start = last_id + 1 if last_id is not None else 0
+
+        def stream():
+            for item in events.follow(start):
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                index, event = item
+                yield f"id: {index}\ndata: {json.dumps(event, default=str)}\n\n"
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/jobs", methods=["GET"])
+    def job_stats():
+        return jsonify(jobs.stats())
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        if request.args.get("format") == "json":
+            return jsonify(metrics.snapshot())
+        return Response(metrics.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    if reflection_report is not None:
+        @app.route("/reflections", methods=["GET"])
+        def reflections():
+            report = reflection_report(k=min(request.args.get("top", 10, type=int), 100), min_count=request.args.get("min_count", 2, type=int))
+            if request.args.get("format") == "text":
+                return Response(format_report(report), mimetype="text/plain")
+            return jsonify(report)
+
+    return app
@@ -0,0 +1,353 @@
+import difflib
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+# 🔹 Tokens of a statement; whitespace and comments are skipped
+TOKEN = re.compile(r"""
+    \s+|--[^\n]*|/\*.*?(?:\*/|\Z)
+    |(?P<string>'(?:[^']|'')*'?)
+    |(?P<quoted>"(?:[^"]|"")*"?)
+    |(?P<word>[^\W\d][\w$]*)
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+    |(?P<param>:[A-Za-z_]\w*)
+    |(?P<symbol>.)
+""", re.DOTALL | re.VERBOSE)
+
+# Words that are never column names: SQL keywords, type names, date parts and functions called without parentheses
+KEYWORDS = {
+    "ALL", "AND", "ANY", "AS", "ASC", "ASYMMETRIC", "AT", "BETWEEN", "BOTH", "BRANCH", "BY", "CASE", "CAST", "COLLATE",
+    "COMMIT", "CROSS", "CURRENT", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "CURRENT_USER", "DESC",
+    "DISTINCT", "ELSE", "END", "ESCAPE", "EXCEPT", "EXISTS", "FALSE", "FETCH", "FILTER", "FIRST", "FOLLOWING", "FOR",
+    "FROM", "FULL", "GROUP", "GROUPING", "HAVING", "ILIKE", "IN", "INNER", "INTERSECT", "INTERVAL", "INTO", "IS", "JOIN",
+    "LAST", "LATERAL", "LEADING", "LEFT", "LIKE", "LIMIT", "LOCALTIME", "LOCALTIMESTAMP", "MINUS", "NATURAL", "NEXT",
+    "NOT", "NULL", "NULLS", "OF", "OFFSET", "ON", "ONLY", "OR", "ORDER", "OUTER", "OVER", "PARTITION", "PRECEDING",
+    "QUALIFY", "RANGE", "RECURSIVE", "REF", "REFERENCE", "RIGHT", "ROW", "ROWS", "SELECT", "SESSION_USER", "SETS",
+    "SIMILAR", "SNAPSHOT", "SOME", "SYMMETRIC", "SYSTEM_USER", "TABLESAMPLE", "TAG", "THEN", "TIES", "TO", "TRAILING",
+    "TRUE", "UNBOUNDED", "UNION", "UNKNOWN", "UNNEST", "USER", "USING", "VALUES", "WHEN", "WHERE", "WINDOW", "WITH",
+    "WITHIN", "CUBE", "ROLLUP",
+    # Types
+    "ARRAY", "BIGINT", "BINARY", "BOOLEAN", "CHAR", "CHARACTER", "DATE", "DECIMAL", "DOUBLE", "FLOAT", "INT",
+    "INTEGER", "LIST", "MAP", "NUMERIC", "PRECISION", "REAL", "SMALLINT", "STRUCT", "TIME", "TIMESTAMP", "TINYINT",
+    "VARBINARY", "VARCHAR", "VARYING", "ZONE",
+    # Date parts
+    "CENTURY", "DAY", "DECADE", "DOW", "DOY", "EPOCH", "HOUR", "MICROSECOND", "MILLENNIUM", "MILLISECOND", "MINUTE",
+    "MONTH", "QUARTER", "SECOND", "WEEK", "YEAR",
+}
+
+# Clauses after which a FROM list ends
+FROM_CLAUSE_TERMINATORS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "FETCH", "UNION", "INTERSECT", "EXCEPT", "MINUS",
+    "WINDOW", "QUALIFY", "SELECT",
+}
+
+# Words whose next word is a version reference, not a column: `AT BRANCH main`
+VERSION_WORDS = {"BRANCH", "TAG", "COMMIT", "REF", "REFERENCE", "SNAPSHOT"}
+
+# Keywords that end an expression, so a name right after them is an alias: `CASE ... END AS kind` or `CASE ... END kind`
+OPERAND_KEYWORDS = {"END", "NULL", "TRUE", "FALSE", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "LOCALTIME", "LOCALTIMESTAMP"}
+
+# Aggregates that make a result small without a LIMIT
+AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX", "STDDEV", "VARIANCE", "APPROX_COUNT_DISTINCT", "MEDIAN", "LISTAGG"}
+
+# Sources whose columns are not in the catalog
+SYSTEM_SCHEMAS = {"information_schema", "sys"}
+
+# Columns Dremio adds to file-system datasets for their folders (dir0, dir1, ...)
+DIRECTORY_COLUMN = re.compile(r"dir\d+", re.IGNORECASE)
+
+
+class Name(NamedTuple):
+    """A possibly dotted identifier, e.g. `t.city` or `Samples."samples.dremio.com"."zips.json"`."""
+    parts: List[str]  # Unquoted parts
+    text: str  # As written
+    quoted: bool  # Last part was quoted
+    index: int  # Position in the token list
+
+
+class QueryValidationError(ValueError):
+    """The query references tables or columns that do not exist; the message says what to use instead."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(" ".join(errors))
+
+
+def _unquote(text: str) -> str:
+    return text[1:-1].replace('""', '"') if text.startswith('"') else text
+
+
+def _defines_cte(tokens: List[tuple], i: int) -> bool:
+    """True when the name at `i` starts a CTE definition: `name AS (` or `name (a, b) AS (`."""
+    j = i + 1
+    if j < len(tokens) and tokens[j] == ("symbol", "("):
+        if tokens[i - 1] not in (("word", "WITH"), ("word", "RECURSIVE"), ("symbol", ",")):
+            return False
+        depth = 0
+        for j in range(i + 1, len(tokens)):
+            depth += (tokens[j] == ("symbol", "(")) - (tokens[j] == ("symbol", ")"))
+            if depth == 0:
+                break
+        j += 1
+    return j + 1 < len(tokens) and tokens[j] == ("word", "AS") and tokens[j + 1] == ("symbol", "(")
+
+
+def _statements(sql: str) -> List[List[tuple]]:
+    """Tokenizes `sql` into statements of (kind, text) tokens, with dotted names merged into one `name` token."""
+    statements: List[List[tuple]] = [[]]
+    for match in TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        text = match.group(kind)
+        tokens = statements[-1]
+        if kind == "symbol" and text == ";":
+            statements.append([])
+        elif kind in ("word", "quoted") and len(tokens) >= 2 and tokens[-1] == ("symbol", ".") and tokens[-2][0] == "name":
+            _, previous_text, parts, _ = tokens[-2]
+            tokens[-2:] = [("name", f"{previous_text}.{text}", parts + [_unquote(text)], kind == "quoted")]
+        elif kind == "quoted" or (kind == "word" and text.upper() not in KEYWORDS):
+            tokens.append(("name", text, [_unquote(text)], kind == "quoted"))
+        elif kind == "symbol" and text == "*" and len(tokens) >= 2 and tokens[-1] == ("symbol", ".") and tokens[-2][0] == "name":
+            tokens[-2:] = [("star", tokens[-2][1] + ".*")]
+        else:
+            tokens.append((kind, text.upper() if kind == "word" else text))
+    return [tokens for tokens in statements if tokens]
+
+
+def split_statements(sql: str) -> List[str]:
+    """Splits `sql` into the text of its statements at `;` outside literals and comments, dropping empty ones."""
+    statements, start, has_tokens = [], 0, False
+    for match in TOKEN.finditer(sql):
+        if match.lastgroup is None:
+            continue
+        if match.group() == ";":
+            if has_tokens:
+                statements.append(sql[start:match.start()].strip())
+            start, has_tokens = match.end(), False
+        else:
+            has_tokens = True
+    if has_tokens:
+        statements.append(sql[start:].strip())
+    return statements
+
+
+class SQLValidator:
+    """
+    Checks a query's tables and columns against the catalog before it is sent to Dremio.
+
+    Unknown tables and unknown columns are errors, reported with the closest names that exist,
+    so the agent can fix its query without a Dremio round trip. Checks are only made when they
+    cannot reject a valid query: unqualified columns are checked only when every source of the
+    statement is a catalog table with known columns (no CTE, subquery in FROM or system table).
+    Expensive patterns (`SELECT *` or no LIMIT on a query that does not aggregate) are warnings.
+    """
+
+    def __init__(self, resolve: Callable[[str], Optional[Dict[str, Any]]], suggest_tables: Optional[Callable[[str], List[str]]] = None):
+        """
+        Args:
+            resolve (Callable[[str], Optional[Dict[str, Any]]]): Maps a table reference to its catalog
+                entry (with `columns`, None when not loaded), or None when the table is unknown.
+            suggest_tables (Optional[Callable[[str], List[str]]]): Names of existing tables close to an unknown one.
+        """
+        self.resolve = resolve
+        self.suggest_tables = suggest_tables
+
+    def validate(self, sql: str) -> Dict[str, List[str]]:
+        """
+        Args:
+            sql (str): The query as written by the agent (before rewriting).
+
+        Returns:
+            Dict[str, List[str]]: `errors` (the query cannot run) and `warnings` (it may be expensive).
+        """
+        result: Dict[str, List[str]] = {"errors": [], "warnings": []}
+        for tokens in _statements(sql):
+            if tokens[0][0] == "word" and tokens[0][1] in ("SELECT", "WITH", "VALUES") or tokens[0] == ("symbol", "("):
+                self._validate_statement(tokens, result)
+        return result
+
+    def _validate_statement(self, tokens: List[tuple], result: Dict[str, List[str]]) -> None:
+        tables: List[Name] = []
+        ctes: Set[str] = set()
+        aliases: Set[str] = set()
+        table_aliases: Dict[str, Name] = {}
+        skipped: Set[int] = set()  # token positions that are not column references
+        derived = False
+
+        calls: List[bool] = []  # for each open parenthesis: is it a function call?
+        from_depths: List[int] = []
+        expect_table = False
+
+        for i, token in enumerate(tokens):
+            kind, text = token[0], token[1]
+            previous = tokens[i - 1] if i else ("", "")
+            following = tokens[i + 1] if i + 1 < len(tokens) else ("", "")
+            depth = len(calls)
+
+            if kind == "symbol" and text == "(":
+                calls.append(previous[0] == "name" or previous == ("word", "CAST"))
+                if expect_table:
+                    derived = True  # ✅ Subquery in FROM: its columns are unknown
+                expect_table = False
+                continue
+            if kind == "symbol" and text == ")":
+                if from_depths and from_depths[-1] == depth:
+                    from_depths.pop()
+                if calls:
+                    calls.pop()
+                continue
+
+            in_from = bool(from_depths) and from_depths[-1] == depth
+            if kind == "word":
+                if text == "FROM" and not (calls and calls[-1]):
+                    if in_from:
+                        from_depths.pop()
+                    from_depths.append(depth)
+                    expect_table = True
+                elif text == "JOIN":
+                    expect_table = True
+                elif text in FROM_CLAUSE_TERMINATORS and in_from:
+                    from_depths.pop()
+                continue
+            if kind == "symbol" and text == "," and in_from:
+                expect_table = True
+                continue
+
+            if kind != "name":
+                expect_table = False
+                continue
+
+            parts = token[2]
+            if expect_table:
+                expect_table = False
+                skipped.add(i)
+                if following == ("symbol", "("):
+                    derived = True  # Table function, e.g. TABLE(...)
+                    continue
+                name = Name(parts, text, token[3], i)
+                tables.append(name)
+                table_aliases[parts[-1].lower()] = name
+                continue
+
+            if len(parts) == 1 and _defines_cte(tokens, i):
+                ctes.add(parts[0].lower())
+                skipped.add(i)
+                continue
+
+            # 🔹 Alias definitions: after AS, or right after an operand (`AVG(temp) avg_temp`, `weather w`)
+            after_as = previous == ("word", "AS")
+            operand = previous[0] in ("name", "number", "string", "star") or previous == ("symbol", ")") or previous[0] == "word" and previous[1] in OPERAND_KEYWORDS
+            if len(parts) == 1 and (after_as or operand):
+                aliases.add(parts[0].lower())
+                skipped.add(i)
+                if tables and tables[-1].index == i - 1 - after_as:
+                    table_aliases[parts[0].lower()] = tables[-1]
+                continue
+
+            if following == ("symbol", "(") or previous[0] == "word" and previous[1] in VERSION_WORDS:
+                skipped.add(i)  # function call or version reference
+
+        self._check(tokens, tables, ctes, aliases, table_aliases, skipped, derived, result)
+
+    def _check(self, tokens: List[tuple], tables: List[Name], ctes: Set[str], aliases: Set[str], table_aliases: Dict[str, Name],
+               skipped: Set[int], derived: bool, result: Dict[str, List[str]]) -> None:
+        sources: Dict[int, Optional[Dict[str, Any]]] = {}  # table token position -> entry (None: columns unknown)
+        complete = not derived and not ctes
+
+        for table in tables:
+            if len(table.parts) == 1 and table.parts[0].lower() in ctes:
+                sources[table.index] = None
+                complete = False
+                continue
+            if any(part.lower() in SYSTEM_SCHEMAS for part in table.parts[:-1]):
+                sources[table.index] = None
+                complete = False
+                continue
+
+            entry = self.resolve(table.text)
+            if entry is None:
+                message = f"Table {table.text} does not exist."
+                suggestions = self.suggest_tables(table.parts[-1]) if self.suggest_tables else []
+                if suggestions:
+                    message += f" Did you mean: {', '.join(suggestions)}?"
+                result["errors"].append(message)
+                sources[table.index] = None
+                complete = False
+                continue
+            if entry["columns"] is None:
+                complete = False
+            sources[table.index] = entry
+
+        known = [entry for entry in sources.values() if entry is not None and entry["columns"] is not None]
+        all_columns = {column.lower(): column for entry in known for column in entry["columns"]}
+
+        for i, token in enumerate(tokens):
+            if token[0] != "name" or i in skipped:
+                continue
+            parts = token[2]
+            column = parts[-1]
+
+            if len(parts) > 1:
+                if len(parts) == 2:
+                    qualifier = table_aliases.get(parts[0].lower())
+                else:
+                    path = [part.lower() for part in parts[:-1]]
+                    qualifier = next((table for table in tables if [part.lower() for part in table.parts] == path), None)
+                entry = sources.get(qualifier.index) if qualifier is not None else None
+                if entry is None or entry["columns"] is None:
+                    continue
+                columns = {name.lower() for name in entry["columns"]}
+                if column.lower() not in columns and not DIRECTORY_COLUMN.fullmatch(column):
+                    result["errors"].append(self._column_error(token[1], column, entry["columns"], entry["fully_qualified_name"]))
+                continue
+
+            name = column.lower()
+            if not complete or not known or name in all_columns or name in aliases or name in table_aliases or DIRECTORY_COLUMN.fullmatch(name):
+                continue
+            tables_text = ", ".join(entry["fully_qualified_name"] for entry in known)
+            result["errors"].append(self._column_error(token[1], column, list(all_columns.values()), tables_text))
+
+        self._check_cost(tokens, tables, ctes, result)
+
+    @staticmethod
+    def _column_error(reference: str, column: str, columns: List[str], tables: str) -> str:
+        message = f"Column {reference} does not exist in {tables}."
+        by_lower = {name.lower(): name for name in columns}
+        close = difflib.get_close_matches(column.lower(), list(by_lower), n=3, cutoff=0.6)
+        if close:
+            message += f" Did you mean: {', '.join(by_lower[name] for name in close)}?"
+        else:
+            message += f" Available columns: {', '.join(columns[:30])}{', ...' if len(columns) > 30 else ''}."
+        return message
+
+    @staticmethod
+    def _check_cost(tokens: List[tuple], tables: List[Name], ctes: Set[str], result: Dict[str, List[str]]) -> None:
+        """Warns about queries that may read a lot of data: no LIMIT on a query that does not aggregate."""
+        data_tables = [
+            table for table in tables
+            if not (len(table.parts) == 1 and table.parts[0].lower() in ctes) and not any(part.lower() in SYSTEM_SCHEMAS for part in table.parts[:-1])
+        ]
+        if not data_tables:
+            return
+
+        depth = 0
+        limited = aggregated = star = False
+        for i, token in enumerate(tokens):
+            if token == ("symbol", "("):
+                depth += 1
+            elif token == ("symbol", ")"):
+                depth -= 1
+            elif token[0] == "word" and depth == 0 and token[1] in ("LIMIT", "FETCH", "GROUP"):
+                limited = limited or token[1] != "GROUP"
+                aggregated = aggregated or token[1] == "GROUP"
+            elif token[0] == "name" and depth == 0 and token[1].upper() in AGGREGATES and i + 1 < len(tokens) and tokens[i + 1] == ("symbol", "("):
+                aggregated = True
+            elif depth == 0 and (token == ("symbol", "*") and i and tokens[i - 1] in (("word", "SELECT"), ("word", "DISTINCT"), ("symbol", ",")) or token[0] == "star"):
+                star = True
+
+        if limited or aggregated:
+            return
+        if star:
+            result["warnings"].append("SELECT * without a LIMIT reads every column of every row. Select only the columns you need and add a LIMIT.")
+        else:
+            result["warnings"].append("The query has no LIMIT and does not aggregate, so it may return a very large result. Add a LIMIT or aggregate.")
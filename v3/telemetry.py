@@ -0,0 +1,285 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# 🔹 Every logger of the project is a child of this one, e.g. "dremio_agent.DremioSQLDatabase"
+LOGGER_NAME = "dremio_agent"
+
+# Prefix of every metric name in the Prometheus output
+METRIC_PREFIX = "dremio_agent"
+
+# Quantiles reported for histograms
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module. Messages stay in memory until `configure_logging` gives them a handler."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class Histogram:
+    """
+    Count, sum and maximum of every observation, and quantiles over the most recent `size`
+    observations (a ring buffer, so recording is O(1) and memory is bounded).
+    """
+
+    def __init__(self, size: int = 2048):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._recent: Deque[float] = deque(maxlen=size)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Returns count, sum, max and p50/p95/p99 of the recent observations."""
+        recent = sorted(self._recent)
+        result = {"count": self.count, "sum": self.sum, "max": self.max}
+        for quantile in QUANTILES:
+            result[f"p{int(quantile * 100)}"] = recent[min(len(recent) - 1, int(quantile * len(recent)))] if recent else 0.0
+        return result
+
+
+class Metrics:
+    """
+    Process-wide registry of counters and histograms, plus collectors: functions returning a
+    dict of numbers (cache statistics, pool statistics, ...) read whenever metrics are exported.
+    """
+
+    def __init__(self, histogram_size: int = 2048):
+        self._histogram_size = histogram_size
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self._histogram_size)
+            histogram.observe(value)
+
+    def register(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """Adds (or replaces) a collector whose numeric values are exported as `<name>_<key>` gauges."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def reset(self) -> None:
+        """Drops every counter and histogram (collectors are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: `counters`, `histograms` (count, sum, max, p50, p95, p99) and `gauges`
+            (the numeric values of each collector, keyed by collector name).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+            collectors = list(self._collectors.items())
+
+        gauges = {}
+        for name, collector in collectors:
+            try:
+                values = collector()
+            except Exception as e:
+                get_logger("telemetry").warning("⚠️ Metrics collector %s failed: %s", name, e)
+                continue
+            gauges[name] = {key: value for key, value in values.items() if isinstance(value, (int, float))}
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def to_prometheus(self) -> str:
+        """Renders `snapshot()` in the Prometheus text exposition format (histograms as summaries)."""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            lines += [f'{metric}{{quantile="{quantile}"}} {histogram[f"p{int(quantile * 100)}"]}' for quantile in QUANTILES]
+            lines += [f"{metric}_sum {histogram['sum']}", f"{metric}_count {histogram['count']}"]
+        for collector, values in sorted(snapshot["gauges"].items()):
+            for key, value in sorted(values.items()):
+                metric = f"{METRIC_PREFIX}_{collector}_{key}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+
+# ✅ The registry shared by every module of the process
+metrics = Metrics()
+
+
+class Span:
+    """A timed step of a request: name, ids linking it to its trace and parent, and attributes."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "duration")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.duration = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        """Adds attributes known only once the step ran, e.g. the number of rows read."""
+        self.attributes.update(attributes)
+
+
+# 🔹 Innermost open span of the current thread (or task)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+_span_log = get_logger("trace")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Times the block as a span named `name`, nested in the current span (same trace) if there is
+    one. Its duration is recorded in the `<name>_seconds` histogram and, when DEBUG logging is on,
+    the span is logged with its ids, duration and attributes. A block that raises gets an `error`
+    attribute and counts in `<name>_errors`.
+    """
+    parent = _current_span.get()
+    current = Span(name, parent.trace_id if parent is not None else os.urandom(16).hex(), parent.span_id if parent is not None else None, attributes)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        metrics.incr(f"{name}_errors")
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        metrics.observe(f"{name}_seconds", current.duration)
+        if _span_log.isEnabledFor(logging.DEBUG):
+            _span_log.debug("span %s %.2fms", name, current.duration * 1000, extra={"fields": {
+                "span": name, "span_id": current.span_id, "parent_id": current.parent_id,
+                "duration_ms": round(current.duration * 1000, 3), **current.attributes,
+            }})
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+class _TraceFilter(logging.Filter):
+    """Stamps records with the current trace id in the calling thread, before they are queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, trace id and the record's `fields`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The message, followed by the record's `fields` as key=value pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_settings: Optional[Dict[str, Any]] = None
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text", stream: Any = None) -> None:
+    """
+    Sends the project's log records to `stream` (stderr by default) through a queue: the calling
+    thread only enqueues the record, and a background thread formats and writes it, so slow
+    output never blocks a query or an agent step. Calling it again replaces the previous setup.
+
+    Args:
+        level (str): Lowest level written (DEBUG also logs every span and every query).
+        fmt (str): "text" for readable lines or "json" for one JSON object per line.
+        stream (Any): File-like object written to.
+    """
+    global _listener, _settings
+    _settings = {"level": level, "fmt": fmt, "stream": stream}
+    if _listener is not None:
+        _listener.stop()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(_TraceFilter())
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [queue_handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()  # ✅ Writes the records still queued
+
+
+def _after_fork() -> None:
+    """The listener thread does not survive a fork: children start their own."""
+    global _listener
+    metrics._after_fork()
+    if _settings is not None:
+        _listener = None
+        configure_logging(**_settings)
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)